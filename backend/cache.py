@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from uese.core.universal_scanner import ScanCandidate
+
+# Rough footprint of one ranked candidate (object, dict, value/diff tuples).
+CANDIDATE_BYTES = 600
+HASH_CHUNK_BYTES = 1 << 20
+
+
+class FileDigests:
+    """SHA-256 of files, remembered per (path, mtime, size).
+
+    A known file costs one ``stat``; it is only read again once it changed.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stamp(path: Path) -> Tuple[str, int, int]:
+        """What a digest is remembered by: (resolved path, mtime, size)."""
+        path = Path(path).resolve()
+        st = path.stat()
+        return (str(path), st.st_mtime_ns, st.st_size)
+
+    def digest(self, path: Path) -> str:
+        key = self.stamp(path)
+        path = Path(key[0])
+        with self._lock:
+            found = self._digests.get(key)
+            if found is not None:
+                self._digests.move_to_end(key)
+                return found
+
+        h = hashlib.sha256()
+        with open(path, "rb") as handle:
+            while chunk := handle.read(HASH_CHUNK_BYTES):
+                h.update(chunk)
+        with self._lock:
+            self._digests[key] = h.hexdigest()
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        return h.hexdigest()
+
+
+class ScanCache:
+    """Ranked scan results keyed by save content and scan parameters.
+
+    Entries expire ``ttl`` seconds after they were stored and the least
+    recently used go first once there are more than ``max_entries`` or they
+    add up to more than ``max_bytes``. Candidates keep the save they were
+    found in alive (for their hex context), so that counts towards the size.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        digests: Optional[FileDigests] = None,
+    ):
+        env = os.environ.get
+        self.max_entries = int(env("UESE_SCAN_CACHE_ENTRIES", "32")) if max_entries is None else max_entries
+        self.max_bytes = int(env("UESE_SCAN_CACHE_MB", "256")) << 20 if max_bytes is None else max_bytes
+        self.ttl = float(env("UESE_SCAN_CACHE_TTL", "900")) if ttl is None else ttl
+        self.digests = digests or FileDigests()
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, List[ScanCandidate]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def key(self, kind: str, saves: Sequence[Path], targets: Sequence[int], **params: Any) -> Hashable:
+        """Cache key of a scan; stats the saves but reads them only when they changed."""
+        params = {k: tuple(sorted(set(v))) if isinstance(v, list) else v for k, v in params.items()}
+        return (kind, tuple(self.digests.digest(p) for p in saves), tuple(targets), tuple(sorted(params.items())))
+
+    def get(self, key: Hashable) -> Optional[List[ScanCandidate]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, candidates: List[ScanCandidate]) -> None:
+        size = self._size(candidates)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), size, candidates)
+            self._bytes += size
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (stored, _, _) in self._entries.items() if now - stored > self.ttl]:
+            self._drop(key)
+            self.expirations += 1
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    @staticmethod
+    def _size(candidates: List[ScanCandidate]) -> int:
+        sources = {id(c.source): len(c.source) for c in candidates if c.source is not None}
+        return len(candidates) * CANDIDATE_BYTES + sum(sources.values())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once someone asked to cancel it."""
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = QUEUED
+    progress: float = 0.0
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    cached: bool = False
+    cancel_requested: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def report(self, fraction: float) -> None:
+        # Also the cancellation point: work functions call it between steps.
+        if self.cancel_requested.is_set():
+            raise JobCancelled(self.id)
+        self.progress = min(1.0, max(self.progress, fraction))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "cached": self.cached,
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps their state for polling.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued`` more
+    wait for a worker; ``submit`` raises QueueFull past that instead of
+    letting work pile up. Threads rather than processes: the NumPy kernels
+    release the GIL, and progress and cancellation stay plain shared state.
+    The last ``keep_finished`` finished jobs are kept for ``GET /jobs``, each
+    for ``job_ttl`` seconds after it finished: a result can pin whole saves
+    (candidates keep them for their hex context), so it must not outlive its
+    use.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        keep_finished: int = 100,
+        job_ttl: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or int(os.environ.get("UESE_SCAN_WORKERS", "2"))
+        self.max_queued = int(os.environ.get("UESE_SCAN_QUEUE", "8")) if max_queued is None else max_queued
+        if self.max_workers < 1 or self.max_queued < 0:
+            raise ValueError(f"Need max_workers >= 1 and max_queued >= 0, got {self.max_workers} / {self.max_queued}")
+        self.keep_finished = keep_finished
+        self.job_ttl = float(os.environ.get("UESE_JOB_TTL", "600")) if job_ttl is None else job_ttl
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="uese-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """Queue ``fn(job, *args, **kwargs)``; its return value becomes ``job.result``."""
+        with self._lock:
+            pending = sum(job.status not in FINISHED for job in self._jobs.values())
+            if pending >= self.max_workers + self.max_queued:
+                raise QueueFull(f"Too many jobs in flight ({pending}); try again later")
+            job = Job(uuid.uuid4().hex, kind)
+            self._jobs[job.id] = job
+            self._prune()
+            self._futures[job.id] = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def completed(self, kind: str, result: Any) -> Job:
+        """Record a job whose result is already known (a cache hit); it takes no worker or queue slot."""
+        with self._lock:
+            job = Job(uuid.uuid4().hex, kind, status=DONE, progress=1.0, result=result, cached=True)
+            job.started = job.finished = job.created
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            self._prune()
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Drop a queued job right away; a running one stops at its next progress report."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+                future = self._futures.pop(job.id, None)
+                if future is not None:
+                    future.cancel()
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune()
+            counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"max_workers": self.max_workers, "max_queued": self.max_queued, "jobs": counts}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_requested.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            status, result, error = CANCELLED, None, None
+        except Exception as e:
+            status, result, error = FAILED, None, str(e) or type(e).__name__
+        else:
+            status, error = DONE, None
+        with self._lock:
+            job.result, job.error = result, error
+            if status == DONE:
+                job.progress = 1.0
+            self._finish(job, status)
+            self._futures.pop(job.id, None)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished = time.time()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.job_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED and job.finished < cutoff]:
+            del self._jobs[job_id]
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
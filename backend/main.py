@@ -1,18 +1,32 @@
 #!/usr/bin/env python3
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Tuple
 from pathlib import Path
+from contextlib import asynccontextmanager
+from bisect import bisect_right
+import json
 import os
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
 from uese.core.universal_scanner import UniversalScanner, ScanCandidate
-from uese.core.patch_engine import PatchEngine
+from uese.core.patch_engine import PatchEdit, PatchEngine
 from uese.core.profile_manager import ProfileManager, GameProfile
+from backend.cache import ScanCache
+from backend.jobs import DONE, Job, JobManager, QueueFull
 
-app = FastAPI(title="UESE Backend API")
+# Scans run here, off the event loop; UESE_SCAN_WORKERS / UESE_SCAN_QUEUE size it.
+jobs = JobManager()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    jobs.shutdown()
+
+app = FastAPI(title="UESE Backend API", lifespan=lifespan)
 
 # Enable CORS for frontend development
 app.add_middleware(
@@ -26,6 +40,10 @@ app.add_middleware(
 scanner = UniversalScanner()
 patcher = PatchEngine()
 profile_manager = ProfileManager()
+scan_cache = ScanCache()
+
+# Candidates per NDJSON chunk when streaming results.
+STREAM_BATCH = 256
 
 # Build path for frontend
 frontend_path = Path(__file__).parent.parent / "gui-web" / "dist"
@@ -36,19 +54,40 @@ class ScanRequest(BaseModel):
     width: int = 4
     dtype: str = "auto"
     exclude: List[str] = ["png", "entropy"]
+    containers: bool = False
 
-class PatchRequest(BaseModel):
-    filepath: str
+class PatchEditModel(BaseModel):
     offset: int
-    width: int
     value: int
+    width: int = 4
+    container: Optional[str] = None
+
+class PatchRequest(BaseModel):
+    filepath: str
+    offset: Optional[int] = None
+    width: int = 4
+    value: Optional[int] = None
     backup: bool = True
+    container: Optional[str] = None
+    edits: List[PatchEditModel] = []
+    in_place: bool = False
 
 class DeltaScanRequest(BaseModel):
     saves: List[str]
     deltas: List[int]
     width: int = 4
     dtype: str = "auto"
+    exclude: List[str] = ["png", "entropy"]
+    containers: bool = False
+
+class FilePatchModel(BaseModel):
+    filepath: str
+    edits: List[PatchEditModel]
+
+class BatchPatchRequest(BaseModel):
+    files: List[FilePatchModel]
+    backup: bool = True
+    in_place: bool = False
 
 @app.get("/profiles")
 async def list_profiles():
@@ -67,40 +106,240 @@ async def get_profile(game_id: str):
         "save_pattern": profile.save_pattern
     }
 
-@app.post("/scan")
+def save_stamps(save_paths: List[Path]) -> Optional[List[Tuple[str, int, int]]]:
+    try:
+        return [scan_cache.digests.stamp(p) for p in save_paths]
+    except OSError:
+        return None
+
+def scan_key(kind: str, save_paths: List[Path], targets: List[int], req):
+    # Stamped before hashing: if a save changes after this, run_scan sees it and skips the cache.
+    stamps = save_stamps(save_paths)
+    key = scan_cache.key(
+        kind,
+        save_paths,
+        targets,
+        width=req.width,
+        dtype=req.dtype,
+        exclude=req.exclude,
+        containers=req.containers,
+    )
+    return stamps, key
+
+def run_scan(job: Job, kind: str, save_paths: List[Path], targets: List[int], req, key, stamps) -> List[ScanCandidate]:
+    scan = scanner.scan_series if kind == "values" else scanner.scan_delta_series
+    candidates = scan(
+        save_paths,
+        targets,
+        width=req.width,
+        dtype=req.dtype,
+        exclude=req.exclude,
+        containers=req.containers,
+        progress=job.report,
+    )
+    # A save rewritten since it was hashed would file these results under its old content.
+    if stamps is not None and save_stamps(save_paths) == stamps:
+        scan_cache.put(key, candidates)
+    return candidates
+
+async def submit_scan(job_kind: str, kind: str, save_paths: List[Path], targets: List[int], req) -> dict:
+    for p in save_paths:
+        if not p.exists():
+            raise HTTPException(status_code=400, detail=f"File not found: {p}")
+
+    # Hashing only reads saves that changed since the last scan; keep even that off the loop.
+    stamps, key = await run_in_threadpool(scan_key, kind, save_paths, targets, req)
+    cached = scan_cache.get(key)
+    if cached is not None:
+        return jobs.completed(job_kind, cached).summary()
+    try:
+        job = jobs.submit(job_kind, run_scan, kind, save_paths, targets, req, key, stamps)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.summary()
+
+@app.post("/scan", status_code=202)
 async def scan_saves(req: ScanRequest):
     try:
         save_paths = [Path(s) for s in req.saves]
-        for p in save_paths:
-            if not p.exists():
-                raise HTTPException(status_code=400, detail=f"File not found: {p}")
-        
-        candidates = scanner.scan_saves(
-            save_paths[0], save_paths[1], save_paths[2],
-            values=tuple(req.values),
-            width=req.width,
-            dtype=req.dtype,
-            exclude=req.exclude
-        )
-        return candidates
+        if len(save_paths) < 2 or len(req.values) != len(save_paths):
+            raise HTTPException(status_code=400, detail="Need at least 2 saves and one value per save")
+        return await submit_scan("scan", "values", save_paths, req.values, req)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/scan/delta", status_code=202)
+async def scan_deltas(req: DeltaScanRequest):
+    try:
+        save_paths = [Path(s) for s in req.saves]
+        if len(save_paths) < 2 or len(req.deltas) != len(save_paths) - 1:
+            raise HTTPException(status_code=400, detail="Need at least 2 saves and one delta per consecutive pair")
+        return await submit_scan("scan-delta", "deltas", save_paths, req.deltas, req)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return scan_cache.stats()
+
+@app.get("/jobs")
+async def list_jobs():
+    return {**jobs.stats(), "items": [job.summary() for job in jobs.list()]}
+
+def candidate_dict(c: ScanCandidate) -> dict:
+    # context_hex is built here, so only candidates that are sent pay for it.
+    return {
+        "offset": c.offset,
+        "location": c.location,
+        "container": c.container,
+        "width": c.width,
+        "dtype": c.dtype,
+        "values": list(c.values),
+        "score": c.score,
+        "diff_ab": c.diff_ab,
+        "diff_bc": c.diff_bc,
+        "diffs": list(c.diffs),
+        "context_hex": c.context_hex,
+    }
+
+def select_candidates(
+    candidates: List[ScanCandidate], offset: int, top: Optional[int], min_score: Optional[int]
+) -> Tuple[int, List[ScanCandidate]]:
+    # Scans return candidates best score first, so min_score keeps a prefix.
+    end = len(candidates)
+    if min_score is not None:
+        end = bisect_right(candidates, -min_score, key=lambda c: -c.score)
+    stop = end if top is None else min(end, offset + top)
+    return end, candidates[offset:stop]
+
+def finished_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    top: int = Query(100, ge=0),
+    min_score: Optional[int] = None,
+):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != DONE:
+        return {**job.summary(), "result": None}
+    total, page = select_candidates(job.result, offset, top, min_score)
+    return {**job.summary(), "total": total, "offset": offset, "result": [candidate_dict(c) for c in page]}
+
+@app.get("/jobs/{job_id}/candidates")
+async def stream_candidates(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    top: Optional[int] = Query(None, ge=0),
+    min_score: Optional[int] = None,
+):
+    """All (or a page of) the candidates as NDJSON, one object per line."""
+    total, page = select_candidates(finished_job(job_id).result, offset, top, min_score)
+
+    def lines():
+        for start in range(0, len(page), STREAM_BATCH):
+            yield "".join(json.dumps(candidate_dict(c)) + "\n" for c in page[start : start + STREAM_BATCH])
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Total-Count": str(total)})
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.summary()
+
+def apply_patch(p: Path, edits: List[PatchEdit], backup: bool, in_place: bool):
+    if in_place:
+        return patcher.patch_in_place(p, edits, journal=backup)
+    return patcher.patch_values(p, edits, backup=backup)
+
+def patch_report_dict(report) -> dict:
+    return {
+        "verified": report.verified,
+        "backup": report.backup.id if report.backup else None,
+        "journal": str(report.journal) if report.journal else None,
+        "edits": [
+            {
+                "offset": edit.offset,
+                "container": edit.container,
+                "width": edit.width,
+                "value": edit.value,
+                "old_hex": old.hex(),
+                "new_hex": new.hex(),
+            }
+            for edit, old, new in report.changes
+        ],
+    }
+
 @app.post("/patch")
 async def patch_save(req: PatchRequest):
     try:
         p = Path(req.filepath)
-        success = patcher.patch_value(
-            filepath=p,
-            offset=req.offset,
-            width=req.width,
-            value=req.value,
-            backup=req.backup
-        )
-        if success:
-            verified = patcher.verify_patch(p, req.offset, req.value, req.width)
-            return {"status": "success", "verified": verified}
-        return {"status": "failed"}
+        if (req.offset is None) != (req.value is None):
+            raise HTTPException(status_code=400, detail="offset and value go together")
+        edits = [PatchEdit(e.offset, e.width, e.value, e.container) for e in req.edits]
+        if req.offset is not None:
+            edits.insert(0, PatchEdit(req.offset, req.width, req.value, req.container))
+        if not edits:
+            raise HTTPException(status_code=400, detail="Need offset/value or a list of edits")
+        try:
+            report = await run_in_threadpool(apply_patch, p, edits, req.backup, req.in_place)
+        except (FileNotFoundError, ValueError) as e:
+            # Rejected up front; nothing was written.
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"status": "success", **patch_report_dict(report)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/patch/batch")
+async def patch_batch(req: BatchPatchRequest):
+    """Apply edits to several saves: one read-modify-write (or one mmap pass) per file.
+
+    Each file is its own transaction. A file that fails leaves only itself
+    untouched; the others are still patched and the status turns "partial".
+    """
+    try:
+        # Edits for the same file, however it was spelled, go into one write.
+        grouped = {}
+        for f in req.files:
+            p = Path(f.filepath)
+            if not p.exists():
+                raise HTTPException(status_code=400, detail=f"File not found: {p}")
+            edits = grouped.setdefault(p.resolve(), (p, []))[1]
+            edits.extend(PatchEdit(e.offset, e.width, e.value, e.container) for e in f.edits)
+        if not grouped or not all(edits for _, edits in grouped.values()):
+            raise HTTPException(status_code=400, detail="Every file needs at least one edit")
+
+        results = []
+        for p, edits in grouped.values():
+            try:
+                report = await run_in_threadpool(apply_patch, p, edits, req.backup, req.in_place)
+            except (FileNotFoundError, ValueError, RuntimeError) as e:
+                results.append({"filepath": str(p), "status": "error", "detail": str(e)})
+                continue
+            results.append({"filepath": str(p), "status": "success", **patch_report_dict(report)})
+
+        ok = sum(r["status"] == "success" for r in results)
+        status = "success" if ok == len(results) else "partial" if ok else "error"
+        return {"status": status, "files": results}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,9 +1,12 @@
 import sys
 import zlib
 
+from uese.core.payload_cache import file_digest, inflate
+
 def decompress_all(filename):
     with open(filename, 'rb') as f:
         data = f.read()
+    digest = file_digest(data)
 
     magic = b'\x1f\x8b\x08'
     offset = data.find(magic)
@@ -12,7 +15,10 @@ def decompress_all(filename):
         print(f"Trying decompression at offset {offset:X}")
         try:
             # Try gzip
-            decompressed = zlib.decompress(data[offset:], zlib.MAX_WBITS | 16)
+            result = inflate(data, offset, zlib.MAX_WBITS | 16, digest)
+            if not result.eof:
+                raise zlib.error("incomplete stream")
+            decompressed = result.payload
             print(f"  SUCCESS! Decompressed {len(decompressed)} bytes")
             with open(f"{filename}.{offset:X}.bin", 'wb') as out:
                 out.write(decompressed)
@@ -2,6 +2,8 @@
 import sys
 import zlib
 
+from uese.core.payload_cache import file_digest, inflate
+
 def decompress_at(filename, offset):
     try:
         offset = int(offset)
@@ -9,13 +11,21 @@ def decompress_at(filename, offset):
         offset = int(offset, 16) # Handle hex
 
     with open(filename, 'rb') as f:
-        f.seek(offset)
         data = f.read()
+    digest = file_digest(data)
+
+    def cached(wbits):
+        def run(d):
+            result = inflate(d, offset, wbits, digest)
+            if not result.eof:
+                raise zlib.error("incomplete or truncated stream")
+            return result.payload
+        return run
 
     modes = [
-        ("zlib", lambda d: zlib.decompress(d)),
-        ("gzip", lambda d: zlib.decompress(d, zlib.MAX_WBITS | 16)),
-        ("raw", lambda d: zlib.decompress(d, -zlib.MAX_WBITS)),
+        ("zlib", cached(zlib.MAX_WBITS)),
+        ("gzip", cached(zlib.MAX_WBITS | 16)),
+        ("raw", cached(-zlib.MAX_WBITS)),
     ]
 
     for name, func in modes:
@@ -1,32 +1,29 @@
-
 import sys
-import math
+
+from uese.core.entropy import entropy_profile, shannon_entropy
 
 def calculate_entropy(data):
-    if not data:
-        return 0
-    entropy = 0
-    for x in range(256):
-        p_x = float(data.count(x))/len(data)
-        if p_x > 0:
-            entropy += - p_x*math.log(p_x, 2)
-    return entropy
-
-def scan_entropy(filename, block_size=1024):
+    return shannon_entropy(data)
+
+def scan_entropy(filename, block_size=1024, step=None):
     with open(filename, 'rb') as f:
         data = f.read()
-    
+
+    step = step or block_size
     print(f"Scanning {filename} ({len(data)} bytes) for entropy...")
-    print(f"Block size: {block_size}")
+    print(f"Block size: {block_size}, step: {step}")
     print("Offset   | Entropy")
     print("-" * 20)
-    
+
+    curve = entropy_profile(data, block_size, step)
+    # Trailing partial block, as the fixed-block scan always reported it.
+    tail = curve[-1][0] + step if curve else 0
+    if tail < len(data):
+        curve.append((tail, calculate_entropy(data[tail:tail + block_size])))
+
     high_entropy_start = -1
-    
-    for i in range(0, len(data), block_size):
-        chunk = data[i:i+block_size]
-        e = calculate_entropy(chunk)
-        
+
+    for i, e in curve:
         # formatting output to not be too verbose, show changes or high values
         if e > 7.5:
              if high_entropy_start == -1:
@@ -46,6 +43,8 @@ def scan_entropy(filename, block_size=1024):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python3 entropy_scan.py <filename>")
+        print("Usage: python3 entropy_scan.py <filename> [block_size] [step]")
     else:
-        scan_entropy(sys.argv[1])
+        block_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+        step = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        scan_entropy(sys.argv[1], block_size, step)
@@ -19,6 +19,7 @@ import {
 import { motion, AnimatePresence } from 'framer-motion';
 
 const API_BASE = "http://localhost:8000";
+const CANDIDATE_PAGE = 15;
 
 const App = () => {
   const [activeTab, setActiveTab] = useState('scan');
@@ -29,7 +30,9 @@ const App = () => {
   const [values, setValues] = useState(['', '', '']);
   const [width, setWidth] = useState(4);
   const [candidates, setCandidates] = useState([]);
+  const [candidateTotal, setCandidateTotal] = useState(0);
   const [isScanning, setIsScanning] = useState(false);
+  const [scanProgress, setScanProgress] = useState(0);
 
   // Patch State
   const [patchFile, setPatchFile] = useState('');
@@ -51,8 +54,33 @@ const App = () => {
     }
   };
 
+  const addSilo = () => {
+    setSaves([...saves, '']);
+    setValues([...values, '']);
+  };
+
+  const dropSilo = () => {
+    if (saves.length <= 2) return;
+    setSaves(saves.slice(0, -1));
+    setValues(values.slice(0, -1));
+  };
+
+  // Scans run as backend jobs: POST /scan hands back a job id, then we poll it.
+  // Only the top page comes back; the full list streams from /jobs/{id}/candidates.
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const resp = await axios.get(`${API_BASE}/jobs/${jobId}`, { params: { top: CANDIDATE_PAGE } });
+      setScanProgress(resp.data.progress);
+      if (resp.data.status === 'done') return resp.data;
+      if (resp.data.status === 'failed') throw new Error(resp.data.error);
+      if (resp.data.status === 'cancelled') throw new Error("scan cancelled");
+      await new Promise(resolve => setTimeout(resolve, 500));
+    }
+  };
+
   const handleScan = async () => {
     setIsScanning(true);
+    setScanProgress(0);
     try {
       const resp = await axios.post(`${API_BASE}/scan`, {
         saves: saves,
@@ -60,7 +88,9 @@ const App = () => {
         width: width,
         dtype: "auto"
       });
-      setCandidates(resp.data);
+      const job = await waitForJob(resp.data.job_id);
+      setCandidates(job.result);
+      setCandidateTotal(job.total);
     } catch (err) {
       alert("FAIL: " + (err.response?.data?.detail || err.message));
     } finally {
@@ -142,6 +172,14 @@ const App = () => {
                       </div>
                     ))}
                   </div>
+                  <div className="flex space-x-2">
+                    <button onClick={addSilo} className="bg-zinc-900 text-cyan-400 font-black px-4 py-2 text-xs hover:bg-cyan-500 hover:text-black transition-all italic uppercase">
+                      + Add Silo
+                    </button>
+                    <button onClick={dropSilo} disabled={saves.length <= 2} className="bg-zinc-900 text-zinc-500 font-black px-4 py-2 text-xs hover:bg-pink-500 hover:text-black transition-all italic uppercase disabled:opacity-30">
+                      - Drop Silo
+                    </button>
+                  </div>
 
                   <SectionTitle icon={<Layers size={20} />} title="HACK PARAMETERS" />
                   <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
@@ -186,7 +224,7 @@ const App = () => {
                     {isScanning ? (
                       <span className="flex items-center space-x-2">
                         <div className="w-5 h-5 border-4 border-black border-t-transparent rounded-full animate-spin"></div>
-                        <span>INFILTRATING...</span>
+                        <span>INFILTRATING... {Math.round(scanProgress * 100)}%</span>
                       </span>
                     ) : (
                       <>
@@ -230,7 +268,7 @@ const App = () => {
               {candidates.length > 0 && (
                 <section className="border-4 border-zinc-900 bg-black overflow-hidden shadow-[20px_20px_0px_rgba(39,39,42,1)]">
                   <div className="bg-zinc-900 p-4 flex justify-between items-center">
-                    <h3 className="font-black uppercase tracking-widest italic text-xl">VULNERABILITIES DETECTED: {candidates.length}</h3>
+                    <h3 className="font-black uppercase tracking-widest italic text-xl">VULNERABILITIES DETECTED: {candidateTotal}</h3>
                     <span className="bg-red-600 text-white px-3 py-1 text-xs font-black animate-bounce">TOP SIGHTINGS</span>
                   </div>
                   <div className="overflow-x-auto">
@@ -244,7 +282,7 @@ const App = () => {
                         </tr>
                       </thead>
                       <tbody className="divide-y-2 divide-zinc-900">
-                        {candidates.slice(0, 15).map((c, i) => (
+                        {candidates.map((c, i) => (
                           <tr key={i} className="hover:bg-cyan-500/5 transition-colors">
                             <td className="px-6 py-4 font-mono font-bold text-cyan-400 text-lg tracking-wider italic">0x{c.offset.toString(16).toUpperCase()}</td>
                             <td className="px-6 py-4">
@@ -1,5 +1,183 @@
+import argparse
+import re
+import struct
+import sys
+import time
 import zlib
 import os
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+from uese.core.compression import (
+    GZIP_MAGIC,
+    DeflateParams,
+    IncrementalDeflater,
+    gzip_frame,
+    gzip_header,
+    gzip_header_length,
+    gzip_level_hint,
+    gzip_member,
+    match_deflater,
+    write_gzip_member,
+)
+from uese.core.payload_cache import inflate
+from uese.core.streaming import DEFAULT_MAX_PAYLOAD_BYTES, find_in_file, inflate_file
+from uese.parsers.odin import OdinDocument
+
+# Field markers the patchers look up; indexed together in one pass on first use.
+KNOWN_FIELDS = (
+    b'm_gold',
+    b'm_activeSkillPoints',
+    b'm_passiveSkillPoints',
+    b'm_statsPoints',
+    b'm_statsManager',
+    b'm_currentLevel',
+    b'm_baseValueOverride',
+    b'm_value',
+    b'm_agility',
+    b'm_strength',
+    b'm_constitution',
+    b'm_courage',
+    b'm_charisma',
+    b'm_cleverness',
+)
+
+# Recompression presets for NaheulbeukSave.save. 'match' instead reuses the
+# original gzip header and the deflate settings detected from the original
+# stream, so the output has the same size as the game's own saves.
+COMPRESSION_PRESETS = {'fast': 1, 'default': 6, 'best': 9}
+COMPRESSION_MODES = ('match', *COMPRESSION_PRESETS)
+
+# NaheulbeukSave.load streams files larger than this instead of reading them whole.
+STREAMING_THRESHOLD = 64 * 1024 * 1024
+
+U32 = struct.Struct('<I')
+I32 = struct.Struct('<i')
+
+
+class MarkerIndex:
+    """
+    Sorted offsets of every occurrence of each marker, built with one regex pass.
+    Matches the semantics of repeated bytes.find(): overlapping and nested
+    occurrences (e.g. m_value inside m_valueMax) are all recorded.
+
+    The data can also arrive in pieces: create the index with data=b'', call
+    feed() for each piece in order, then finish().
+    """
+
+    def __init__(self, data, markers):
+        self.markers = tuple(dict.fromkeys(markers))
+        self.offsets = {m: [] for m in self.markers}
+        # Longest first so the regex prefers the longer of two markers at one position.
+        ordered = sorted(self.markers, key=len, reverse=True)
+        self._pattern = re.compile(b'|'.join(re.escape(m) for m in ordered))
+        # A match hides any marker that starts inside it; list those per marker
+        # and check them explicitly.
+        self._hidden = {
+            m: [
+                (other, k)
+                for other in self.markers
+                for k in range(len(m))
+                if (other, k) != (m, 0) and m[k:k + len(other)] == other[:len(m) - k]
+            ]
+            for m in self.markers
+        }
+        self._found = {m: set() for m in self.markers}
+        # The last len(longest marker) - 1 bytes fed, rescanned with the next
+        # piece so markers split across pieces are still found.
+        self._overlap = max((len(m) for m in self.markers), default=1) - 1
+        self._tail = b''
+        self._size = 0
+        if data:
+            self.feed(data)
+        self.finish()
+
+    def feed(self, chunk):
+        window = self._tail + chunk if self._tail else chunk
+        base = self._size - len(self._tail)
+        found, hidden = self._found, self._hidden
+        for match in self._pattern.finditer(window):
+            marker, pos = match.group(), match.start()
+            found[marker].add(base + pos)
+            for other, k in hidden[marker]:
+                if window.startswith(other, pos + k):
+                    found[other].add(base + pos + k)
+        self._size += len(chunk)
+        self._tail = bytes(window[max(0, len(window) - self._overlap):]) if self._overlap else b''
+
+    def finish(self):
+        for marker, positions in self._found.items():
+            self.offsets[marker] = sorted(positions)
+        return self
+
+    def all(self, marker):
+        return self.offsets[marker]
+
+    def first(self, marker, start=0, stop=None):
+        """
+        Like data.find(marker, start, stop): the first occurrence that lies
+        entirely inside [start, stop), or -1.
+        """
+        offsets = self.offsets[marker]
+        i = bisect_left(offsets, start)
+        if i < len(offsets) and (stop is None or offsets[i] + len(marker) <= stop):
+            return offsets[i]
+        return -1
+
+
+class FieldView:
+    """
+    One 4-byte field of the payload. Only offsets are stored; current_value
+    reads (and assigning to it writes) straight through a memoryview of the
+    payload buffer, so no bytes are copied either way.
+    """
+
+    __slots__ = ('view', 'marker_offset', 'value_offset', 'codec')
+
+    def __init__(self, view, marker_offset, value_offset, codec=U32):
+        self.view = view
+        self.marker_offset = marker_offset
+        self.value_offset = value_offset
+        self.codec = codec
+
+    @property
+    def current_value(self):
+        return self.codec.unpack_from(self.view, self.value_offset)[0]
+
+    @current_value.setter
+    def current_value(self, value):
+        self.codec.pack_into(self.view, self.value_offset, int(value))
+
+    def __repr__(self):
+        return f'FieldView(0x{self.marker_offset:X}, {self.current_value})'
+
+
+class FieldViews(Sequence):
+    """
+    The occurrences of one marker, backed by the marker index's offset list.
+    FieldView objects are only created when an item is accessed. A marker
+    too close to the end of the payload to be followed by a whole value is
+    not a field and is left out.
+    """
+
+    __slots__ = ('view', 'marker_offsets', 'marker_length', 'count')
+
+    def __init__(self, view, marker_offsets, marker_length):
+        self.view = view
+        self.marker_offsets = marker_offsets
+        self.marker_length = marker_length
+        # The offsets are sorted, so the truncated ones are a tail.
+        self.count = bisect_right(marker_offsets, len(view) - marker_length - U32.size)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        offset = self.marker_offsets[range(self.count)[i]]
+        return FieldView(self.view, offset, offset + self.marker_length)
+
 
 class NaheulbeukSave:
     def __init__(self, path):
@@ -9,64 +187,329 @@ class NaheulbeukSave:
         self.trailing_data = b''
         self.decompressed_data = bytearray()
         self.gzip_offset = -1
+        self._index = None
+        self._document = None
+        self._view = None
+        self.gzip_header = b''
+        self.compressed_size = 0
+        self._original_payload = None
+        self._streamed = None
+        self._deflate_params = None
+        self._deflater = None
+        self.last_save = None
+
+    def load(self, streaming=None, max_size=DEFAULT_MAX_PAYLOAD_BYTES, spill=False):
+        """
+        Reads the save and inflates its gzip payload into decompressed_data.
+
+        ``streaming`` (the default for files over STREAMING_THRESHOLD bytes)
+        never holds the whole file in memory: the payload is inflated chunk
+        by chunk, capped at ``max_size`` bytes, with the marker index built as
+        it arrives; ``spill`` keeps the payload in a temp file mapped with
+        mmap instead of RAM. Streamed loads do not keep the original streams
+        around, so 'match' saves use the gzip header's level hint without
+        trial compression. A spilled payload is also saved straight from the
+        mapping to the output file, on one thread and without reusing any of
+        the previous stream; call close() (or use the save as a context
+        manager) to unmap it.
+        """
+        if streaming is None:
+            streaming = spill or os.path.getsize(self.path) > STREAMING_THRESHOLD
+        if streaming:
+            return self._load_streaming(max_size, spill)
 
-    def load(self):
         with open(self.path, 'rb') as f:
             full_data = f.read()
 
         # Find GZIP header magic
-        magic = b'\x1f\x8b\x08'
-        self.gzip_offset = full_data.find(magic)
+        self.gzip_offset = full_data.find(GZIP_MAGIC)
         if self.gzip_offset == -1:
             raise ValueError("Could not find GZIP payload in save file.")
 
         self.header = full_data[:self.gzip_offset]
         
-        # Use decompressobj to handle trailing data correctly
-        d = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        # Inflate through the payload cache; the stream end splits off trailing data
         try:
-            self.decompressed_data = bytearray(d.decompress(full_data[self.gzip_offset:]))
-            self.trailing_data = d.unused_data
+            result = inflate(full_data, self.gzip_offset, zlib.MAX_WBITS | 16)
         except Exception as e:
             raise ValueError(f"Decompression failed: {e}")
+        self._reset(bytearray(result.payload))
+        # Kept for 'match' recompression; the payload cache usually holds it anyway.
+        self._original_payload = result.payload
+        self.compressed_payload = full_data[self.gzip_offset:result.end]
+        self.gzip_header = self.compressed_payload[:gzip_header_length(self.compressed_payload)]
+        self.compressed_size = len(self.compressed_payload)
+        self.trailing_data = full_data[result.end:]
+
+        return self.decompressed_data
+
+    def _load_streaming(self, max_size, spill):
+        self.gzip_offset = find_in_file(self.path, GZIP_MAGIC)
+        if self.gzip_offset == -1:
+            raise ValueError("Could not find GZIP payload in save file.")
+
+        index = MarkerIndex(b'', KNOWN_FIELDS)
+        try:
+            result = inflate_file(
+                self.path, self.gzip_offset, zlib.MAX_WBITS | 16, max_size=max_size, spill=spill, on_chunk=index.feed
+            )
+        except zlib.error as e:
+            raise ValueError(f"Decompression failed: {e}")
+        if not result.eof:
+            result.close()
+            raise ValueError("Decompression failed: truncated gzip stream")
+
+        with open(self.path, 'rb') as f:
+            self.header = f.read(self.gzip_offset)
+            head = f.read(min(result.end - self.gzip_offset, 1 << 16))
+            f.seek(result.end)
+            self.trailing_data = f.read()
+        self._reset(result.data)
+        self._streamed = result
+        self._index = index.finish()
+        self.gzip_header = head[:gzip_header_length(head)]
+        self.compressed_size = result.end - self.gzip_offset
 
         return self.decompressed_data
 
+    def _reset(self, payload):
+        self.close()
+        self.decompressed_data = payload
+        self.compressed_payload = b''
+        self._deflate_params = None
+
+    def close(self):
+        """
+        Releases the loaded payload, unmapping and deleting the temp file of a
+        spilled load. FieldViews taken from this load must not be used after.
+        """
+        if self._view is not None:
+            self._view.release()
+        self._view = None
+        self._index = None
+        self._document = None
+        self._deflater = None
+        self._original_payload = None
+        self.decompressed_data = bytearray()
+        if self._streamed is not None:
+            self._streamed.close()
+            self._streamed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def marker_index(self, markers=KNOWN_FIELDS):
+        """
+        Returns a MarkerIndex over the decompressed payload covering at least
+        ``markers``. Patching values in place keeps marker offsets valid, so
+        the index is only rebuilt on load or when a new marker is asked for.
+        """
+        if self._index is None or not set(markers) <= set(self._index.markers):
+            known = self._index.markers if self._index else KNOWN_FIELDS
+            self._index = MarkerIndex(self.decompressed_data, known + tuple(markers))
+        return self._index
+
+    @property
+    def view(self):
+        """A memoryview of decompressed_data shared by every FieldView of this load."""
+        if self._view is None:
+            self._view = memoryview(self.decompressed_data)
+        return self._view
+
+    def document(self):
+        """
+        Parses the payload as Odin Serializer streams (see uese.parsers.odin)
+        once and caches the tree; values read and write through to
+        decompressed_data, e.g. props.path('m_agility', 'm_value').value = 50.
+        """
+        if self._document is None:
+            self._document = OdinDocument(self.decompressed_data)
+        return self._document
+
     def find_fields(self, field_name):
         """
-        Finds all occurrences of a field and returns a list of dictionaries:
-        {'offset': int, 'value': int}
-        """
-        results = []
-        start = 0
-        while True:
-            idx = self.decompressed_data.find(field_name, start)
-            if idx == -1:
-                break
-            val_offset = idx + len(field_name)
-            # Assuming 4-byte little endian integers for gold/perks
-            current_val = int.from_bytes(self.decompressed_data[val_offset:val_offset+4], 'little')
-            results.append({
-                'marker_offset': idx,
-                'value_offset': val_offset,
-                'current_value': current_val
-            })
-            start = idx + 1
-        return results
+        Finds all occurrences of a field and returns them as FieldViews:
+        candidates with marker_offset, value_offset and current_value (a
+        4-byte little-endian unsigned int read from the payload on access).
+        """
+        return FieldViews(self.view, self.marker_index((field_name,)).all(field_name), len(field_name))
+
+    def group_records(self, anchor, fields, max_distance=1000):
+        """
+        Groups every ``anchor`` occurrence with the nearest following occurrence
+        of each field in ``fields`` (Unity serializes a record's fields close
+        together, in order). Returns one dict per anchor, keyed by field name,
+        holding find_fields-style candidates; a field whose nearest occurrence
+        is missing or ``max_distance`` bytes or more away maps to None.
+        Every lookup is a bisect, so grouping is O(anchors * fields * log n).
+        """
+        candidates = {name: self.find_fields(name) for name in (anchor, *fields)}
+        records = []
+        for owner in candidates[anchor]:
+            record = {anchor: owner}
+            for name in fields:
+                offsets = candidates[name].marker_offsets
+                i = bisect_right(offsets, owner.marker_offset)
+                nearest = candidates[name][i] if i < len(candidates[name]) else None
+                if nearest is not None and nearest.marker_offset - owner.marker_offset >= max_distance:
+                    nearest = None
+                record[name] = nearest
+            records.append(record)
+        return records
 
     def patch_candidate(self, candidate, new_value):
-        offset = candidate['value_offset']
-        self.decompressed_data[offset:offset+4] = int(new_value).to_bytes(4, 'little')
+        candidate.current_value = new_value
+
+    def deflate_params(self, compression='match'):
+        """
+        Resolves a level (0-9), a COMPRESSION_PRESETS name or 'match' to
+        DeflateParams. 'match' trial-compresses the original payload once per
+        load; if no zlib setting reproduces the original stream it falls back
+        to the level recorded in the gzip header.
+        """
+        if compression == 'match':
+            if self._deflate_params is None:
+                hint = gzip_level_hint(self.gzip_header)
+                if self._original_payload is None:
+                    self._deflate_params = DeflateParams(hint)
+                    return self._deflate_params
+                deflated = self.compressed_payload[len(self.gzip_header):-8]
+                deflater = match_deflater(self._original_payload, deflated, hint)
+                if deflater is not None:
+                    # Its checkpoints describe the original stream, so the next
+                    # save only recompresses from the first patched byte on.
+                    self._deflater = deflater
+                self._deflate_params = deflater.params if deflater else DeflateParams(hint)
+            return self._deflate_params
+        level = COMPRESSION_PRESETS.get(compression, compression)
+        if not isinstance(level, int) or not 0 <= level <= 9:
+            raise ValueError(f"Unknown compression {compression!r}; use 0-9 or one of {', '.join(COMPRESSION_MODES)}")
+        return DeflateParams(level)
+
+    def save(self, output_path, compression='match', jobs=1):
+        """
+        Recompresses the payload and writes header + gzip stream + trailing
+        data. See deflate_params for ``compression``; with 'match' an
+        unpatched save is rewritten byte for byte.
+
+        With one job the stream is rewritten incrementally: the compressed
+        output before the first byte changed since the previous save (or since
+        load, for 'match') is reused, so the cost depends on how far the first
+        edit is from the end of the payload. ``jobs`` other than 1 instead
+        compresses 128 KiB blocks on that many threads (0 = every core); the
+        stream is still one gzip member, a few hundred bytes larger. Mode,
+        level, time and sizes are recorded in self.last_save.
+        """
+        start = time.perf_counter()
+        params = self.deflate_params(compression)
+        header = gzip_header(params.level)
+        if compression == 'match':
+            header = self.gzip_header
+        reused = 0
+        if self._streamed is not None and self._streamed.spill is not None:
+            return self._save_spilled(output_path, compression, params, header, start)
+        if jobs != 1:
+            new_compressed = gzip_member(self.decompressed_data, header=header, params=params, jobs=jobs)
+        else:
+            if self._deflater is None or self._deflater.params != params:
+                self._deflater = IncrementalDeflater(params)
+            stream = self._deflater.deflate(self.decompressed_data)
+            new_compressed = gzip_frame(stream, self._deflater.crc, len(self.decompressed_data), header)
+            reused = self._deflater.reused
+        seconds = time.perf_counter() - start
 
-    def save(self, output_path):
-        # Recompress
-        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
-        new_compressed = compressor.compress(self.decompressed_data) + compressor.flush()
-        
         # Construct final file
         final_data = self.header + new_compressed + self.trailing_data
-        
+
         with open(output_path, 'wb') as f:
             f.write(final_data)
-        
+
+        self.last_save = {
+            'compression': compression,
+            'level': params.level,
+            'jobs': jobs,
+            'reused': reused,
+            'seconds': seconds,
+            'size': len(new_compressed),
+            'original_size': self.compressed_size,
+        }
         return output_path
+
+    def _save_spilled(self, output_path, compression, params, header, start):
+        with open(output_path, 'wb') as f:
+            f.write(self.header)
+            size = write_gzip_member(f, self.decompressed_data, header, params)
+            f.write(self.trailing_data)
+        self.last_save = {
+            'compression': compression,
+            'level': params.level,
+            'jobs': 1,
+            'reused': 0,
+            'seconds': time.perf_counter() - start,
+            'size': size,
+            'original_size': self.compressed_size,
+        }
+        return output_path
+
+    def save_summary(self):
+        report = self.last_save
+        return (
+            f"Recompressed ({report['compression']}, level {report['level']}, {report['jobs']} job(s)) in {report['seconds'] * 1000:.0f} ms: "
+            f"{report['size']} bytes (original {report['original_size']}), "
+            f"{report['reused']} payload bytes reused from the previous stream"
+        )
+
+
+def compression_arg(value):
+    """argparse type for --compression: a preset name, 'match' or a zlib level."""
+    if value in COMPRESSION_MODES:
+        return value
+    if value.isdigit() and 0 <= int(value) <= 9:
+        return int(value)
+    raise argparse.ArgumentTypeError(f"expected 0-9 or one of {', '.join(COMPRESSION_MODES)}")
+
+
+def jobs_arg(value):
+    """argparse type for --jobs: a thread count, 0 meaning all cores."""
+    if value.isdigit():
+        return int(value)
+    raise argparse.ArgumentTypeError("expected 0 (all cores) or a positive thread count")
+
+
+def add_compression_argument(parser):
+    parser.add_argument("--compression", type=compression_arg, default='match',
+                        help="Recompression: 'match' (default, same settings as the original), "
+                             "'fast', 'default', 'best' or a zlib level 0-9.")
+    parser.add_argument("--jobs", type=jobs_arg, default=1,
+                        help="Compress on this many threads (0 = all cores). Default: 1.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every recompression mode on a Naheulbeuk save (nothing is written).")
+    parser.add_argument("save_file", help="Path to the .sav file")
+    parser.add_argument("--jobs", type=jobs_arg, default=0, help="Threads for the parallel rows (0 = all cores).")
+    args = parser.parse_args()
+
+    save = NaheulbeukSave(args.save_file)
+    try:
+        save.load()
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Payload: {len(save.decompressed_data)} bytes, original stream {save.compressed_size} bytes")
+    for jobs in dict.fromkeys((1, args.jobs)):
+        for compression in COMPRESSION_MODES:
+            start = time.perf_counter()
+            params = save.deflate_params(compression)
+            stream = gzip_member(save.decompressed_data, params=params, jobs=jobs)
+            seconds = time.perf_counter() - start
+            detail = f"level {params.level}, memLevel {params.mem_level}, strategy {params.strategy}"
+            print(f"  {compression:<8} -j{jobs:<3} {len(stream):>10} bytes {seconds * 1000:>8.1f} ms  ({detail})")
+
+
+if __name__ == "__main__":
+    main()
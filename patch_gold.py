@@ -1,6 +1,6 @@
 import argparse
 import sys
-from naheulbeuk_patch import NaheulbeukSave
+from naheulbeuk_patch import NaheulbeukSave, add_compression_argument
 
 def main():
     parser = argparse.ArgumentParser(description="Patch gold in Naheulbeuk save files with safety checks.")
@@ -10,6 +10,7 @@ def main():
                         help="DANGER: 'all' patches everything, 'player' (default) is safer.")
     parser.add_argument("--current", type=int, help="Current gold amount (required for 'player' mode)")
     parser.add_argument("--out", help="Output file path (default: <input>.patched)")
+    add_compression_argument(parser)
     parser.add_argument("--dry-run", action="store_true", help="Don't save changes, just show what would be done")
 
     args = parser.parse_args()
@@ -34,10 +35,10 @@ def main():
     to_patch = []
     if args.mode == "player":
         # Find matches for current gold
-        matches = [c for c in candidates if c['current_value'] == args.current]
+        matches = [c for c in candidates if c.current_value == args.current]
         if len(matches) == 0:
             print(f"Error: No 'm_gold' fields found with current value {args.current}.")
-            print("Found values: " + ", ".join(str(c['current_value']) for c in candidates))
+            print("Found values: " + ", ".join(str(c.current_value) for c in candidates))
             sys.exit(1)
         if len(matches) > 1:
             print(f"Error: Multiple 'm_gold' fields found with value {args.current}. Cannot be sure which is the player.")
@@ -49,13 +50,14 @@ def main():
 
     print(f"Plan: Patching {len(to_patch)} occurrences of 'm_gold' -> {args.new_gold}")
     for c in to_patch:
-        print(f"  Offset 0x{c['marker_offset']:X}: {c['current_value']} -> {args.new_gold}")
+        print(f"  Offset 0x{c.marker_offset:X}: {c.current_value} -> {args.new_gold}")
         if not args.dry_run:
             save.patch_candidate(c, args.new_gold)
 
     if not args.dry_run:
         out_path = args.out if args.out else args.save_file + ".patched"
-        save.save(out_path)
+        save.save(out_path, compression=args.compression, jobs=args.jobs)
+        print(save.save_summary())
         print(f"Successfully saved to: {out_path}")
     else:
         print("Dry-run complete. No changes saved.")
@@ -1,6 +1,6 @@
 import argparse
 import sys
-from naheulbeuk_patch import NaheulbeukSave
+from naheulbeuk_patch import I32, MarkerIndex, NaheulbeukSave, add_compression_argument
 
 
 STAT_FIELDS = {
@@ -35,89 +35,104 @@ VALUE_FIELD = b"m_value"
 STATS_MANAGER_FIELD = b"m_statsManager"
 CURRENT_LEVEL_FIELD = b"m_currentLevel"
 
+SLOT_MARKERS = (
+    STATS_MANAGER_FIELD,
+    CURRENT_LEVEL_FIELD,
+    BASE_OVERRIDE_FIELD,
+    VALUE_FIELD,
+    *STAT_FIELDS.values(),
+)
 
-def find_all_offsets(data, marker):
-    offsets = []
-    start = 0
-    while True:
-        idx = data.find(marker, start)
-        if idx == -1:
-            break
-        offsets.append(idx)
-        start = idx + 1
-    return offsets
 
+class StatView:
+    """
+    Marker offsets of one stat in a slot. base_value and value are read from
+    (and value is written to) the payload through a memoryview on access.
+    """
 
-def read_i32(data, offset):
-    return int.from_bytes(data[offset:offset + 4], "little", signed=True)
+    __slots__ = ("view", "stat_marker_offset", "base_marker_offset", "value_marker_offset")
 
+    def __init__(self, view, stat_marker_offset, base_marker_offset, value_marker_offset):
+        self.view = view
+        self.stat_marker_offset = stat_marker_offset
+        self.base_marker_offset = base_marker_offset
+        self.value_marker_offset = value_marker_offset
 
-def write_i32(data, offset, value):
-    data[offset:offset + 4] = int(value).to_bytes(4, "little", signed=True)
+    @property
+    def base_offset(self):
+        return self.base_marker_offset + len(BASE_OVERRIDE_FIELD)
+
+    @property
+    def value_offset(self):
+        return self.value_marker_offset + len(VALUE_FIELD)
+
+    @property
+    def base_value(self):
+        return I32.unpack_from(self.view, self.base_offset)[0]
+
+    @property
+    def value(self):
+        return I32.unpack_from(self.view, self.value_offset)[0]
+
+    @value.setter
+    def value(self, new_value):
+        I32.pack_into(self.view, self.value_offset, int(new_value))
 
 
 def is_placeholder_slot(slot):
     for stat_name in DISPLAY_ORDER:
         stat = slot["stats"][stat_name]
-        if stat["base_value"] != -1 or stat["value"] != -1:
+        if stat.base_value != -1 or stat.value != -1:
             return False
     return True
 
 
-def discover_stat_slots(data, include_placeholders=False):
-    stats_manager_offsets = find_all_offsets(data, STATS_MANAGER_FIELD)
+def discover_stat_slots(data, include_placeholders=False, index=None):
+    # Every marker lookup below is a bisect into one shared index of the payload.
+    if index is None:
+        index = MarkerIndex(data, SLOT_MARKERS)
+    stats_manager_offsets = index.all(STATS_MANAGER_FIELD)
+    view = memoryview(data)
     slots = []
 
     for idx, sm_offset in enumerate(stats_manager_offsets):
         block_end = stats_manager_offsets[idx + 1] if idx + 1 < len(stats_manager_offsets) else len(data)
-        block = data[sm_offset:block_end]
         slot_stats = {}
 
         complete = True
         for stat_name in DISCOVERY_ORDER:
             marker = STAT_FIELDS[stat_name]
-            rel_stat_offset = block.find(marker)
-            if rel_stat_offset == -1:
+            stat_offset = index.first(marker, sm_offset, block_end)
+            if stat_offset == -1:
                 complete = False
                 break
 
-            stat_offset = sm_offset + rel_stat_offset
-            base_marker_offset = data.find(BASE_OVERRIDE_FIELD, stat_offset, min(stat_offset + 220, len(data)))
+            base_marker_offset = index.first(BASE_OVERRIDE_FIELD, stat_offset, min(stat_offset + 220, len(data)))
             if base_marker_offset == -1:
                 complete = False
                 break
 
-            value_marker_offset = data.find(VALUE_FIELD, base_marker_offset + 1, min(stat_offset + 260, len(data)))
+            value_marker_offset = index.first(VALUE_FIELD, base_marker_offset + 1, min(stat_offset + 260, len(data)))
             if value_marker_offset == -1:
                 complete = False
                 break
 
-            base_value_offset = base_marker_offset + len(BASE_OVERRIDE_FIELD)
-            value_offset = value_marker_offset + len(VALUE_FIELD)
-
-            if value_offset + 4 > len(data) or base_value_offset + 4 > len(data):
+            stat = StatView(view, stat_offset, base_marker_offset, value_marker_offset)
+            if stat.value_offset + 4 > len(data) or stat.base_offset + 4 > len(data):
                 complete = False
                 break
 
-            slot_stats[stat_name] = {
-                "stat_marker_offset": stat_offset,
-                "base_marker_offset": base_marker_offset,
-                "value_marker_offset": value_marker_offset,
-                "base_offset": base_value_offset,
-                "value_offset": value_offset,
-                "base_value": read_i32(data, base_value_offset),
-                "value": read_i32(data, value_offset),
-            }
+            slot_stats[stat_name] = stat
 
         if not complete:
             continue
 
         level = None
-        rel_level_offset = block.find(CURRENT_LEVEL_FIELD)
-        if rel_level_offset != -1:
-            level_offset = sm_offset + rel_level_offset + len(CURRENT_LEVEL_FIELD)
+        level_marker_offset = index.first(CURRENT_LEVEL_FIELD, sm_offset, block_end)
+        if level_marker_offset != -1:
+            level_offset = level_marker_offset + len(CURRENT_LEVEL_FIELD)
             if level_offset + 4 <= len(data):
-                level = read_i32(data, level_offset)
+                level = I32.unpack_from(view, level_offset)[0]
 
         slot = {
             "stats_manager_offset": sm_offset,
@@ -207,8 +222,8 @@ def print_slots(slots, include_placeholders=False):
             stat = slot["stats"][stat_name]
             label = display_label(stat_name)
             print(
-                f"  {label:<12} base={stat['base_value']:>4} value={stat['value']:>4} "
-                f"(base@0x{stat['base_offset']:X}, value@0x{stat['value_offset']:X})"
+                f"  {label:<12} base={stat.base_value:>4} value={stat.value:>4} "
+                f"(base@0x{stat.base_offset:X}, value@0x{stat.value_offset:X})"
             )
 
 
@@ -238,6 +253,7 @@ def main():
     parser.add_argument("--current-cleverness", type=int, help="Current Cleverness value for safety check in slot mode.")
 
     parser.add_argument("--out", help="Output file path (default: <input>.stats.patched)")
+    add_compression_argument(parser)
     parser.add_argument("--dry-run", action="store_true", help="Don't save changes, just show what would be done")
     args = parser.parse_args()
 
@@ -248,7 +264,11 @@ def main():
         print(f"Error: {e}")
         sys.exit(1)
 
-    slots = discover_stat_slots(save.decompressed_data, include_placeholders=args.include_placeholders)
+    slots = discover_stat_slots(
+        save.decompressed_data,
+        include_placeholders=args.include_placeholders,
+        index=save.marker_index(SLOT_MARKERS),
+    )
     if not slots:
         print("Error: Could not discover any matching stat slots in this save.")
         if not args.include_placeholders:
@@ -289,7 +309,7 @@ def main():
         mismatches = []
         for stat_name in requested_stats:
             expected_current = current_stats[stat_name]
-            actual_current = selected_slot["stats"][stat_name]["value"]
+            actual_current = selected_slot["stats"][stat_name].value
             if expected_current != actual_current:
                 mismatches.append((display_label(stat_name), expected_current, actual_current))
 
@@ -317,19 +337,20 @@ def main():
             stat = slot["stats"][stat_name]
             label = display_label(stat_name)
             print(
-                f"  {label}: value {stat['value']} -> {target_value} "
-                f"(base stays {stat['base_value']})"
+                f"  {label}: value {stat.value} -> {target_value} "
+                f"(base stays {stat.base_value})"
             )
 
             if not args.dry_run:
-                write_i32(save.decompressed_data, stat["value_offset"], target_value)
+                stat.value = target_value
 
     if args.dry_run:
         print("Dry-run complete. No changes saved.")
         return
 
     out_path = args.out if args.out else args.save_file + ".stats.patched"
-    save.save(out_path)
+    save.save(out_path, compression=args.compression, jobs=args.jobs)
+    print(save.save_summary())
     print(f"Successfully saved to: {out_path}")
 
 
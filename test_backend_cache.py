@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend import cache
+from backend.cache import FileDigests, ScanCache
+from uese.core.universal_scanner import ScanCandidate
+
+
+def candidates(n, source=None):
+    return [ScanCandidate(i, 4, "u32", (1, 2, 3), source=source) for i in range(n)]
+
+
+class TestFileDigests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_digest_"))
+        self.addCleanup(shutil.rmtree, self.test_dir, True)
+
+    def test_digest_is_reused_until_stat_changes(self):
+        path = self.test_dir / "save.sav"
+        path.write_bytes(b"A" * 100)
+        digests = FileDigests()
+        first = digests.digest(path)
+        st = path.stat()
+
+        # Same size and mtime: answered from the stat key without reading the file.
+        path.write_bytes(b"B" * 100)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(digests.digest(path), first)
+        path.write_bytes(b"B" * 101)
+        self.assertNotEqual(digests.digest(path), first)
+
+
+class TestScanCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_scan_cache_"))
+        self.addCleanup(shutil.rmtree, self.test_dir, True)
+        self.saves = []
+        for i in range(3):
+            path = self.test_dir / f"save_{i}.sav"
+            path.write_bytes(bytes([i]) * 64)
+            self.saves.append(path)
+
+    def test_key_covers_content_and_parameters(self):
+        c = ScanCache()
+        key = c.key("values", self.saves, [1, 2, 3], width=4, dtype="auto", exclude=["png", "entropy"])
+        self.assertEqual(key, c.key("values", self.saves, [1, 2, 3], width=4, dtype="auto", exclude=["entropy", "png"]))
+        self.assertNotEqual(key, c.key("values", self.saves, [1, 2, 4], width=4, dtype="auto", exclude=["png"]))
+        self.assertNotEqual(key, c.key("deltas", self.saves, [1, 2, 3], width=4, dtype="auto", exclude=["png", "entropy"]))
+        # A copy of the same save under another name is the same scan.
+        copy = self.test_dir / "copy.sav"
+        shutil.copy(self.saves[0], copy)
+        self.assertEqual(key, c.key("values", [copy, *self.saves[1:]], [1, 2, 3], width=4, dtype="auto", exclude=["png", "entropy"]))
+
+    def test_lru_memory_cap_and_metrics(self):
+        c = ScanCache(max_entries=2, max_bytes=10 * cache.CANDIDATE_BYTES, ttl=60)
+        c.put("a", candidates(2))
+        c.put("b", candidates(2))
+        self.assertIsNotNone(c.get("a"))
+        c.put("c", candidates(2))
+        # "b" was the least recently used.
+        self.assertIsNone(c.get("b"))
+        c.put("d", candidates(9))
+        self.assertEqual(c.stats()["entries"], 1)
+        self.assertLessEqual(c.stats()["bytes"], c.max_bytes)
+        # The saves candidates point into count towards the cap.
+        c.put("big", candidates(1, source=bytes(20 * cache.CANDIDATE_BYTES)))
+        self.assertIsNone(c.get("big"))
+
+        stats = c.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 2, 3))
+
+    def test_entries_expire(self):
+        c = ScanCache(ttl=10)
+        with mock.patch.object(cache.time, "monotonic", return_value=100.0):
+            c.put("a", candidates(1))
+        with mock.patch.object(cache.time, "monotonic", return_value=105.0):
+            self.assertIsNotNone(c.get("a"))
+        with mock.patch.object(cache.time, "monotonic", return_value=111.0):
+            self.assertIsNone(c.get("a"))
+        self.assertEqual(c.stats()["expirations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
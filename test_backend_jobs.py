@@ -0,0 +1,217 @@
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.jobs import CANCELLED, DONE, FAILED, JobManager, QueueFull
+from uese.core.patch_engine import PatchEngine
+
+
+def wait_for(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.status not in (DONE, FAILED, CANCELLED):
+        if time.time() > deadline:
+            raise AssertionError(f"job still {job.status}")
+        time.sleep(0.01)
+    return job
+
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.jobs = JobManager(max_workers=1, max_queued=1)
+        self.addCleanup(self.jobs.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def blocking(self, job):
+        while not self.release.wait(0.01):
+            job.report(0.5)
+        return "released"
+
+    def test_result_progress_and_failure(self):
+        def work(job, n):
+            for i in range(n):
+                job.report((i + 1) / n)
+            return n * 2
+
+        job = wait_for(self.jobs.submit("test", work, 4))
+        self.assertEqual((job.status, job.result, job.progress), (DONE, 8, 1.0))
+        failed = wait_for(self.jobs.submit("test", lambda job: 1 / 0))
+        self.assertEqual(failed.status, FAILED)
+        self.assertIn("division", failed.error)
+
+    def test_queue_depth_and_cancel(self):
+        running = self.jobs.submit("test", self.blocking)
+        queued = self.jobs.submit("test", self.blocking)
+        with self.assertRaises(QueueFull):
+            self.jobs.submit("test", self.blocking)
+
+        # A queued job is dropped at once and frees its slot.
+        self.assertEqual(self.jobs.cancel(queued.id).status, CANCELLED)
+        again = self.jobs.submit("test", self.blocking)
+        # A running job stops at its next progress report.
+        self.jobs.cancel(running.id)
+        self.assertEqual(wait_for(running).status, CANCELLED)
+        self.release.set()
+        self.assertEqual(wait_for(again).result, "released")
+        self.assertEqual(self.jobs.stats()["jobs"][CANCELLED], 2)
+
+    def test_finished_jobs_expire(self):
+        jobs = JobManager(max_workers=1, max_queued=0, keep_finished=2, job_ttl=60)
+        self.addCleanup(jobs.shutdown)
+        old, recent = jobs.completed("test", "old"), jobs.completed("test", "recent")
+        old.finished, recent.finished = 1000.0, 1050.0
+        with mock.patch("backend.jobs.time.time", return_value=1055.0):
+            self.assertIs(jobs.get(old.id), old)
+        # Expired jobs are dropped on lookup too, not only when new ones arrive.
+        with mock.patch("backend.jobs.time.time", return_value=1070.0):
+            self.assertIsNone(jobs.get(old.id))
+            self.assertEqual(jobs.list(), [recent])
+        recent.finished = time.time()
+        for _ in range(3):
+            jobs.completed("test", None)
+        self.assertEqual(len(jobs.list()), 2)
+        self.assertNotIn(recent, jobs.list())
+
+
+class TestScanEndpoint(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict("os.environ", {"UESE_CACHE": "0"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_backend_"))
+        self.addCleanup(shutil.rmtree, self.test_dir, True)
+        rng = random.Random(21)
+        base = bytes(rng.randrange(0, 8) for _ in range(8192))
+        self.saves = []
+        for i, value in enumerate((500, 750, 1200)):
+            blob = bytearray(base)
+            blob[0x100:0x104] = value.to_bytes(4, "little")
+            path = self.test_dir / f"save_{i}.sav"
+            path.write_bytes(bytes(blob))
+            self.saves.append(str(path))
+        self.client = TestClient(main.app)
+        main.scan_cache.clear()
+
+    def poll(self, job_id):
+        for _ in range(1000):
+            body = self.client.get(f"/jobs/{job_id}").json()
+            if body["status"] in (DONE, FAILED, CANCELLED):
+                return body
+            time.sleep(0.01)
+        raise AssertionError("scan job never finished")
+
+    def test_scan_returns_job_and_result(self):
+        resp = self.client.post("/scan", json={"saves": self.saves, "values": [500, 750, 1200], "exclude": ["none"]})
+        self.assertEqual(resp.status_code, 202)
+        body = self.poll(resp.json()["job_id"])
+        self.assertEqual(body["status"], DONE)
+        self.assertEqual(body["progress"], 1.0)
+        self.assertIn(0x100, [c["offset"] for c in body["result"]])
+
+        # The same scan again is answered from the cache, already finished.
+        hits = main.scan_cache.stats()["hits"]
+        again = self.client.post("/scan", json={"saves": self.saves, "values": [500, 750, 1200], "exclude": ["none"]})
+        self.assertEqual((again.json()["status"], again.json()["cached"]), (DONE, True))
+        self.assertEqual(self.client.get("/cache/stats").json()["hits"], hits + 1)
+        self.assertEqual(self.poll(again.json()["job_id"])["result"], body["result"])
+
+        self.assertEqual(self.client.get("/jobs/missing").status_code, 404)
+        resp = self.client.post("/scan", json={"saves": self.saves[:1], "values": [500]})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_save_changed_during_scan_is_not_cached(self):
+        scan_series = main.scanner.scan_series
+
+        def rewrite_then_scan(saves, *args, **kwargs):
+            Path(saves[0]).write_bytes(Path(saves[0]).read_bytes() + b"\0")
+            return scan_series(saves, *args, **kwargs)
+
+        req = {"saves": self.saves, "values": [500, 750, 1200], "exclude": ["none"]}
+        with mock.patch.object(main.scanner, "scan_series", side_effect=rewrite_then_scan):
+            self.assertEqual(self.poll(self.client.post("/scan", json=req).json()["job_id"])["status"], DONE)
+        self.assertEqual(main.scan_cache.stats()["entries"], 0)
+        # The next request hashes the new content and scans (and caches) it for real.
+        self.assertFalse(self.client.post("/scan", json=req).json()["cached"])
+
+    def test_result_pages_and_ndjson_stream(self):
+        resp = self.client.post("/scan", json={"saves": self.saves, "values": [0, 0, 0], "width": 2, "exclude": ["none"]})
+        job_id = resp.json()["job_id"]
+        self.poll(job_id)
+        everything = self.client.get(f"/jobs/{job_id}", params={"top": 100_000}).json()
+        total, result = everything["total"], everything["result"]
+        self.assertGreater(total, 20)
+        self.assertEqual(len(result), total)
+
+        page = self.client.get(f"/jobs/{job_id}", params={"offset": 5, "top": 10}).json()
+        self.assertEqual(page["result"], result[5:15])
+        self.assertTrue(page["result"][0]["context_hex"])
+        cutoff = result[total // 2]["score"]
+        best = self.client.get(f"/jobs/{job_id}", params={"min_score": cutoff}).json()
+        self.assertEqual(best["total"], sum(c["score"] >= cutoff for c in result))
+
+        stream = self.client.get(f"/jobs/{job_id}/candidates", params={"offset": 3})
+        self.assertEqual(stream.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(stream.headers["x-total-count"], str(total))
+        self.assertEqual([json.loads(line) for line in stream.text.splitlines()], result[3:])
+
+    def test_delta_scan_runs_as_cached_job(self):
+        req = {"saves": self.saves, "deltas": [250, 450], "exclude": ["none"]}
+        resp = self.client.post("/scan/delta", json=req)
+        self.assertEqual(resp.status_code, 202)
+        body = self.poll(resp.json()["job_id"])
+        self.assertEqual(body["kind"], "scan-delta")
+        hit = [c for c in body["result"] if c["offset"] == 0x100 and c["dtype"] == "u32"]
+        self.assertEqual(hit[0]["values"], [500, 750, 1200])
+        self.assertTrue(self.client.post("/scan/delta", json=req).json()["cached"])
+        # Deltas are keyed apart from values that happen to be equal.
+        resp = self.client.post("/scan", json={"saves": self.saves[:2], "values": [250, 450], "exclude": ["none"]})
+        self.assertFalse(resp.json()["cached"])
+
+        resp = self.client.post("/scan/delta", json={"saves": self.saves, "deltas": [250]})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_patch_batch_writes_each_file_once(self):
+        engine = PatchEngine(backup_dir=self.test_dir / "backups")
+        patcher = mock.patch.object(main, "patcher", engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        a, b, c = self.saves
+        same_as_a = str(Path(a).parent / "." / Path(a).name)
+        resp = self.client.post(
+            "/patch/batch",
+            json={
+                "files": [
+                    {"filepath": a, "edits": [{"offset": 0x100, "value": 999999}]},
+                    {"filepath": b, "edits": [{"offset": 0x10, "value": 7, "width": 2}]},
+                    {"filepath": same_as_a, "edits": [{"offset": 0x200, "value": 1}]},
+                    {"filepath": c, "edits": [{"offset": 1 << 20, "value": 1}]},
+                ]
+            },
+        )
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        self.assertEqual(body["status"], "partial")
+        self.assertEqual([f["status"] for f in body["files"]], ["success", "success", "error"])
+        # Both edits to the first save landed in one write with one backup.
+        self.assertEqual(len(body["files"][0]["edits"]), 2)
+        self.assertEqual(len(engine.backups.entries(Path(a))), 1)
+        blob = Path(a).read_bytes()
+        self.assertEqual(int.from_bytes(blob[0x100:0x104], "little"), 999999)
+        self.assertEqual(int.from_bytes(blob[0x200:0x204], "little"), 1)
+        self.assertEqual(Path(b).read_bytes()[0x10:0x12], b"\x07\x00")
+
+        resp = self.client.post("/patch/batch", json={"files": [{"filepath": str(self.test_dir / "nope.sav"), "edits": []}]})
+        self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,9 @@ import zlib
 import unittest
 import subprocess
 import shutil
-from naheulbeuk_patch import NaheulbeukSave
+from unittest import mock
+from naheulbeuk_patch import COMPRESSION_MODES, MarkerIndex, NaheulbeukSave
+from uese.core import payload_cache
 
 class TestNaheulbeukPatchers(unittest.TestCase):
     def setUp(self):
@@ -11,6 +13,14 @@ class TestNaheulbeukPatchers(unittest.TestCase):
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
         os.makedirs(self.test_dir)
+        # Subprocesses inherit the patched environment; in-process loads get a
+        # fresh cache singleton in the test dir that is dropped afterwards.
+        for patcher in (
+            mock.patch.dict("os.environ", {"UESE_CACHE_DIR": os.path.join(self.test_dir, "cache")}),
+            mock.patch.object(payload_cache, "_default_cache", None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
         
         self.save_path = os.path.join(self.test_dir, "test_save.sav")
         self.create_dummy_save(self.save_path)
@@ -166,6 +176,25 @@ class TestNaheulbeukPatchers(unittest.TestCase):
         self.assertNotEqual(result.returncode, 0)
         self.assertIn("Multiple 'm_gold' fields found", result.stdout)
 
+    def test_marker_at_payload_end_is_not_a_field(self):
+        header = b'UNITY'
+        payload = b'm_gold' + (500).to_bytes(4, 'little') + b'm_gold\x01\x02'
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        with open(self.save_path, 'wb') as f:
+            f.write(header + compressor.compress(payload) + compressor.flush())
+
+        save = NaheulbeukSave(self.save_path)
+        save.load()
+        gold = save.find_fields(b'm_gold')
+        self.assertEqual([c.current_value for c in gold], [500])
+        self.assertEqual(gold[-1].marker_offset, 0)
+        with self.assertRaises(IndexError):
+            gold[1]
+
+        cmd = ["python3", "patch_gold.py", self.save_path, "9999", "--current", "500"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+
     def test_perks_patch_player(self):
         # Patch Entity 1: 1,2,3 -> 99
         cmd = ["python3", "patch_perks.py", self.save_path, "99", 
@@ -336,5 +365,125 @@ class TestNaheulbeukPatchers(unittest.TestCase):
         self.assertIn("Dry-run complete", result.stdout)
         self.assertFalse(os.path.exists(self.save_path + ".stats.patched"))
 
+    def test_marker_index_matches_find(self):
+        data = b'xm_valuem_value_m_baseValueOverridem_valueMaxm_v' * 3
+        markers = (b'm_value', b'm_valueMax', b'm_baseValueOverride', b'ValueO', b'm_v')
+        index = MarkerIndex(data, markers)
+        for marker in markers:
+            expected = [i for i in range(len(data)) if data.startswith(marker, i)]
+            self.assertEqual(index.all(marker), expected)
+        self.assertEqual(index.first(b'm_value', 2), data.find(b'm_value', 2))
+        end = data.find(b'm_valueMax') + len(b'm_valueMax')
+        self.assertEqual(index.first(b'm_valueMax', 0, end - 1), -1)
+        self.assertEqual(index.first(b'm_valueMax', 0, end), data.find(b'm_valueMax', 0, end))
+
+    def test_marker_index_fed_in_pieces(self):
+        data = b'xm_valuem_value_m_baseValueOverridem_valueMaxm_v' * 3
+        markers = (b'm_value', b'm_valueMax', b'm_baseValueOverride', b'm_v')
+        whole = MarkerIndex(data, markers)
+        for size in (1, 5, 13):
+            pieces = MarkerIndex(b'', markers)
+            for start in range(0, len(data), size):
+                pieces.feed(data[start:start + size])
+            pieces.finish()
+            self.assertEqual(pieces.offsets, whole.offsets)
+
+    def test_streaming_load_matches_regular_load(self):
+        regular = NaheulbeukSave(self.save_path)
+        regular.load(streaming=False)
+        for spill in (False, True):
+            with NaheulbeukSave(self.save_path) as save:
+                save.load(streaming=True, spill=spill)
+                self.assertEqual(bytes(save.decompressed_data), bytes(regular.decompressed_data))
+                self.assertEqual((save.header, save.trailing_data), (regular.header, regular.trailing_data))
+                self.assertEqual(save.marker_index().offsets, regular.marker_index().offsets)
+                save.patch_candidate(save.find_fields(b'm_gold')[1], 77)
+                out_path = os.path.join(self.test_dir, 'streamed.sav')
+                save.save(out_path)
+                patched = NaheulbeukSave(out_path)
+                patched.load()
+                self.assertEqual([c.current_value for c in patched.find_fields(b'm_gold')], [500, 77])
+                self.assertEqual(patched.trailing_data, b'END_MAGIC')
+            self.assertEqual(save.decompressed_data, bytearray())
+
+        # Loading again unmaps the previous spill, even with FieldViews still around.
+        save = NaheulbeukSave(self.save_path)
+        save.load(spill=True)
+        first, gold = save.decompressed_data, save.find_fields(b'm_gold')
+        self.assertEqual(gold[0].current_value, 500)
+        save.load(spill=True)
+        self.assertTrue(first.closed)
+        save.close()
+        with self.assertRaises(ValueError):
+            NaheulbeukSave(self.save_path).load(streaming=True, max_size=100)
+
+    def test_find_fields_uses_shared_index(self):
+        save = NaheulbeukSave(self.save_path)
+        save.load()
+        gold = save.find_fields(b'm_gold')
+        self.assertEqual([c.current_value for c in gold], [500, 1000])
+        index = save.marker_index()
+        self.assertIs(save.marker_index((b'm_statsPoints',)), index)
+        self.assertEqual(len(save.find_fields(b'between_')), 2)
+        self.assertIsNot(save.marker_index(), index)
+
+    def test_field_views_write_through(self):
+        save = NaheulbeukSave(self.save_path)
+        save.load()
+        gold = save.find_fields(b'm_gold')
+        self.assertIs(gold.marker_offsets, save.marker_index().all(b'm_gold'))
+        save.patch_candidate(gold[1], 4242)
+        offset = gold[1].value_offset
+        self.assertEqual(save.decompressed_data[offset:offset + 4], (4242).to_bytes(4, 'little'))
+        self.assertEqual([c.current_value for c in save.find_fields(b'm_gold')], [500, 4242])
+        self.assertEqual([c.marker_offset for c in gold[::-1]], gold.marker_offsets[::-1])
+
+    def test_save_compression_modes(self):
+        save = NaheulbeukSave(self.save_path)
+        save.load()
+        out_path = os.path.join(self.test_dir, 'roundtrip.sav')
+        # The dummy stream was written at level 9; 'match' finds that and
+        # reproduces the original file exactly.
+        save.save(out_path)
+        self.assertEqual(save.deflate_params().level, 9)
+        with open(self.save_path, 'rb') as original, open(out_path, 'rb') as rewritten:
+            self.assertEqual(rewritten.read(), original.read())
+        self.assertEqual(save.last_save['size'], save.last_save['original_size'])
+
+        save.patch_candidate(save.find_fields(b'm_gold')[0], 1234)
+        for compression, level in (('fast', 1), (4, 4), ('match', 9)):
+            save.save(out_path, compression=compression)
+            self.assertEqual(save.last_save['level'], level)
+            patched = NaheulbeukSave(out_path)
+            patched.load()
+            self.assertEqual(patched.decompressed_data, save.decompressed_data)
+            self.assertEqual(patched.trailing_data, b'END_MAGIC')
+        # Nothing changed since the last save: the whole stream is reused.
+        save.save(out_path)
+        self.assertEqual(save.last_save['reused'], len(save.decompressed_data))
+        with self.assertRaises(ValueError):
+            save.save(out_path, compression='ultra')
+
+    def test_jobs_must_not_be_negative(self):
+        cmd = ["python3", "patch_gold.py", self.save_path, "9999", "--current", "500", "--jobs", "-1"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--jobs", result.stderr)
+        self.assertFalse(os.path.exists(self.save_path + ".patched"))
+
+        # A single-threaded run is timed once, not twice.
+        result = subprocess.run(["python3", "naheulbeuk_patch.py", self.save_path, "--jobs", "1"], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.count(" -j1 "), len(COMPRESSION_MODES))
+
+    def test_group_records_attaches_nearest_following_fields(self):
+        save = NaheulbeukSave(self.save_path)
+        save.load()
+        records = save.group_records(b'm_gold', [b'm_statsPoints', b'm_currentLevel'], max_distance=100)
+        self.assertEqual([r[b'm_gold'].current_value for r in records], [500, 1000])
+        self.assertEqual([r[b'm_statsPoints'].current_value for r in records], [3, 0])
+        # The level markers sit in the stats slots, too far from either gold record.
+        self.assertEqual([r[b'm_currentLevel'] for r in records], [None, None])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,116 @@
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from uese.core import backup_store
+from uese.core.backup_store import BackupStore, apply_delta, make_delta
+
+
+class TestBackupStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_backups_"))
+        self.store = BackupStore(self.test_dir / "store")
+        self.save = self.test_dir / "save.sav"
+        self.original = random.Random(7).randbytes(200_000)
+        self.save.write_bytes(self.original)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def object_bytes(self):
+        return sum(p.stat().st_size for p in (self.test_dir / "store" / "objects").glob("*/*"))
+
+    def test_versions_are_stored_as_small_deltas(self):
+        first = self.store.add(self.save)
+        full_size = self.object_bytes()
+        patched = bytearray(self.original)
+        patched[0x10:0x14] = b"\xff" * 4
+        patched[150_000:150_002] = b"\x00\x01"
+        self.save.write_bytes(bytes(patched))
+        second = self.store.add(self.save)
+
+        self.assertLess(self.object_bytes() - full_size, 200)
+        self.assertEqual(self.store.load(first.sha256), self.original)
+        self.assertEqual(self.store.load(second.sha256), bytes(patched))
+
+        # Identical content is only indexed again, never stored twice.
+        before = self.object_bytes()
+        third = self.store.add(self.save)
+        self.assertEqual((third.id, third.sha256), (3, second.sha256))
+        self.assertEqual(self.object_bytes(), before)
+
+    def test_restore_backs_up_current_content(self):
+        first = self.store.add(self.save)
+        self.save.write_bytes(b"overwritten")
+        self.assertEqual(self.store.restore(first.id), self.save.resolve())
+        self.assertEqual(self.save.read_bytes(), self.original)
+        latest = self.store.entries(self.save)[-1]
+        self.assertEqual(self.store.load(latest.sha256), b"overwritten")
+        with self.assertRaises(ValueError):
+            self.store.restore(99)
+
+    def test_prune_keeps_delta_bases(self):
+        data = bytearray(self.original)
+        for i in range(5):
+            data[i] = 0xEE
+            self.save.write_bytes(bytes(data))
+            self.store.add(self.save)
+        self.assertEqual(self.store.prune(keep_last=2), 3)
+        kept = self.store.entries()
+        self.assertEqual([e.id for e in kept], [4, 5])
+        # Both survivors are deltas against the pruned first version.
+        for entry in kept:
+            self.assertEqual(len(self.store.load(entry.sha256)), len(self.original))
+        self.assertEqual(len(list((self.test_dir / "store" / "objects").glob("*/*"))), 3)
+
+    def test_concurrent_adds_keep_every_backup(self):
+        def add_versions(n):
+            # A store per thread, like separate requests; they share the root's lock.
+            store = BackupStore(self.test_dir / "store") if n % 2 else self.store
+            save = self.test_dir / f"save_{n}.sav"
+            return [store.add(save, bytes([n, i]) + self.original[2:]) for i in range(5)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            added = [entry for entries in pool.map(add_versions, range(8)) for entry in entries]
+        entries = self.store.entries()
+        self.assertEqual(sorted(e.id for e in entries), list(range(1, 41)))
+        self.assertEqual(sorted(e.sha256 for e in entries), sorted(e.sha256 for e in added))
+        for entry in entries:
+            self.assertEqual(self.store.load(entry.sha256)[2:], self.original[2:])
+
+    def test_gc_reads_bases_from_the_index(self):
+        data = bytearray(self.original)
+        for i in range(4):
+            data[i] = 0xEE
+            self.save.write_bytes(bytes(data))
+            self.store.add(self.save)
+        first = self.store.entries()[0]
+        self.assertEqual(first.base, "")
+        self.assertEqual({e.base for e in self.store.entries()[1:]}, {first.sha256})
+
+        # Pruning touches no object contents at all.
+        with mock.patch.object(backup_store.zlib, "decompress", side_effect=AssertionError), mock.patch.object(
+            BackupStore, "_read_header", side_effect=AssertionError
+        ):
+            self.assertEqual(self.store.prune(keep_last=2), 2)
+
+        # An index from before bases were recorded still keeps delta bases alive.
+        index = self.test_dir / "store" / "index.json"
+        legacy = [{k: v for k, v in e.items() if k != "base"} for e in json.loads(index.read_text())]
+        index.write_text(json.dumps(legacy))
+        self.assertEqual(self.store.prune(keep_last=1), 1)
+        self.assertEqual(len(self.store.load(self.store.entries()[0].sha256)), len(self.original))
+
+    def test_delta_round_trip(self):
+        base = self.original
+        for target in (base, base[:100] + b"x" * 10 + base[300:], base + b"tail", b"", base[::-1]):
+            self.assertEqual(apply_delta(base, make_delta(base, target)), target)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import gzip
+import io
+import random
+import unittest
+import zlib
+
+from uese.core.compression import (
+    DeflateParams,
+    IncrementalDeflater,
+    crc32_combine,
+    deflate_parallel,
+    detect_deflate_params,
+    deflate_raw,
+    gzip_header,
+    gzip_member,
+    write_gzip_member,
+)
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        words = [rng.randbytes(rng.randint(2, 12)) for _ in range(400)]
+        self.payload = b"".join(rng.choice(words) for _ in range(120_000))
+
+    def test_crc32_combine(self):
+        for a, b in ((b"abc", b"defg"), (b"", b"x"), (b"q", b""), (self.payload[:999], self.payload[999:])):
+            self.assertEqual(crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b)), zlib.crc32(a + b))
+
+    def test_parallel_member_is_one_valid_gzip_stream(self):
+        for payload in (self.payload, b"", b"short"):
+            with self.subTest(size=len(payload)):
+                member = gzip_member(payload, 6, jobs=4)
+                self.assertEqual(gzip.decompress(member), payload)
+        stream, crc = deflate_parallel(self.payload, DeflateParams(1), jobs=3, block_size=50_000)
+        self.assertEqual(zlib.decompress(stream, -zlib.MAX_WBITS), self.payload)
+        self.assertEqual(crc, zlib.crc32(self.payload))
+        # Dictionaries carry matches across blocks, so the cost of splitting stays small.
+        self.assertLess(len(stream), len(deflate_raw(self.payload, 1)) * 1.02)
+
+    def test_written_member_matches_gzip_member(self):
+        for payload in (self.payload, b""):
+            with self.subTest(size=len(payload)):
+                out = io.BytesIO()
+                size = write_gzip_member(out, payload, gzip_header(6), DeflateParams(6), chunk_size=10_000)
+                self.assertEqual(out.getvalue(), gzip_member(payload, 6))
+                self.assertEqual(size, len(out.getvalue()))
+
+    def test_incremental_deflater_reuses_unchanged_prefix(self):
+        deflater = IncrementalDeflater(DeflateParams(6), checkpoint_bytes=100_000)
+        self.assertEqual(deflater.deflate(self.payload), deflate_raw(self.payload, 6))
+        self.assertEqual(deflater.reused, 0)
+
+        patched = bytearray(self.payload)
+        patched[650_000:650_004] = b"\xde\xad\xbe\xef"
+        shorter = patched[:-5000]
+        for payload, reused in ((patched, 600_000), (shorter, 800_000), (shorter, len(shorter))):
+            with self.subTest(size=len(payload), reused=reused):
+                # Identical to a full pass, but only the tail was recompressed.
+                self.assertEqual(deflater.deflate(payload), deflate_raw(bytes(payload), 6))
+                self.assertEqual(deflater.reused, reused)
+                self.assertEqual(deflater.crc, zlib.crc32(payload))
+
+    def test_detect_deflate_params(self):
+        for params in (DeflateParams(6), DeflateParams(1), DeflateParams(9, 9), DeflateParams(4, 8, zlib.Z_FILTERED)):
+            with self.subTest(params=params):
+                stream = deflate_raw(self.payload, params=params)
+                # Several settings can produce the same stream; any of them is a match.
+                found = detect_deflate_params(self.payload, stream)
+                self.assertEqual(deflate_raw(self.payload, params=found), stream)
+        self.assertIsNone(detect_deflate_params(self.payload, b"\x00" * 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
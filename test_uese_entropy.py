@@ -0,0 +1,35 @@
+import random
+import unittest
+
+from uese.core.entropy import entropy_profile, high_entropy_regions, shannon_entropy
+
+
+class TestEntropyProfile(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(99)
+        self.data = bytes(8192) + bytes(rng.randrange(256) for _ in range(8192)) + b"abcd" * 2048
+
+    def test_profile_matches_direct_entropy(self):
+        for window, step in [(1024, 1), (1024, 100), (1024, 512), (1024, 1024), (512, 2000)]:
+            with self.subTest(window=window, step=step):
+                profile = entropy_profile(self.data, window, step)
+                offsets = list(range(0, len(self.data) - window + 1, step))
+                self.assertEqual([o for o, _ in profile], offsets)
+                for offset, ent in profile[:: max(1, len(profile) // 50)]:
+                    self.assertAlmostEqual(ent, shannon_entropy(self.data[offset:offset + window]), places=9)
+
+    def test_short_input(self):
+        self.assertEqual(entropy_profile(b"abc", 4096, 1), [])
+        self.assertEqual(shannon_entropy(b""), 0.0)
+
+    def test_fine_step_tightens_region_boundaries(self):
+        coarse = high_entropy_regions(self.data, 1024, 1024, 7.5)
+        fine = high_entropy_regions(self.data, 1024, 1, 7.5)
+        self.assertEqual(coarse, [(8192, 16384)])
+        self.assertEqual(len(fine), 1)
+        self.assertLessEqual(abs(fine[0][0] - 8192), 256)
+        self.assertLessEqual(abs(fine[0][1] - 16384), 256)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import struct
+import unittest
+
+from uese.parsers import Field, Node, OdinDocument
+
+
+def text(value, wide=False):
+    raw = value.encode("utf-16-le" if wide else "latin-1")
+    return bytes([wide]) + struct.pack("<i", len(value)) + raw
+
+
+def named(entry, name, body=b""):
+    return bytes([entry]) + text(name) + body
+
+
+def block(*entries):
+    stream = b"".join(entries) + b"\x31"
+    return struct.pack("<q", len(stream)) + stream
+
+
+def stat(key, value, type_entry):
+    # One {$k, $v} dictionary entry holding a CharacterStatistic-like struct.
+    return (
+        b"\x04\x2e"
+        + named(0x27, "$k", text(key))
+        + named(0x01, "$v", type_entry + struct.pack("<i", 7))
+        + named(0x17, "m_baseValueOverride", struct.pack("<i", -1))
+        + named(0x1F, "m_value", struct.pack("<f", value))
+        + b"\x05\x05"
+    )
+
+
+class TestOdinParser(unittest.TestCase):
+    def setUp(self):
+        character = b"\x2f" + struct.pack("<i", 3) + text("CharacterStatistic")
+        self.payload = bytearray(
+            block(
+                b"\x02\x2f" + struct.pack("<i", 0) + text("Save") + struct.pack("<i", 0),
+                named(0x17, "m_gold", struct.pack("<i", 500)),
+                named(0x27, "m_name", text("Zangdar", wide=True)),
+                named(0x2B, "m_dead", b"\x00"),
+                named(0x01, "m_serializedProperties", b"\x2e" + struct.pack("<i", 1)),
+                b"\x06" + struct.pack("<q", 2),
+                stat("m_agility", 12.0, character),
+                stat("m_strength", 9.0, b"\x30" + struct.pack("<i", 3)),
+                b"\x07\x05",
+                b"\x08" + struct.pack("<ii", 2, 2) + b"\x01\x00\x02\x00",
+                b"\x05",
+            )
+            + block(b"\x02\x2e" + struct.pack("<i", 0), named(0x2D, "m_null"), b"\x05")
+        )
+
+    def test_paths_values_and_offsets(self):
+        doc = OdinDocument(self.payload)
+        self.assertEqual(len(doc.roots), 2)
+        root = doc.roots[0]
+        self.assertEqual((root.kind, root.type_name, root.ref_id), ("reference", "Save", 0))
+
+        gold = doc.path("m_gold")
+        self.assertEqual((gold.kind, gold.value), ("int", 500))
+        self.assertEqual(self.payload[gold.value_offset:gold.value_offset + 4], struct.pack("<i", 500))
+        self.assertEqual(doc.path("m_name").value, "Zangdar")
+        self.assertIs(doc.path("m_dead").value, False)
+        self.assertIsNone(doc.path("m_null").value)
+
+        # Dictionary entries are keyed by $k; TypeID entries resolve to the
+        # name defined earlier in the same stream.
+        props = doc.path("m_serializedProperties")
+        self.assertEqual(props.keys()[-2:], ["m_agility", "m_strength"])
+        strength = props["m_strength"]
+        self.assertIsInstance(strength, Node)
+        self.assertEqual(strength.type_name, "CharacterStatistic")
+        self.assertEqual(doc.path("m_serializedProperties", "m_agility", "m_value").value, 12.0)
+
+        flags = [child for child in root.children if isinstance(child, Field) and child.kind == "primitive_array"]
+        self.assertEqual(flags[0].value, b"\x01\x00\x02\x00")
+        self.assertEqual(sum(1 for _ in doc.walk()), 19)
+
+    def test_value_setter_writes_through(self):
+        doc = OdinDocument(self.payload)
+        doc.path("m_serializedProperties", "m_strength", "m_value").value = 18.5
+        doc.path("m_gold").value = 99999
+        fresh = OdinDocument(bytes(self.payload))
+        self.assertEqual(fresh.path("m_serializedProperties", "m_strength", "m_value").value, 18.5)
+        self.assertEqual(fresh.path("m_gold").value, 99999)
+        with self.assertRaises(ValueError):
+            doc.path("m_name").value = "Reivax"
+        with self.assertRaises(KeyError):
+            doc.path("m_gold", "m_value")
+
+    def test_rejects_malformed_streams(self):
+        for payload in (
+            block(b"\x02\x2e" + struct.pack("<i", 0)),
+            block(b"\x05"),
+            block(b"\x02\x2e" + struct.pack("<i", 0), b"\x60\x05"),
+            self.payload + b"\x00",
+        ):
+            with self.subTest(payload=payload[:16]), self.assertRaises(ValueError):
+                OdinDocument(payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
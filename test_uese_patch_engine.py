@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import zlib
+from pathlib import Path
+
+from uese.core.containers import find_containers
+from uese.core.patch_engine import PatchEdit, PatchEngine
+
+
+class TestPatchEngine(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict("os.environ", {"UESE_CACHE": "0"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_patch_"))
+        self.engine = PatchEngine(backup_dir=self.test_dir / "backups")
+        self.save = self.test_dir / "save.sav"
+        self.save.write_bytes(bytes(range(256)) * 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_patch_value(self):
+        self.engine.patch_value(self.save, 0x10, 4, 0xDEADBEEF)
+        self.assertTrue(self.engine.verify_patch(self.save, 0x10, 0xDEADBEEF, 4))
+        self.assertEqual(len(self.engine.backups.entries()), 1)
+
+    def test_patch_rejects_out_of_bounds(self):
+        with self.assertRaises(ValueError):
+            self.engine.patch_value(self.save, 1023, 2, 1, backup=False)
+        with self.assertRaises(ValueError):
+            self.engine.patch_value(self.save, 0, 2, 0x10000, backup=False)
+
+    def test_patch_values_is_one_transaction(self):
+        edits = [PatchEdit(0x10, 4, 0xDEADBEEF), PatchEdit(0x20, 2, 0xBEEF), PatchEdit(0x3FC, 4, 7)]
+        report = self.engine.patch_values(self.save, edits)
+        self.assertTrue(report.verified)
+        self.assertEqual(report.changes[1][1], bytes([0x20, 0x21]))
+        for edit in edits:
+            self.assertTrue(self.engine.verify_patch(self.save, edit.offset, edit.value, edit.width))
+        self.assertEqual(self.engine.backups.entries(), [report.backup])
+        self.assertEqual(self.engine.backups.load(report.backup.sha256), bytes(range(256)) * 4)
+        self.assertEqual(sorted(p.name for p in self.test_dir.iterdir()), ["backups", "save.sav"])
+
+    def test_patch_values_rejects_bad_batch_before_writing(self):
+        original = self.save.read_bytes()
+        for edits in (
+            [PatchEdit(0x10, 4, 1), PatchEdit(0x400, 2, 1)],
+            [PatchEdit(0x10, 4, 1), PatchEdit(0x12, 2, 1)],
+            [PatchEdit(0x10, 4, 1), PatchEdit(0x20, 2, 0x10000)],
+            [PatchEdit(0x10, 4, 1, container="gzip#0")],
+        ):
+            with self.subTest(edits=edits), self.assertRaises(ValueError):
+                self.engine.patch_values(self.save, edits)
+        self.assertEqual(self.save.read_bytes(), original)
+        self.assertEqual(self.engine.backups.entries(), [])
+
+    def test_patch_values_mixes_raw_and_container_edits(self):
+        payload = b"m_gold" + (500).to_bytes(4, "little") + b"m_rest" * 50
+        compressor = zlib.compressobj(1, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        stream = compressor.compress(payload) + compressor.flush()
+        self.save.write_bytes(b"HEAD" + stream + b"TAIL" + bytes(4))
+
+        edits = [PatchEdit(6, 4, 99999, container="gzip#0"), PatchEdit(len(stream) + 8, 4, 42), PatchEdit(0, 2, 0x4848)]
+        report = self.engine.patch_values(self.save, edits, backup=False)
+        self.assertTrue(report.verified)
+        raw = self.save.read_bytes()
+        self.assertEqual(raw[:4], b"HHAD")
+        self.assertEqual(raw[-8:], b"TAIL" + (42).to_bytes(4, "little"))
+        (container,) = find_containers(raw)
+        self.assertEqual(container.payload[:10], b"m_gold" + (99999).to_bytes(4, "little"))
+
+        with self.assertRaises(ValueError):
+            self.engine.patch_values(self.save, [PatchEdit(6, 4, 1, container="gzip#0"), PatchEdit(10, 4, 1)])
+
+    def test_patch_in_place_with_undo_journal(self):
+        original = self.save.read_bytes()
+        inode = self.save.stat().st_ino
+        report = self.engine.patch_in_place(self.save, [PatchEdit(0x10, 4, 0xDEADBEEF), PatchEdit(0x3FE, 2, 0xBEEF)])
+        self.assertTrue(report.verified)
+        self.assertEqual(self.save.stat().st_ino, inode)
+        self.assertTrue(self.engine.verify_patch(self.save, 0x3FE, 0xBEEF, 2))
+        self.assertTrue(report.journal.name.endswith(".undo.json"))
+
+        self.engine.undo(report.journal)
+        self.assertEqual(self.save.read_bytes(), original)
+        # The file no longer holds the patched bytes, so a second undo is refused.
+        with self.assertRaises(RuntimeError):
+            self.engine.undo(report.journal)
+
+    def test_patch_in_place_rejects_containers_and_bounds(self):
+        with self.assertRaises(ValueError):
+            self.engine.patch_in_place(self.save, [PatchEdit(0, 4, 1, container="gzip#0")])
+        with self.assertRaises(ValueError):
+            self.engine.patch_in_place(self.save, [PatchEdit(0x10, 4, 1), PatchEdit(0x3FF, 2, 1)])
+        self.assertEqual(self.save.read_bytes(), bytes(range(256)) * 4)
+        self.assertEqual(self.engine.backups.entries(), [])
+
+    def test_patch_inside_gzip_container(self):
+        payload = b"m_gold" + (500).to_bytes(4, "little") + b"m_rest" * 50
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        self.save.write_bytes(b"HEAD" + compressor.compress(payload) + compressor.flush() + b"TAIL")
+
+        self.engine.patch_value(self.save, 6, 4, 99999, backup=False, container="gzip#0")
+        self.assertTrue(self.engine.verify_patch(self.save, 6, 99999, 4, container="gzip#0"))
+        raw = self.save.read_bytes()
+        self.assertTrue(raw.startswith(b"HEAD") and raw.endswith(b"TAIL"))
+        (container,) = find_containers(raw)
+        self.assertEqual(container.payload[:10], b"m_gold" + (99999).to_bytes(4, "little"))
+
+        with self.assertRaises(ValueError):
+            self.engine.patch_value(self.save, 6, 4, 1, backup=False, container="gzip#3")
+
+
+if __name__ == "__main__":
+    unittest.main()
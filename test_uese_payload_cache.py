@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from uese.core import payload_cache
+from uese.core.payload_cache import PayloadCache, file_digest
+
+
+class TestPayloadCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_cache_"))
+        payload = b"m_gold" + (500).to_bytes(4, "little") + bytes(range(256)) * 64
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        self.payload = payload
+        self.data = b"HEADER" + compressor.compress(payload) + compressor.flush() + b"TRAILER"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_inflate_hits_disk_tier_without_zlib(self):
+        first = PayloadCache(self.test_dir).inflate(self.data, 6)
+        self.assertEqual(first.payload, self.payload)
+        self.assertEqual(self.data[first.end:], b"TRAILER")
+
+        with mock.patch.object(payload_cache.zlib, "decompressobj", side_effect=AssertionError("zlib used")):
+            second = PayloadCache(self.test_dir).inflate(self.data, 6)
+        self.assertEqual(second, first)
+
+    def test_memory_tier_is_lru_bounded(self):
+        cache = PayloadCache(self.test_dir, max_memory_bytes=10)
+        cache.put("a", b"12345", {})
+        cache.put("b", b"12345", {})
+        cache.get("a")
+        cache.put("c", b"12345", {})
+        self.assertEqual(list(cache._memory), ["a", "c"])
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        cache = PayloadCache(self.test_dir, max_disk_bytes=2500)
+        for key in ("old", "mid", "new"):
+            cache.put(key, bytes(1000), {})
+            bin_path = cache.cache_dir / f"{key}.bin"
+            stamp = {"old": 1000, "mid": 2000, "new": 3000}[key]
+            os.utime(bin_path, (stamp, stamp))
+        cache._evict_disk()
+        self.assertEqual(sorted(p.stem for p in cache.cache_dir.glob("*.bin")), ["mid", "new"])
+
+    def test_incomplete_stream_is_not_cached(self):
+        cache = PayloadCache(self.test_dir)
+        result = cache.inflate(self.data[:40], 6)
+        self.assertFalse(result.eof)
+        self.assertIsNone(cache.get(f"{file_digest(self.data[:40])}-6-{zlib.MAX_WBITS | 16}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
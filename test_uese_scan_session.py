@@ -0,0 +1,83 @@
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from uese.core import universal_scanner
+from uese.core.scan_session import ScanSession
+
+
+@unittest.skipIf(universal_scanner.np is None, "numpy not installed")
+class TestScanSession(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_session_"))
+        self.saves = []
+        for i, (gold, hp) in enumerate([(500, 40), (750, 40), (900, 35), (900, 60)]):
+            blob = bytearray(b"\x01\x02\x03\x04" * 2048)
+            blob[0x200:0x204] = gold.to_bytes(4, "little")
+            blob[0x402:0x404] = hp.to_bytes(2, "little")
+            path = self.test_dir / f"save_{i}.sav"
+            path.write_bytes(bytes(blob))
+            self.saves.append(path)
+        self.session_dir = self.test_dir / "session"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_exact_value_narrowing(self):
+        session = ScanSession.create(self.session_dir, self.saves[0], value=500)
+        self.assertGreater(session.count(), 0)
+        session = ScanSession.open(self.session_dir)
+        # Narrowing replaces the .npy files, so it must not hold them mapped.
+        np = universal_scanner.np
+        with mock.patch.object(np, "load", wraps=np.load) as load:
+            session.narrow(self.saves[1], value=750)
+        self.assertTrue(load.called)
+        self.assertEqual({call.kwargs.get("mmap_mode") for call in load.call_args_list}, {None})
+        session.narrow(self.saves[2], relation="increased")
+        self.assertEqual(session.narrow(self.saves[3], relation="unchanged"), 2)
+        candidates = session.candidates()
+        self.assertEqual({(c.offset, c.dtype) for c in candidates}, {(0x200, "u32"), (0x200, "s32")})
+        self.assertEqual(candidates[0].values, (500, 750, 900, 900))
+        self.assertEqual(len(candidates[0].diffs), 3)
+        # Same context as a scan over these saves shows: cut from the first one.
+        self.assertEqual(candidates[0].context_hex, universal_scanner.hexdump_context(self.saves[0].read_bytes(), 0x200))
+
+    def test_unknown_initial_value(self):
+        session = ScanSession.create(self.session_dir, self.saves[0], width=2, dtype="u16", exclude=["none"])
+        self.assertEqual(session.count(), 8192 - 1)
+        session.narrow(self.saves[1], relation="unchanged")
+        session.narrow(self.saves[2], delta=-5)
+        session.narrow(self.saves[3], relation="increased")
+        self.assertEqual([c.offset for c in session.candidates()], [0x402])
+
+    def test_narrow_requires_one_condition(self):
+        session = ScanSession.create(self.session_dir, self.saves[0], value=500)
+        with self.assertRaises(ValueError):
+            session.narrow(self.saves[1])
+        with self.assertRaises(ValueError):
+            session.narrow(self.saves[1], value=1, relation="increased")
+
+    def test_requires_numpy_engine(self):
+        scanner = universal_scanner.UniversalScanner(use_numpy=False)
+        with self.assertRaises(RuntimeError):
+            ScanSession.create(self.session_dir, self.saves[0], value=500, scanner=scanner)
+        with self.assertRaises(RuntimeError):
+            scanner.gather(b"abcd", [0], "u16")
+
+    def test_cli_session(self):
+        run = lambda *args: subprocess.run(
+            [sys.executable, "-m", "uese", "session", *args], capture_output=True, text=True
+        )
+        result = run("start", str(self.session_dir), "-s", str(self.saves[0]), "-v", "500")
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        result = run("next", str(self.session_dir), "-s", str(self.saves[1]), "-r", "increased")
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn("offset=0x200", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
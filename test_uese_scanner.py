@@ -0,0 +1,199 @@
+import random
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from uese.cli.commands import build_parser
+from uese.core import universal_scanner
+from uese.core.universal_scanner import PNG_MAGIC, RegionIndex, UniversalScanner
+
+
+class TestUniversalScanner(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict("os.environ", {"UESE_CACHE": "0"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_scanner_"))
+        self.saves = self.create_saves([(500, 750, 1200), (7, 9, 300)])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def create_saves(self, tracked):
+        rng = random.Random(1234)
+        base = bytearray(rng.randrange(0, 8) for _ in range(16384))
+        offsets = [0x100, 0x2203, 0x3ffc]
+        # Tiny PNG (IHDR + IEND) wrapped around the second tracked value.
+        png = PNG_MAGIC + (64).to_bytes(4, "big") + b"IHDR" + bytes(68) + bytes(4) + b"IEND" + bytes(4)
+        base[0x21E0:0x21E0 + len(png)] = png
+        paths = []
+        for i in range(len(tracked[0])):
+            blob = bytearray(base)
+            # A little per-save noise so scoring has something to count.
+            for _ in range(40):
+                blob[rng.randrange(len(blob))] = rng.randrange(256)
+            for offset, series in zip(offsets, tracked):
+                blob[offset:offset + 4] = series[i].to_bytes(4, "little")
+            path = self.test_dir / f"save_{i}.sav"
+            path.write_bytes(bytes(blob))
+            paths.append(path)
+        return paths
+
+    def scan(self, use_numpy, values, **kwargs):
+        scanner = UniversalScanner(use_numpy=use_numpy)
+        return scanner.scan_saves(*self.saves, values=values, **kwargs)
+
+    def test_finds_tracked_value(self):
+        candidates = self.scan(False, (500, 750, 1200), exclude=["none"])
+        self.assertIn(0x100, [c.offset for c in candidates if c.dtype in ("u32", "s32")])
+        hit = next(c for c in candidates if c.offset == 0x100)
+        # The hex context is only formatted once somebody reads it.
+        self.assertNotIn("context_hex", vars(hit))
+        self.assertTrue(hit.context_hex.startswith("0xf0..0x130 | "))
+
+    def test_png_region_is_excluded(self):
+        kept = self.scan(False, (7, 9, 300), width=2, exclude=["none"])
+        self.assertIn(0x2203, [c.offset for c in kept])
+        skipped = self.scan(False, (7, 9, 300), width=2, exclude=["png"])
+        self.assertNotIn(0x2203, [c.offset for c in skipped])
+
+    def test_region_index(self):
+        index = RegionIndex([(10, 20), (30, 40)])
+        self.assertNotIn(9, index)
+        self.assertIn(10, index)
+        self.assertNotIn(20, index)
+        self.assertIn(39, index)
+        self.assertEqual(list(index.allowed_spans(0, 50)), [(0, 10), (20, 30), (40, 50)])
+        self.assertEqual(list(index.allowed_spans(15, 35)), [(20, 30)])
+        self.assertEqual(list(RegionIndex([]).allowed_spans(0, 5)), [(0, 5)])
+
+    @unittest.skipIf(universal_scanner.np is None, "numpy not installed")
+    def test_numpy_engine_matches_python_loop(self):
+        for values, kwargs in [
+            ((500, 750, 1200), {"exclude": ["none"]}),
+            ((7, 9, 300), {"width": 2}),
+            ((7, 9, 300), {"width": 2, "exclude": ["png"]}),
+            ((0, 0, 0), {"dtype": "u16", "width": 2, "exclude": ["none"]}),
+            ((-1, 0, 1), {"dtype": "s32"}),
+        ]:
+            with self.subTest(values=values, **kwargs):
+                self.assertEqual(self.scan(True, values, **kwargs), self.scan(False, values, **kwargs))
+
+    def test_delta_scan_finds_tracked_value(self):
+        scanner = UniversalScanner(use_numpy=False)
+        candidates = scanner.scan_deltas(*self.saves, deltas=(250, 450), exclude=["none"])
+        hit = [c for c in candidates if c.offset == 0x100 and c.dtype == "u32"]
+        self.assertEqual(hit[0].values, (500, 750, 1200))
+
+    @unittest.skipIf(universal_scanner.np is None, "numpy not installed")
+    def test_numpy_delta_scan_matches_python_loop(self):
+        for deltas, kwargs in [
+            ((250, 450), {"exclude": ["none"]}),
+            ((2, 291), {"width": 2}),
+            ((0, 0), {"dtype": "s16", "width": 2}),
+            ((-5, 3), {"dtype": "u32"}),
+        ]:
+            with self.subTest(deltas=deltas, **kwargs):
+                expected = UniversalScanner(use_numpy=False).scan_deltas(*self.saves, deltas=deltas, **kwargs)
+                actual = UniversalScanner(use_numpy=True).scan_deltas(*self.saves, deltas=deltas, **kwargs)
+                self.assertEqual(actual, expected)
+
+    def test_series_with_more_saves(self):
+        saves = self.create_saves([(10, 20, 30, 40, 55), (3, 3, 4, 4, 5)])
+        for use_numpy in (False, True) if universal_scanner.np is not None else (False,):
+            with self.subTest(use_numpy=use_numpy):
+                scanner = UniversalScanner(use_numpy=use_numpy)
+                candidates = scanner.scan_series(saves, [10, 20, 30, 40, 55], exclude=["none"])
+                self.assertEqual([(c.offset, c.dtype) for c in candidates], [(0x100, "s32"), (0x100, "u32")])
+                self.assertEqual(len(candidates[0].diffs), 4)
+
+                deltas = scanner.scan_delta_series(saves, [0, 1, 0, 1], width=2, exclude=["none"])
+                hit = [c for c in deltas if c.offset == 0x2203 and c.dtype == "u16"]
+                self.assertEqual(hit[0].values, (3, 3, 4, 4, 5))
+
+    def test_parallel_chunks_match_single_job(self):
+        # 4354-byte chunks put a boundary at 0x2204, inside the value tracked at 0x2203.
+        engines = (False, True) if universal_scanner.np is not None else (False,)
+        with mock.patch.object(universal_scanner, "MIN_CHUNK_BYTES", 4354):
+            for use_numpy in engines:
+                for jobs in (3, 16):
+                    with self.subTest(use_numpy=use_numpy, jobs=jobs):
+                        single = UniversalScanner(use_numpy=use_numpy)
+                        parallel = UniversalScanner(use_numpy=use_numpy, jobs=jobs)
+                        for values in ((500, 750, 1200), (0, 0, 0), (7, 9, 300)):
+                            expected = single.scan_saves(*self.saves, values=values, dtype="u32", exclude=["none"])
+                            actual = parallel.scan_saves(*self.saves, values=values, dtype="u32", exclude=["none"])
+                            self.assertEqual(actual, expected)
+                        self.assertIn(0x2203, [c.offset for c in actual])
+                        deltas = parallel.scan_deltas(*self.saves, deltas=(2, 291), exclude=["none"])
+                        self.assertEqual(deltas, single.scan_deltas(*self.saves, deltas=(2, 291), exclude=["none"]))
+                        self.assertIn((0x2203, "u32"), [(c.offset, c.dtype) for c in deltas])
+
+    def test_concurrent_scans_share_one_scanner(self):
+        scanner = UniversalScanner(use_numpy=False)
+        expected = {
+            kind: scanner.scan_saves(*self.saves, values=(7, 9, 300), width=2, exclude=[kind])
+            for kind in ("none", "png")
+        }
+        # Yielding between dtypes interleaves the scans, so any state shared
+        # on the scanner would leak from one call into another.
+        def scan(kind):
+            progress = lambda fraction: time.sleep(0.001)
+            return kind, scanner.scan_saves(*self.saves, values=(7, 9, 300), width=2, exclude=[kind], progress=progress)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for kind, found in pool.map(scan, ["none", "png"] * 4):
+                self.assertEqual(found, expected[kind])
+        self.assertNotEqual(expected["none"], expected["png"])
+
+    def test_explicit_entropy_step_is_not_replaced(self):
+        scanner = UniversalScanner(use_numpy=False)
+        with self.assertRaises(ValueError):
+            scanner._find_entropy_regions(bytes(8192), step=0)
+        parser = build_parser()
+        self.assertEqual(parser.parse_args(["scan", "-s", "a", "b", "-v", "1", "2", "--entropy-step", "1"]).entropy_step, 1)
+        for bad in ("0", "-4"):
+            with self.subTest(step=bad), mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                parser.parse_args(["scan", "-s", "a", "b", "-v", "1", "2", "--entropy-step", bad])
+
+    def test_cli_rejects_negative_jobs(self):
+        parser = build_parser()
+        self.assertEqual(parser.parse_args(["delta", "-s", "a", "b", "-d", "1", "-j", "0"]).jobs, 0)
+        for command in (["scan", "-s", "a", "b", "-v", "1", "2"], ["delta", "-s", "a", "b", "-d", "1"]):
+            with self.subTest(command=command[0]), mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                parser.parse_args([*command, "-j", "-1"])
+
+    def test_series_rejects_mismatched_lengths(self):
+        scanner = UniversalScanner(use_numpy=False)
+        with self.assertRaises(ValueError):
+            scanner.scan_series(self.saves, [1, 2])
+        with self.assertRaises(ValueError):
+            scanner.scan_delta_series(self.saves, [1, 2, 3])
+
+    def test_scan_inside_gzip_container(self):
+        saves = []
+        for i, gold in enumerate((120, 340, 560)):
+            payload = b"m_junk" * 300 + b"m_gold" + gold.to_bytes(4, "little") + b"m_tail" * 300
+            compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            path = self.test_dir / f"container_{i}.sav"
+            path.write_bytes(b"HEADER" * (i + 1) + compressor.compress(payload) + compressor.flush() + b"END")
+            saves.append(path)
+
+        scanner = UniversalScanner(use_numpy=False)
+        self.assertEqual(scanner.scan_series(saves, [120, 340, 560]), [])
+        candidates = scanner.scan_series(saves, [120, 340, 560], dtype="u32", containers=True)
+        self.assertEqual([(c.container, c.offset) for c in candidates], [("gzip#0", 1806)])
+        self.assertEqual(candidates[0].location, "gzip#0+0x70e")
+
+    def test_unsupported_dtype(self):
+        with self.assertRaises(ValueError):
+            self.scan(False, (1, 2, 3), dtype="f32")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import random
+import shutil
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+from uese.core.streaming import find_in_file, inflate_file
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="uese_stream_"))
+        rng = random.Random(5)
+        self.payload = b"".join(rng.choice([b"m_gold", b"\x00" * 40, rng.randbytes(9)]) for _ in range(20_000))
+        compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        self.stream = compressor.compress(self.payload) + compressor.flush()
+        self.save = self.test_dir / "save.sav"
+        self.save.write_bytes(b"HEADER" + self.stream + b"TRAILER")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_find_in_file_across_chunks(self):
+        self.assertEqual(find_in_file(self.save, b"\x1f\x8b\x08", chunk_size=4), 6)
+        self.assertEqual(find_in_file(self.save, b"TRAILER", chunk_size=5), len(self.stream) + 6)
+        self.assertEqual(find_in_file(self.save, b"missing", chunk_size=5), -1)
+
+    def test_inflate_file_in_chunks(self):
+        pieces = []
+        result = inflate_file(self.save, 6, chunk_size=1000, on_chunk=pieces.append)
+        self.assertTrue(result.eof)
+        self.assertEqual(result.data, self.payload)
+        self.assertEqual(b"".join(pieces), self.payload)
+        self.assertLessEqual(max(len(p) for p in pieces), 1000)
+        self.assertEqual(result.end, 6 + len(self.stream))
+
+    def test_spill_is_writable_and_cap_is_enforced(self):
+        result = inflate_file(self.save, 6, chunk_size=4096, spill=True)
+        self.assertEqual(result.data[:], self.payload)
+        result.data[0:6] = b"M_GOLD"
+        self.assertEqual(result.data[:6], b"M_GOLD")
+        result.close()
+
+        with self.assertRaises(ValueError):
+            inflate_file(self.save, 6, chunk_size=4096, max_size=len(self.payload) - 1)
+        self.save.write_bytes(b"HEADER" + self.stream[: len(self.stream) // 2])
+        self.assertFalse(inflate_file(self.save, 6, chunk_size=4096).eof)
+
+
+if __name__ == "__main__":
+    unittest.main()
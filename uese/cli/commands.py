@@ -6,7 +6,8 @@ import json
 import sys
 from pathlib import Path
 
-from uese.core.patch_engine import PatchEngine
+from uese.core.patch_engine import PatchEdit, PatchEngine
+from uese.core.scan_session import RELATIONS, ScanSession
 from uese.core.universal_scanner import UniversalScanner
 
 
@@ -14,11 +15,25 @@ def _parse_offset(value: str) -> int:
     return int(value, 16) if value.lower().startswith("0x") else int(value)
 
 
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or a positive integer, got {value}")
+    return number
+
+
 def _print_candidates(candidates, top: int) -> None:
     print(f"Found {len(candidates)} candidates")
     for i, c in enumerate(candidates[:top], 1):
-        print(f"{i:02d}. offset={c.offset:#x} width={c.width} dtype={c.dtype}")
-        print(f"    score={c.score} diffs(ab={c.diff_ab}, bc={c.diff_bc}) values={c.values}")
+        print(f"{i:02d}. offset={c.location} width={c.width} dtype={c.dtype}")
+        print(f"    score={c.score} diffs={list(c.diffs)} values={c.values}")
         print(f"    ctx: {c.context_hex}")
 
 
@@ -29,12 +44,14 @@ def _write_json(candidates, path: Path, top: int = 500) -> None:
             "rank": i + 1,
             "offset": c.offset,
             "offset_hex": hex(c.offset),
+            "container": c.container,
             "width": c.width,
             "dtype": c.dtype,
             "values": list(c.values),
             "score": c.score,
             "diff_ab": c.diff_ab,
             "diff_bc": c.diff_bc,
+            "diffs": list(c.diffs),
             "context_hex": c.context_hex,
         }
         for i, c in enumerate(candidates[:top])
@@ -47,12 +64,12 @@ def _write_md(candidates, path: Path, top: int = 100) -> None:
     lines = [
         "# UESE Report\n\n",
         f"Candidates: **{len(candidates)}**\n\n",
-        "| # | score | offset | width | dtype | values | diff_ab | diff_bc |\n",
-        "|---:|---:|---|---:|---|---|---:|---:|\n",
+        "| # | score | offset | width | dtype | values | diffs |\n",
+        "|---:|---:|---|---:|---|---|---|\n",
     ]
     for i, c in enumerate(candidates[:top], 1):
         lines.append(
-            f"| {i} | {c.score} | `{hex(c.offset)}` | {c.width} | `{c.dtype}` | `{c.values}` | {c.diff_ab} | {c.diff_bc} |\n"
+            f"| {i} | {c.score} | `{c.location}` | {c.width} | `{c.dtype}` | `{c.values}` | {list(c.diffs)} |\n"
         )
         lines.append(f"\n> ctx: `{c.context_hex}`\n\n")
     path.write_text("".join(lines), encoding="utf-8")
@@ -65,15 +82,18 @@ def cmd_scan(args) -> int:
             print(f"Error: {s} not found")
             return 1
 
-    scanner = UniversalScanner()
-    candidates = scanner.scan_saves(
-        saves[0],
-        saves[1],
-        saves[2],
-        values=tuple(args.values),
+    if len(saves) < 2 or len(args.values) != len(saves):
+        print(f"Error: need at least 2 saves and one value per save (got {len(saves)} saves, {len(args.values)} values)")
+        return 1
+
+    scanner = UniversalScanner(entropy_step=args.entropy_step, jobs=args.jobs)
+    candidates = scanner.scan_series(
+        saves,
+        values=args.values,
         width=args.width,
         dtype=args.dtype,
         exclude=args.exclude,
+        containers=args.containers,
     )
 
     if not candidates:
@@ -86,7 +106,7 @@ def cmd_scan(args) -> int:
         out.parent.mkdir(parents=True, exist_ok=True)
         out.write_text(
             "\n".join(
-                f"{c.offset:#x},{c.score},{c.width},{c.dtype},{c.values[0]},{c.values[1]},{c.values[2]},{c.diff_ab},{c.diff_bc}"
+                ",".join([c.location, str(c.score), str(c.width), c.dtype, *map(str, c.values), *map(str, c.diffs)])
                 for c in candidates
             )
             + "\n",
@@ -109,15 +129,18 @@ def cmd_delta(args) -> int:
             print(f"Error: {s} not found")
             return 1
 
-    scanner = UniversalScanner()
-    candidates = scanner.scan_deltas(
-        saves[0],
-        saves[1],
-        saves[2],
-        deltas=tuple(args.deltas),
+    if len(saves) < 2 or len(args.deltas) != len(saves) - 1:
+        print(f"Error: need at least 2 saves and one delta per consecutive pair (got {len(saves)} saves, {len(args.deltas)} deltas)")
+        return 1
+
+    scanner = UniversalScanner(entropy_step=args.entropy_step, jobs=args.jobs)
+    candidates = scanner.scan_delta_series(
+        saves,
+        deltas=args.deltas,
         width=args.width,
         dtype=args.dtype,
         exclude=args.exclude,
+        containers=args.containers,
     )
     if not candidates:
         print("No delta candidates found")
@@ -133,31 +156,127 @@ def cmd_delta(args) -> int:
     return 0
 
 
+def cmd_session(args) -> int:
+    try:
+        if args.session_command == "start":
+            save = Path(args.save)
+            if not save.exists():
+                print(f"Error: {save} not found")
+                return 1
+            session = ScanSession.create(
+                Path(args.dir),
+                save,
+                value=args.value,
+                width=args.width,
+                dtype=args.dtype,
+                exclude=args.exclude,
+            )
+            print(f"Session started in {args.dir}: {session.count()} candidates {session.counts()}")
+            return 0
+
+        session = ScanSession.open(Path(args.dir))
+        if args.session_command == "next":
+            save = Path(args.save)
+            if not save.exists():
+                print(f"Error: {save} not found")
+                return 1
+            remaining = session.narrow(save, value=args.value, relation=args.relation, delta=args.delta)
+            print(f"Step {len(session.meta['steps'])}: {remaining} candidates left {session.counts()}")
+            if remaining == 0:
+                return 1
+            if remaining > args.top:
+                return 0
+
+        candidates = session.candidates()
+        if not candidates:
+            print("No candidates left")
+            return 1
+        _print_candidates(candidates, args.top)
+        if getattr(args, "json", None):
+            _write_json(candidates, Path(args.json))
+            print(f"JSON saved: {args.json}")
+        return 0
+    except (FileNotFoundError, RuntimeError, ValueError) as exc:
+        print(f"Error: {exc}")
+        return 1
+
+
+def _parse_edit(spec: str, width: int, container: str | None) -> PatchEdit:
+    # OFFSET=VALUE or OFFSET=VALUE:WIDTH, e.g. 0x1f0=999 or 0x1f4=3:2
+    try:
+        offset, rest = spec.split("=", 1)
+        value, _, edit_width = rest.partition(":")
+        return PatchEdit(_parse_offset(offset), int(edit_width or width), int(value), container)
+    except ValueError:
+        raise ValueError(f"Bad edit '{spec}', expected OFFSET=VALUE[:WIDTH]") from None
+
+
 def cmd_patch(args) -> int:
     save_path = Path(args.save)
     if not save_path.exists():
         print(f"Error: {save_path} not found")
         return 1
 
+    if (args.offset is None) != (args.value is None):
+        print("Error: -o/--offset and -v/--value go together")
+        return 1
+    if args.offset is None and not args.edit:
+        print("Error: give -o/--offset with -v/--value, or one or more -e/--edit OFFSET=VALUE[:WIDTH]")
+        return 1
+
+    if args.in_place and (args.container or args.out):
+        print("Error: --in-place cannot be combined with --container or --out")
+        return 1
+
     engine = PatchEngine()
-    offset = _parse_offset(args.offset)
     out_path = Path(args.out) if args.out else None
 
     try:
-        engine.patch_value(
-            filepath=save_path,
-            offset=offset,
-            width=args.width,
-            value=args.value,
-            backup=not args.no_backup,
-            output_path=out_path,
-        )
-        verify_file = out_path or save_path
-        if engine.verify_patch(verify_file, offset, args.value, args.width):
-            print("✅ Patch verified successfully")
-            return 0
-        print("⚠️ Warning: patch verification failed")
+        edits = [_parse_edit(spec, args.width, args.container) for spec in args.edit or []]
+        if args.offset is not None:
+            edits.insert(0, PatchEdit(_parse_offset(args.offset), args.width, args.value, args.container))
+        if args.in_place:
+            report = engine.patch_in_place(save_path, edits, journal=not args.no_backup)
+            if not report.verified:
+                print("⚠️ Warning: patch verification failed")
+                return 1
+        else:
+            # patch_values checks the result in memory and raises before writing if it is off.
+            engine.patch_values(save_path, edits, backup=not args.no_backup, output_path=out_path)
+        print("✅ Patch verified successfully")
+        return 0
+    except Exception as exc:
+        print(f"Error: {exc}")
         return 1
+
+
+def cmd_undo(args) -> int:
+    try:
+        PatchEngine().undo(Path(args.journal))
+        return 0
+    except Exception as exc:
+        print(f"Error: {exc}")
+        return 1
+
+
+def cmd_backup(args) -> int:
+    store = PatchEngine().backups
+    try:
+        if args.backup_command == "list":
+            entries = store.entries(Path(args.path) if args.path else None)
+            if not entries:
+                print("No backups")
+                return 0
+            for e in entries:
+                print(f"#{e.id:<4} {e.timestamp}  {e.size:>9} B  {e.sha256[:12]}  {e.path}")
+            return 0
+        if args.backup_command == "restore":
+            target = store.restore(args.id, Path(args.out) if args.out else None)
+            print(f"✅ Restored backup #{args.id} to {target}")
+            return 0
+        removed = store.prune(keep_last=args.keep, max_age_days=args.max_age_days)
+        print(f"Pruned {removed} backup(s)")
+        return 0
     except Exception as exc:
         print(f"Error: {exc}")
         return 1
@@ -167,34 +286,81 @@ def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="UESE - Universal Epic Save Editor")
     sub = parser.add_subparsers(dest="command", required=True)
 
-    scan = sub.add_parser("scan", help="Scan exact values across 3 saves")
-    scan.add_argument("-s", "--saves", nargs=3, required=True)
-    scan.add_argument("-v", "--values", nargs=3, type=int, required=True)
+    scan = sub.add_parser("scan", help="Scan exact values across 2 or more saves")
+    scan.add_argument("-s", "--saves", nargs="+", required=True)
+    scan.add_argument("-v", "--values", nargs="+", type=int, required=True, help="One value per save")
     scan.add_argument("-w", "--width", type=int, choices=[2, 4], default=4)
     scan.add_argument("--dtype", choices=["auto", "u16", "u32", "s16", "s32"], default="auto")
     scan.add_argument("--exclude", nargs="*", choices=["png", "entropy", "none"], default=["png", "entropy"])
+    scan.add_argument("--containers", action="store_true", help="Also scan decompressed gzip/zlib payloads")
+    scan.add_argument("--entropy-step", type=_positive_int, default=2048, help="Entropy window step in bytes (1 = finest)")
+    scan.add_argument("-j", "--jobs", type=_non_negative_int, default=1, help="Worker count for splitting the scan (0 = all cores)")
     scan.add_argument("-t", "--top", type=int, default=10)
     scan.add_argument("--csv")
     scan.add_argument("--json")
     scan.add_argument("--md")
 
     delta = sub.add_parser("delta", help="Scan by delta pattern")
-    delta.add_argument("-s", "--saves", nargs=3, required=True)
-    delta.add_argument("-d", "--deltas", nargs=2, type=int, required=True)
+    delta.add_argument("-s", "--saves", nargs="+", required=True)
+    delta.add_argument("-d", "--deltas", nargs="+", type=int, required=True, help="One delta per consecutive pair of saves")
     delta.add_argument("-w", "--width", type=int, choices=[2, 4], default=4)
     delta.add_argument("--dtype", choices=["auto", "u16", "u32", "s16", "s32"], default="auto")
     delta.add_argument("--exclude", nargs="*", choices=["png", "entropy", "none"], default=["png", "entropy"])
+    delta.add_argument("--containers", action="store_true", help="Also scan decompressed gzip/zlib payloads")
+    delta.add_argument("--entropy-step", type=_positive_int, default=2048, help="Entropy window step in bytes (1 = finest)")
+    delta.add_argument("-j", "--jobs", type=_non_negative_int, default=1, help="Worker count for splitting the scan (0 = all cores)")
     delta.add_argument("-t", "--top", type=int, default=10)
     delta.add_argument("--json")
     delta.add_argument("--md")
 
+    session = sub.add_parser("session", help="Narrow candidates step by step across saves")
+    session_sub = session.add_subparsers(dest="session_command", required=True)
+    start = session_sub.add_parser("start", help="First scan: exact value or unknown initial value")
+    start.add_argument("dir", help="Session directory")
+    start.add_argument("-s", "--save", required=True)
+    start.add_argument("-v", "--value", type=int, help="Current value (omit for an unknown-value scan)")
+    start.add_argument("-w", "--width", type=int, choices=[2, 4], default=4)
+    start.add_argument("--dtype", choices=["auto", "u16", "u32", "s16", "s32"], default="auto")
+    start.add_argument("--exclude", nargs="*", choices=["png", "entropy", "none"], default=["png", "entropy"])
+    step = session_sub.add_parser("next", help="Narrow survivors with a new save")
+    step.add_argument("dir", help="Session directory")
+    step.add_argument("-s", "--save", required=True)
+    condition = step.add_mutually_exclusive_group(required=True)
+    condition.add_argument("-v", "--value", type=int)
+    condition.add_argument("-r", "--relation", choices=RELATIONS)
+    condition.add_argument("-d", "--delta", type=int, help="Exact change since the previous save")
+    step.add_argument("-t", "--top", type=int, default=10)
+    show = session_sub.add_parser("show", help="Show surviving candidates")
+    show.add_argument("dir", help="Session directory")
+    show.add_argument("-t", "--top", type=int, default=10)
+    show.add_argument("--json")
+
     patch = sub.add_parser("patch", help="Patch value at offset")
     patch.add_argument("-s", "--save", required=True)
-    patch.add_argument("-o", "--offset", required=True)
-    patch.add_argument("-v", "--value", type=int, required=True)
+    patch.add_argument("-o", "--offset")
+    patch.add_argument("-v", "--value", type=int)
+    patch.add_argument(
+        "-e", "--edit", action="append", help="Edit OFFSET=VALUE[:WIDTH]; repeat to patch several fields in one write"
+    )
     patch.add_argument("-w", "--width", type=int, choices=[2, 4], default=4)
+    patch.add_argument("--container", help="Patch inside a compressed payload, e.g. gzip#0 (offset is payload-relative)")
     patch.add_argument("--out")
-    patch.add_argument("--no-backup", action="store_true")
+    patch.add_argument("--in-place", action="store_true", help="Overwrite only the edited bytes (raw offsets only)")
+    patch.add_argument("--no-backup", action="store_true", help="Skip the backup (or the undo journal with --in-place)")
+
+    undo = sub.add_parser("undo", help="Revert an in-place patch from its undo journal")
+    undo.add_argument("journal", help="Path to a .undo.json journal")
+
+    backup = sub.add_parser("backup", help="List, restore or prune stored backups")
+    backup_sub = backup.add_subparsers(dest="backup_command", required=True)
+    listing = backup_sub.add_parser("list", help="List backups, oldest first")
+    listing.add_argument("--path", help="Only backups of this save")
+    restore = backup_sub.add_parser("restore", help="Write a backup back (current content is backed up first)")
+    restore.add_argument("id", type=int)
+    restore.add_argument("--out", help="Restore to this path instead of the original")
+    prune = backup_sub.add_parser("prune", help="Apply a retention policy and drop unreferenced objects")
+    prune.add_argument("--keep", type=int, help="Backups to keep per save (default 20)")
+    prune.add_argument("--max-age-days", type=float)
     return parser
 
 
@@ -206,8 +372,14 @@ def main() -> int:
         return cmd_scan(args)
     if args.command == "delta":
         return cmd_delta(args)
+    if args.command == "session":
+        return cmd_session(args)
     if args.command == "patch":
         return cmd_patch(args)
+    if args.command == "undo":
+        return cmd_undo(args)
+    if args.command == "backup":
+        return cmd_backup(args)
     parser.print_help()
     return 1
 
@@ -1,5 +1,7 @@
 # Core modules
+from .backup_store import BackupStore
 from .patch_engine import PatchEngine
+from .scan_session import ScanSession
 from .universal_scanner import ScanCandidate, UniversalScanner
 
 try:
@@ -11,7 +13,9 @@ except Exception:  # optional dependency (pyyaml)
 __all__ = [
     "UniversalScanner",
     "ScanCandidate",
+    "ScanSession",
     "PatchEngine",
+    "BackupStore",
     "ProfileManager",
     "GameProfile",
 ]
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+FULL, DELTA = b"F", b"D"
+# Replacement runs closer than this are merged; each op costs 20 bytes of header.
+DELTA_GAP = 16
+DELTA_BLOCK = 4096
+# Kind byte plus the base digest of a delta: all GC needs from an object.
+HEADER_BYTES = 33
+
+
+@dataclass
+class BackupEntry:
+    id: int
+    path: str
+    timestamp: str
+    sha256: str
+    size: int
+    # Base object of a delta, "" for a full object; None in indexes written
+    # before this was recorded, where the object header has to be read.
+    base: Optional[str] = None
+
+
+class _RootLock:
+    """Serialises index updates and GC on one backup root.
+
+    Reentrant within a thread (restore adds, add prunes); the outermost holder
+    also takes an exclusive lock on ``root/.lock`` so separate processes
+    sharing the root are serialised too.
+    """
+
+    _registry: Dict[str, "_RootLock"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, root: Path):
+        self.path = root / LOCK_FILE
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    @classmethod
+    def for_root(cls, root: Path) -> "_RootLock":
+        key = os.path.normcase(str(root.resolve()))
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(root)
+            return cls._registry[key]
+
+    @contextmanager
+    def held(self) -> Iterator[None]:
+        with self._lock:
+            if self._depth == 0:
+                self._handle = open(self.path, "a+b")
+                _lock_file(self._handle)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    _unlock_file(self._handle)
+                    self._handle.close()
+                    self._handle = None
+
+
+def _lock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        return
+    handle.seek(0)
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after about ten seconds; keep waiting.
+            continue
+
+
+def _unlock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(target: Path, data: bytes) -> None:
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        if target.exists():
+            shutil.copymode(target, tmp_name)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class BackupStore:
+    """Content-addressed backups: every distinct file content is stored once.
+
+    The first version of a file is stored whole; later versions are stored as
+    a list of byte-range replacements against that base, so backing up a save
+    that differs by a few patched fields costs a few bytes. ``index.json``
+    records every backup as (path, timestamp, sha256).
+
+    Adding, pruning and restoring hold a lock on the root for their whole
+    read-modify-write of the index, so garbage collection only ever runs
+    against the current index and never removes an object another writer
+    has stored but not yet indexed.
+    """
+
+    def __init__(self, root: Path, keep_last: Optional[int] = 20, max_age_days: Optional[float] = None):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._lock = _RootLock.for_root(self.root)
+
+    def add(self, filepath: Path, data: Optional[bytes] = None) -> BackupEntry:
+        data = Path(filepath).read_bytes() if data is None else data
+        with self._lock.held():
+            return self._add(str(Path(filepath).resolve()), data)
+
+    def _add(self, path: str, data: bytes) -> BackupEntry:
+        digest = hashlib.sha256(data).hexdigest()
+        entries = self.entries()
+        if not self._object_path(digest).exists():
+            base = self._store(digest, data, self._base_for(path, entries))
+        else:
+            base = self._entry_base(digest, entries)
+
+        entry = BackupEntry(
+            id=max((e.id for e in entries), default=0) + 1,
+            path=path,
+            timestamp=datetime.now().isoformat(timespec="seconds"),
+            sha256=digest,
+            size=len(data),
+            base=base,
+        )
+        entries.append(entry)
+        self._write_index(entries)
+        self.prune()
+        return entry
+
+    def entries(self, path: Optional[Path] = None) -> List[BackupEntry]:
+        index = self.root / INDEX_FILE
+        if not index.exists():
+            return []
+        entries = [BackupEntry(**e) for e in json.loads(index.read_text(encoding="utf-8"))]
+        if path is not None:
+            wanted = str(Path(path).resolve())
+            entries = [e for e in entries if e.path == wanted]
+        return entries
+
+    def get(self, entry_id: int) -> BackupEntry:
+        for entry in self.entries():
+            if entry.id == entry_id:
+                return entry
+        raise ValueError(f"Backup #{entry_id} not found")
+
+    def load(self, digest: str) -> bytes:
+        kind, base, body = self._read_object(digest)
+        data = body if kind == FULL else apply_delta(self.load(base), body)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Backup object {digest[:12]} is corrupt")
+        return data
+
+    def restore(self, entry_id: int, output_path: Optional[Path] = None) -> Path:
+        """Write backup ``entry_id`` back to its original path (or ``output_path``).
+
+        Whatever is being overwritten is backed up first, so a restore can be undone.
+        """
+        with self._lock.held():
+            entry = self.get(entry_id)
+            target = Path(output_path or entry.path)
+            data = self.load(entry.sha256)
+            if target.exists():
+                self.add(target)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(target, data)
+        return target
+
+    def prune(self, keep_last: Optional[int] = None, max_age_days: Optional[float] = None) -> int:
+        """Apply the retention policy and drop unreferenced objects; returns how many entries went."""
+        with self._lock.held():
+            return self._prune(
+                self.keep_last if keep_last is None else keep_last,
+                self.max_age_days if max_age_days is None else max_age_days,
+            )
+
+    def _prune(self, keep_last: Optional[int], max_age_days: Optional[float]) -> int:
+        entries = self.entries()
+        kept = entries
+        if max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+            kept = [e for e in kept if e.timestamp >= cutoff]
+        if keep_last is not None:
+            per_path: Dict[str, List[BackupEntry]] = {}
+            for e in kept:
+                per_path.setdefault(e.path, []).append(e)
+            newest = {e.id for group in per_path.values() for e in group[-keep_last:]} if keep_last > 0 else set()
+            kept = [e for e in kept if e.id in newest]
+        if len(kept) != len(entries):
+            self._write_index(kept)
+        self._collect_garbage(kept)
+        return len(entries) - len(kept)
+
+    def _base_for(self, path: str, entries: List[BackupEntry]) -> Optional[str]:
+        # Deltas always point at a full object, so restoring never walks a chain.
+        for entry in reversed(entries):
+            if entry.path == path and self._object_path(entry.sha256).exists():
+                base = self._entry_base(entry.sha256, [entry])
+                return base or entry.sha256
+        return None
+
+    def _entry_base(self, digest: str, entries: List[BackupEntry]) -> str:
+        # The index usually knows; older entries fall back to the object header.
+        for entry in reversed(entries):
+            if entry.sha256 == digest and entry.base is not None:
+                return entry.base
+        return self._read_header(digest)
+
+    def _store(self, digest: str, data: bytes, base: Optional[str]) -> str:
+        """Write the object for ``data`` and return its delta base ("" if stored whole)."""
+        record, stored_base = FULL + data, ""
+        if base is not None:
+            delta = make_delta(self.load(base), data)
+            # A delta that is not much smaller than the file starts a new base.
+            if len(delta) < len(data) // 2:
+                record, stored_base = DELTA + bytes.fromhex(base) + delta, base
+        target = self._object_path(digest)
+        target.parent.mkdir(exist_ok=True)
+        atomic_write(target, zlib.compress(record, 6))
+        return stored_base
+
+    def _read_header(self, digest: str) -> str:
+        """Delta base of an object ("" if full), inflating only its first bytes."""
+        d = zlib.decompressobj()
+        head = b""
+        with open(self._object_path(digest), "rb") as handle:
+            while len(head) < HEADER_BYTES and not d.eof:
+                chunk = d.unconsumed_tail or handle.read(DELTA_BLOCK)
+                if not chunk:
+                    break
+                head += d.decompress(chunk, HEADER_BYTES - len(head))
+        return head[1:HEADER_BYTES].hex() if head[:1] == DELTA else ""
+
+    def _read_object(self, digest: str) -> Tuple[bytes, Optional[str], bytes]:
+        path = self._object_path(digest)
+        if not path.exists():
+            raise ValueError(f"Backup object {digest[:12]} not found")
+        record = zlib.decompress(path.read_bytes())
+        if record[:1] == FULL:
+            return FULL, None, record[1:]
+        return DELTA, record[1:33].hex(), record[33:]
+
+    def _collect_garbage(self, entries: List[BackupEntry]) -> None:
+        # Only the index and a directory listing; objects are opened just for
+        # entries from older indexes that did not record their base.
+        live: Set[str] = set()
+        for entry in entries:
+            if entry.sha256 in live:
+                continue
+            live.add(entry.sha256)
+            base = entry.base
+            if base is None and self._object_path(entry.sha256).exists():
+                base = self._read_header(entry.sha256)
+            if base:
+                live.add(base)
+        for path in self.objects.glob("*/*"):
+            if path.name not in live:
+                path.unlink()
+                if not any(path.parent.iterdir()):
+                    path.parent.rmdir()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def _write_index(self, entries: List[BackupEntry]) -> None:
+        atomic_write(self.root / INDEX_FILE, json.dumps([asdict(e) for e in entries], indent=2).encode("utf-8"))
+
+
+def make_delta(base: bytes, target: bytes) -> bytes:
+    """Encode ``target`` as (start, end, replacement) splices over ``base``."""
+    prefix = _common_prefix(base, target)
+    suffix = _common_prefix(base[prefix:][::-1], target[prefix:][::-1])
+    if len(base) == len(target):
+        ops = _changed_runs(base, target, prefix, len(base) - suffix)
+    else:
+        ops = [(prefix, len(base) - suffix, target[prefix : len(target) - suffix])]
+    out = [struct.pack("<QI", len(target), len(ops))]
+    for start, end, data in ops:
+        out.append(struct.pack("<QQI", start, end, len(data)))
+        out.append(data)
+    return b"".join(out)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    size, count = struct.unpack_from("<QI", delta)
+    pos = struct.calcsize("<QI")
+    out, cursor = [], 0
+    for _ in range(count):
+        start, end, length = struct.unpack_from("<QQI", delta, pos)
+        pos += struct.calcsize("<QQI")
+        out += [base[cursor:start], delta[pos : pos + length]]
+        pos += length
+        cursor = end
+    out.append(base[cursor:])
+    data = b"".join(out)
+    if len(data) != size:
+        raise RuntimeError("Backup delta does not match its base")
+    return data
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    n = min(len(a), len(b))
+    pos = 0
+    while pos < n and a[pos : pos + DELTA_BLOCK] == b[pos : pos + DELTA_BLOCK]:
+        pos += DELTA_BLOCK
+    while pos < n and a[pos] == b[pos]:
+        pos += 1
+    return min(pos, n)
+
+
+def _changed_runs(base: bytes, target: bytes, start: int, stop: int) -> List[Tuple[int, int, bytes]]:
+    runs: List[List[int]] = []
+    for block in range(start, stop, DELTA_BLOCK):
+        end = min(block + DELTA_BLOCK, stop)
+        if base[block:end] == target[block:end]:
+            continue
+        for i in range(block, end):
+            if base[i] == target[i]:
+                continue
+            if runs and i - runs[-1][1] <= DELTA_GAP:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
+    return [(s, e, target[s:e]) for s, e in runs]
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import IO, Any, List, Optional, Tuple
+
+GZIP_MAGIC = b"\x1f\x8b\x08"
+
+# gzip FLG bits
+FTEXT, FHCRC, FEXTRA, FNAME, FCOMMENT = 0x01, 0x02, 0x04, 0x08, 0x10
+
+# How much of the payload detect_deflate_params compresses per trial.
+PROBE_BYTES = 1 << 20
+# deflate_parallel: input bytes per block, and how much preceding input
+# primes each block's dictionary (the whole deflate window).
+PARALLEL_BLOCK = 1 << 17
+WINDOW_BYTES = 1 << 15
+# IncrementalDeflater keeps a compressor snapshot every this many input bytes.
+CHECKPOINT_BYTES = 1 << 19
+
+
+@dataclass(frozen=True)
+class DeflateParams:
+    level: int = 9
+    mem_level: int = 8
+    strategy: int = zlib.Z_DEFAULT_STRATEGY
+
+
+def gzip_header_length(data: bytes, offset: int = 0) -> int:
+    if data[offset : offset + 3] != GZIP_MAGIC:
+        raise ValueError(f"No gzip header at {offset:#x}")
+    flags = data[offset + 3]
+    cursor = offset + 10
+    if flags & FEXTRA:
+        (xlen,) = struct.unpack_from("<H", data, cursor)
+        cursor += 2 + xlen
+    for flag in (FNAME, FCOMMENT):
+        if flags & flag:
+            end = data.find(b"\x00", cursor)
+            if end == -1:
+                raise ValueError("Truncated gzip header")
+            cursor = end + 1
+    if flags & FHCRC:
+        cursor += 2
+    return cursor - offset
+
+
+def gzip_level_hint(data: bytes, offset: int = 0) -> int:
+    # XFL: 2 = maximum compression, 4 = fastest; anything else means "default".
+    xfl = data[offset + 8]
+    return {2: 9, 4: 1}.get(xfl, 6)
+
+
+def zlib_level_hint(data: bytes, offset: int = 0) -> int:
+    # FLEVEL (top two bits of FLG) only records a bucket; use its representative level.
+    return (1, 5, 6, 9)[data[offset + 1] >> 6]
+
+
+class IncrementalDeflater:
+    """Raw deflate that recompresses only what follows the first changed byte.
+
+    Python's zlib exposes neither inflate block boundaries nor the window, so
+    resume points are taken on the compressing side: every CHECKPOINT_BYTES
+    of input a copy of the compressor is kept, with the output length and
+    CRC-32 so far. zlib's output does not depend on how the input is split,
+    so resuming the last checkpoint before the first changed byte gives
+    exactly the stream a full pass would, with the earlier output reused.
+    """
+
+    def __init__(self, params: DeflateParams, checkpoint_bytes: int = CHECKPOINT_BYTES):
+        self.params = params
+        self.checkpoint_bytes = checkpoint_bytes
+        self.payload = b""
+        self.stream = b""
+        self.crc = 0
+        # Input bytes the last deflate() did not have to recompress.
+        self.reused = 0
+        self._checkpoints: List[Tuple[int, int, int, Any]] = []
+
+    def deflate(self, payload: bytes) -> bytes:
+        """Compress ``payload``; ``crc`` and ``reused`` describe the result."""
+        changed = _common_prefix(self.payload, payload)
+        checkpoints = [checkpoint for checkpoint in self._checkpoints if checkpoint[0] <= changed]
+        if checkpoints:
+            pos, out_length, crc, state = checkpoints[-1]
+            compressor = state.copy()
+        else:
+            pos, out_length, crc = 0, 0, 0
+            compressor = zlib.compressobj(
+                self.params.level, zlib.DEFLATED, -zlib.MAX_WBITS, self.params.mem_level, self.params.strategy
+            )
+        self.reused = pos
+        pieces = [self.stream[:out_length]]
+        view = memoryview(payload)
+        while pos < len(view):
+            chunk = view[pos : pos + self.checkpoint_bytes]
+            pieces.append(compressor.compress(chunk))
+            out_length += len(pieces[-1])
+            crc = zlib.crc32(chunk, crc)
+            pos += len(chunk)
+            checkpoints.append((pos, out_length, crc, compressor.copy()))
+        pieces.append(compressor.flush())
+
+        self.payload = bytes(payload)
+        self.stream = b"".join(pieces)
+        self.crc = crc
+        self._checkpoints = checkpoints
+        return self.stream
+
+
+def match_deflater(payload: bytes, deflated: bytes, hint: int = 6) -> Optional[IncrementalDeflater]:
+    """Find zlib settings that reproduce ``deflated``, a raw deflate stream of ``payload``.
+
+    Each trial compresses at most PROBE_BYTES of the payload without flushing
+    and compares the blocks zlib has already finished against the original,
+    which rules out most settings cheaply. A trial that passes is confirmed
+    with a full IncrementalDeflater pass, whose checkpoints then let later
+    edits reuse the original stream. ``hint`` (e.g. from the gzip XFL byte)
+    is tried first. Returns None when no standard zlib setting matches.
+    """
+    levels = [hint] + [level for level in (6, 9, 1, 5, 4, 3, 2, 7, 8) if level != hint]
+    probe = memoryview(payload)[:PROBE_BYTES]
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        for mem_level in (8, 9):
+            for level in levels:
+                compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, mem_level, strategy)
+                if not deflated.startswith(compressor.compress(probe)):
+                    continue
+                deflater = IncrementalDeflater(DeflateParams(level, mem_level, strategy))
+                if deflater.deflate(payload) == deflated:
+                    return deflater
+    return None
+
+
+def detect_deflate_params(payload: bytes, deflated: bytes, hint: int = 6) -> Optional[DeflateParams]:
+    deflater = match_deflater(payload, deflated, hint)
+    return deflater.params if deflater else None
+
+
+def deflate_raw(payload: bytes, level: int = 9, params: Optional[DeflateParams] = None) -> bytes:
+    params = params or DeflateParams(level)
+    compressor = zlib.compressobj(params.level, zlib.DEFLATED, -zlib.MAX_WBITS, params.mem_level, params.strategy)
+    return compressor.compress(payload) + compressor.flush()
+
+
+def deflate_parallel(
+    payload: bytes, params: Optional[DeflateParams] = None, jobs: int = 0, block_size: int = PARALLEL_BLOCK
+) -> Tuple[bytes, int]:
+    """Raw deflate of ``payload`` compressed block by block on a thread pool, pigz-style.
+
+    zlib releases the GIL while compressing, so blocks run in parallel. Each
+    block is primed with the 32 KiB of input before it as a preset dictionary
+    and ends with a sync flush, so the concatenation is one ordinary deflate
+    stream. Returns the stream and the CRC-32 of ``payload``, combined from
+    per-block CRCs. ``jobs`` = 0 uses every core.
+    """
+    params = params or DeflateParams()
+    view = memoryview(payload)
+    starts = range(0, len(view), block_size) if len(view) else range(1)
+
+    def compress_block(start: int) -> Tuple[bytes, int, int]:
+        block = view[start : start + block_size]
+        zdict = bytes(view[max(0, start - WINDOW_BYTES) : start])
+        args = (params.level, zlib.DEFLATED, -zlib.MAX_WBITS, params.mem_level, params.strategy)
+        compressor = zlib.compressobj(*args, zdict=zdict) if zdict else zlib.compressobj(*args)
+        last = start + block_size >= len(view)
+        out = compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+        return out, zlib.crc32(block), len(block)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        blocks: List[Tuple[bytes, int, int]] = list(pool.map(compress_block, starts))
+    crc = 0
+    for _, block_crc, length in blocks:
+        crc = crc32_combine(crc, block_crc, length)
+    return b"".join(out for out, _, _ in blocks), crc
+
+
+def gzip_member(
+    payload: bytes,
+    level: int = 9,
+    header: bytes | None = None,
+    params: Optional[DeflateParams] = None,
+    jobs: int = 1,
+) -> bytes:
+    """A single gzip member for ``payload``, reusing ``header`` verbatim when given.
+
+    ``jobs`` other than 1 compresses through deflate_parallel.
+    """
+    level = params.level if params else level
+    if jobs != 1 and len(payload) > PARALLEL_BLOCK:
+        stream, crc = deflate_parallel(payload, params or DeflateParams(level), jobs)
+    else:
+        stream, crc = deflate_raw(payload, level, params), zlib.crc32(payload)
+    return gzip_frame(stream, crc, len(payload), header or gzip_header(level))
+
+
+def write_gzip_member(
+    out: IO[bytes], payload: bytes, header: bytes, params: DeflateParams, chunk_size: int = CHECKPOINT_BYTES
+) -> int:
+    """Write a gzip member for ``payload`` to ``out`` one chunk at a time; returns the bytes written.
+
+    Neither the payload nor the stream is ever copied whole, so this suits
+    payloads mapped from disk that are too large for gzip_member.
+    """
+    compressor = zlib.compressobj(params.level, zlib.DEFLATED, -zlib.MAX_WBITS, params.mem_level, params.strategy)
+    written = out.write(bytes(header))
+    view = memoryview(payload)
+    crc = 0
+    for start in range(0, len(view), chunk_size):
+        chunk = view[start : start + chunk_size]
+        crc = zlib.crc32(chunk, crc)
+        written += out.write(compressor.compress(chunk))
+        chunk.release()
+    written += out.write(compressor.flush())
+    written += out.write(struct.pack("<II", crc & 0xFFFFFFFF, len(view) & 0xFFFFFFFF))
+    view.release()
+    return written
+
+
+def gzip_header(level: int = 9) -> bytes:
+    return GZIP_MAGIC + bytes([0, 0, 0, 0, 0, {9: 2, 1: 4}.get(level, 0), 255])
+
+
+def gzip_frame(stream: bytes, crc: int, size: int, header: bytes) -> bytes:
+    """Wrap a raw deflate ``stream`` in ``header`` and the CRC-32/ISIZE trailer."""
+    return bytes(header) + stream + struct.pack("<II", crc & 0xFFFFFFFF, size & 0xFFFFFFFF)
+
+
+def crc32_combine(crc1: int, crc2: int, length2: int) -> int:
+    """CRC-32 of A + B from crc32(A), crc32(B) and len(B), as zlib's crc32_combine."""
+    return _gf2_times(_crc32_shift(length2), crc1) ^ crc2
+
+
+@lru_cache(maxsize=64)
+def _crc32_shift(length: int) -> Tuple[int, ...]:
+    # GF(2) matrix (one column per bit) that runs a CRC over ``length`` zero
+    # bytes. Blocks mostly share one length, so the matrix is built once.
+    result = [1 << n for n in range(32)]
+    op = [0xEDB88320] + [1 << n for n in range(31)]
+    for _ in range(3):
+        op = _gf2_square(op)
+    while length:
+        if length & 1:
+            result = [_gf2_times(op, column) for column in result]
+        length >>= 1
+        if length:
+            op = _gf2_square(op)
+    return tuple(result)
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    # Slices of bytes/bytearray compare with memcmp; memoryviews compare item by item.
+    n = min(len(a), len(b))
+    pos = 0
+    while pos < n and a[pos : pos + WINDOW_BYTES] == b[pos : pos + WINDOW_BYTES]:
+        pos += WINDOW_BYTES
+    while pos < n and a[pos] == b[pos]:
+        pos += 1
+    return min(pos, n)
+
+
+def _gf2_times(matrix, vector: int) -> int:
+    total, n = 0, 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[n]
+        vector >>= 1
+        n += 1
+    return total
+
+
+def _gf2_square(matrix) -> List[int]:
+    return [_gf2_times(matrix, column) for column in matrix]
+
+
+def zlib_stream(payload: bytes, level: int = 9) -> bytes:
+    return zlib.compress(payload, level)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .compression import GZIP_MAGIC, gzip_header_length, gzip_level_hint, gzip_member, zlib_level_hint, zlib_stream
+from .payload_cache import file_digest, inflate
+
+ZLIB_FLAGS = (0x01, 0x5E, 0x9C, 0xDA)
+
+
+@dataclass
+class Container:
+    """A compressed stream embedded in a save file and its decompressed payload."""
+
+    index: int
+    kind: str
+    offset: int
+    end: int
+    payload: bytes
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}#{self.index}"
+
+    def rebuild(self, blob: bytes, payload: bytes, level: int | None = None) -> bytes:
+        """Return ``blob`` with this container recompressed around ``payload``."""
+        if self.kind == "gzip":
+            header_len = gzip_header_length(blob, self.offset)
+            level = gzip_level_hint(blob, self.offset) if level is None else level
+            stream = gzip_member(payload, level, header=blob[self.offset : self.offset + header_len])
+        else:
+            level = zlib_level_hint(blob, self.offset) if level is None else level
+            stream = zlib_stream(payload, level)
+        return bytes(blob[: self.offset]) + stream + bytes(blob[self.end :])
+
+
+def find_containers(blob: bytes, kinds: Tuple[str, ...] = ("gzip", "zlib"), min_payload: int = 64) -> List[Container]:
+    starts = []
+    if "gzip" in kinds:
+        starts += [(i, "gzip") for i in _find_all(blob, GZIP_MAGIC)]
+    if "zlib" in kinds:
+        starts += [
+            (i, "zlib")
+            for i in _find_all(blob, b"\x78")
+            if i + 1 < len(blob) and blob[i + 1] in ZLIB_FLAGS and (0x7800 | blob[i + 1]) % 31 == 0
+        ]
+
+    digest = file_digest(blob) if starts else None
+    containers: List[Container] = []
+    covered_until = 0
+    for offset, kind in sorted(starts):
+        if offset < covered_until:
+            continue
+        wbits = zlib.MAX_WBITS | 16 if kind == "gzip" else zlib.MAX_WBITS
+        try:
+            result = inflate(blob, offset, wbits, digest)
+        except zlib.error:
+            continue
+        if not result.eof or len(result.payload) < min_payload:
+            continue
+        containers.append(Container(len(containers), kind, offset, result.end, result.payload))
+        covered_until = result.end
+    return containers
+
+
+def find_container(blob: bytes, label: str) -> Container:
+    for container in find_containers(blob):
+        if container.label == label:
+            return container
+    raise ValueError(f"Container {label} not found")
+
+
+def _find_all(blob: bytes, needle: bytes) -> List[int]:
+    offsets = []
+    idx = blob.find(needle)
+    while idx != -1:
+        offsets.append(idx)
+        idx = blob.find(needle, idx + 1)
+    return offsets
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import List, Tuple
+
+# Below this step the per-byte update loop beats building Counter deltas.
+_COUNTER_STEP = 128
+
+
+def shannon_entropy(data: bytes) -> float:
+    if not data:
+        return 0.0
+    n = len(data)
+    h = 0.0
+    for c in Counter(data).values():
+        p = c / n
+        h -= p * math.log2(p)
+    return h
+
+
+def entropy_profile(data: bytes, window: int = 4096, step: int = 2048) -> List[Tuple[int, float]]:
+    """Return (offset, entropy) for every full window, sliding by ``step`` bytes.
+
+    The byte histogram is updated incrementally as the window slides, so the
+    cost is proportional to the bytes entering and leaving the window rather
+    than ``window`` per position. Any step >= 1 is supported.
+    """
+    if window <= 0 or step <= 0:
+        raise ValueError("window and step must be positive")
+    n = len(data)
+    if n < window:
+        return []
+
+    # h = log2(w) - sum(c * log2(c)) / w, so only the sum has to be maintained.
+    table = [0.0] + [c * math.log2(c) for c in range(1, window + 1)]
+    log_w = math.log2(window)
+    counts = [0] * 256
+    acc = 0.0
+    for b, c in Counter(data[:window]).items():
+        counts[b] = c
+        acc += table[c]
+
+    profile = [(0, max(0.0, log_w - acc / window))]
+    for start in range(step, n - window + 1, step):
+        if 2 * step >= window:
+            # Little overlap left: a fresh C-level count is cheaper than a delta.
+            acc = sum(table[c] for c in Counter(data[start : start + window]).values())
+        elif step < _COUNTER_STEP:
+            for b in data[start - step : start]:
+                c = counts[b]
+                acc += table[c - 1] - table[c]
+                counts[b] = c - 1
+            for b in data[start + window - step : start + window]:
+                c = counts[b]
+                acc += table[c + 1] - table[c]
+                counts[b] = c + 1
+        else:
+            incoming = Counter(data[start + window - step : start + window])
+            outgoing = Counter(data[start - step : start])
+            for b in incoming.keys() | outgoing.keys():
+                d = incoming[b] - outgoing[b]
+                if d:
+                    c = counts[b]
+                    acc += table[c + d] - table[c]
+                    counts[b] = c + d
+        profile.append((start, max(0.0, log_w - acc / window)))
+    return profile
+
+
+def high_entropy_regions(
+    data: bytes, window: int = 4096, step: int = 2048, threshold: float = 7.7
+) -> List[Tuple[int, int]]:
+    regions: List[Tuple[int, int]] = []
+    for start, ent in entropy_profile(data, window, step):
+        if ent < threshold:
+            continue
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], start + window)
+        else:
+            regions.append((start, start + window))
+    return regions
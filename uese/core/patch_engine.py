@@ -1,15 +1,46 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import json
+import mmap
+import os
+import zlib
+from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .backup_store import BackupEntry, BackupStore, atomic_write
+from .containers import Container, find_container, find_containers
+
+
+@dataclass
+class PatchEdit:
+    offset: int
+    width: int
+    value: int
+    container: Optional[str] = None
+
+    @property
+    def location(self) -> str:
+        return f'{self.container}+{self.offset:#x}' if self.container else f'{self.offset:#x}'
+
+
+@dataclass
+class PatchReport:
+    target: Path
+    backup: Optional[BackupEntry] = None
+    journal: Optional[Path] = None
+    # (edit, old bytes, new bytes) in the order the edits were given.
+    changes: List[Tuple[PatchEdit, bytes, bytes]] = field(default_factory=list)
+    verified: bool = False
 
 
 class PatchEngine:
     def __init__(self, backup_dir: Optional[Path] = None):
         self.backup_dir = backup_dir or Path.home() / '.uese_backups'
         self.backup_dir.mkdir(exist_ok=True)
+        self.backups = BackupStore(self.backup_dir)
 
     def patch_value(
         self,
@@ -19,52 +50,218 @@ class PatchEngine:
         value: int,
         backup: bool = True,
         output_path: Optional[Path] = None,
+        container: Optional[str] = None,
     ) -> bool:
+        self.patch_values(filepath, [PatchEdit(offset, width, value, container)], backup=backup, output_path=output_path)
+        return True
+
+    def patch_values(
+        self,
+        filepath: Path,
+        edits: Sequence[PatchEdit],
+        backup: bool = True,
+        output_path: Optional[Path] = None,
+    ) -> PatchReport:
+        """Apply ``edits`` as one transaction: one read, one backup, one atomic write.
+
+        Every edit is validated before anything is written, so a bad edit
+        leaves the file (and the backup directory) untouched. The result is
+        checked in memory before it replaces the file.
+        """
         if not filepath.exists():
             raise FileNotFoundError(f'Save file not found: {filepath}')
+        if not edits:
+            raise ValueError('No edits given')
+        self._validate_values(edits)
 
-        if width not in [2, 4]:
-            raise ValueError(f'Width must be 2 or 4, got {width}')
-
-        if width == 2 and not (0 <= value <= 0xFFFF):
-            raise ValueError(f'Value {value} out of range for uint16')
-        if width == 4 and not (0 <= value <= 0xFFFFFFFF):
-            raise ValueError(f'Value {value} out of range for uint32')
+        raw = filepath.read_bytes()
+        # Container offsets address the decompressed payload; each touched
+        # stream is recompressed and spliced back into the file after patching.
+        streams = self._resolve_containers(raw, edits)
+        buffers: Dict[Optional[str], bytearray] = {None: bytearray(raw)}
+        buffers.update({label: bytearray(stream.payload) for label, stream in streams.items()})
+        self._validate_bounds(edits, {label: len(blob) for label, blob in buffers.items()}, streams)
 
-        blob = bytearray(filepath.read_bytes())
+        target = output_path or filepath
+        report = PatchReport(target)
+        for edit in edits:
+            blob = buffers[edit.container]
+            old_bytes = bytes(blob[edit.offset:edit.offset + edit.width])
+            new_bytes = edit.value.to_bytes(edit.width, 'little', signed=False)
+            blob[edit.offset:edit.offset + edit.width] = new_bytes
+            report.changes.append((edit, old_bytes, new_bytes))
 
-        if offset < 0 or offset + width > len(blob):
-            raise ValueError(f'Offset {offset:#x} out of bounds')
+        # Splice from the last stream backwards so earlier offsets stay valid;
+        # ``growth`` records how much each recompressed stream changed size.
+        out = bytes(buffers[None])
+        growth: Dict[str, int] = {}
+        for label, stream in sorted(streams.items(), key=lambda item: -item[1].offset):
+            before = len(out)
+            out = stream.rebuild(out, buffers[label])
+            growth[label] = len(out) - before
 
+        report.verified = self._verify_buffer(out, streams, growth, report.changes)
+        if not report.verified:
+            raise RuntimeError(f'Patched data failed verification; {target} left unchanged')
         if backup:
-            self._create_backup(filepath)
-
-        old_value = blob[offset:offset+width]
-        new_bytes = value.to_bytes(width, 'little', signed=False)
-        blob[offset:offset+width] = new_bytes
-
-        target = output_path or filepath
+            report.backup = self._create_backup(filepath, raw)
         target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_bytes(blob)
+        atomic_write(target, out)
 
-        print(f'✅ Patched {filepath.name}')
+        print(f'✅ Patched {filepath.name} ({len(edits)} edit(s))')
         if output_path is not None:
             print(f'   Output: {target}')
-        print(f'   Offset: {offset:#x}')
-        print(f'   Old bytes: {old_value.hex(" ")}')
-        print(f'   New bytes: {new_bytes.hex(" ")}')
-        print(f'   New: {value}')
+        for label in streams:
+            print(f'   Container: {label} (recompressed)')
+        for edit, old_bytes, new_bytes in report.changes:
+            print(f'   {edit.location}: {old_bytes.hex(" ")} -> {new_bytes.hex(" ")} ({edit.value})')
+        return report
+
+    def patch_in_place(self, filepath: Path, edits: Sequence[PatchEdit], journal: bool = True) -> PatchReport:
+        """Overwrite just the edited bytes of ``filepath`` through a memory map.
+
+        Only the pages holding an edit are flushed, so latency does not grow
+        with the file. Instead of a full backup, ``journal`` writes the old
+        bytes to a small undo journal (see ``undo``) before touching the file.
+        Compressed containers need a rewrite and are not supported here.
+        """
+        if not filepath.exists():
+            raise FileNotFoundError(f'Save file not found: {filepath}')
+        if not edits:
+            raise ValueError('No edits given')
+        if any(edit.container for edit in edits):
+            raise ValueError('In-place patching only works on raw offsets; use patch_values for containers')
+        self._validate_values(edits)
+        self._validate_bounds(edits, {None: filepath.stat().st_size}, {})
+
+        report = PatchReport(filepath)
+        with open(filepath, 'r+b') as handle, mmap.mmap(handle.fileno(), 0) as view:
+            for edit in edits:
+                new_bytes = edit.value.to_bytes(edit.width, 'little', signed=False)
+                report.changes.append((edit, view[edit.offset:edit.offset + edit.width], new_bytes))
+            if journal:
+                report.journal = self._write_journal(filepath, report.changes)
+
+            for edit, _, new_bytes in report.changes:
+                view[edit.offset:edit.offset + edit.width] = new_bytes
+            for edit, _, _ in report.changes:
+                # flush() wants an offset aligned to the mapping granularity.
+                start = edit.offset - edit.offset % mmap.ALLOCATIONGRANULARITY
+                view.flush(start, edit.offset + edit.width - start)
+            os.fsync(handle.fileno())
+            report.verified = all(
+                view[edit.offset:edit.offset + edit.width] == new_bytes for edit, _, new_bytes in report.changes
+            )
+
+        print(f'✅ Patched {filepath.name} in place ({len(edits)} edit(s))')
+        if report.journal:
+            print(f'   Undo journal: {report.journal}')
+        for edit, old_bytes, new_bytes in report.changes:
+            print(f'   {edit.location}: {old_bytes.hex(" ")} -> {new_bytes.hex(" ")} ({edit.value})')
+        return report
+
+    def undo(self, journal_path: Path) -> Path:
+        """Put back the bytes recorded by ``patch_in_place`` and return the restored file."""
+        entry = json.loads(journal_path.read_text(encoding='utf-8'))
+        filepath = Path(entry['file'])
+        if filepath.stat().st_size != entry['size']:
+            raise RuntimeError(f'{filepath} changed size since the patch; refusing to undo')
+        with open(filepath, 'r+b') as handle, mmap.mmap(handle.fileno(), 0) as view:
+            changes = [(e['offset'], bytes.fromhex(e['old']), bytes.fromhex(e['new'])) for e in entry['edits']]
+            for offset, old_bytes, new_bytes in changes:
+                if view[offset:offset + len(new_bytes)] != new_bytes:
+                    raise RuntimeError(f'{filepath} was modified at {offset:#x} since the patch; refusing to undo')
+            for offset, old_bytes, _ in changes:
+                view[offset:offset + len(old_bytes)] = old_bytes
+            view.flush()
+            os.fsync(handle.fileno())
+        print(f'↩️ Restored {len(changes)} edit(s) in {filepath.name}')
+        return filepath
+
+    def _write_journal(self, filepath: Path, changes: List[Tuple[PatchEdit, bytes, bytes]]) -> Path:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        journal_path = self.backup_dir / f'{filepath.stem}_{timestamp}{filepath.suffix}.undo.json'
+        entry = {
+            'file': str(filepath.resolve()),
+            'size': filepath.stat().st_size,
+            'edits': [{'offset': e.offset, 'old': old.hex(), 'new': new.hex()} for e, old, new in changes],
+        }
+        # Written and synced before the save is touched, so a crash mid-patch is recoverable.
+        atomic_write(journal_path, json.dumps(entry, indent=2).encode('utf-8'))
+        return journal_path
+
+    def _validate_values(self, edits: Sequence[PatchEdit]) -> None:
+        for edit in edits:
+            if edit.width not in [2, 4]:
+                raise ValueError(f'Width must be 2 or 4, got {edit.width}')
+            if edit.width == 2 and not (0 <= edit.value <= 0xFFFF):
+                raise ValueError(f'Value {edit.value} out of range for uint16')
+            if edit.width == 4 and not (0 <= edit.value <= 0xFFFFFFFF):
+                raise ValueError(f'Value {edit.value} out of range for uint32')
+
+    def _resolve_containers(self, raw: bytes, edits: Sequence[PatchEdit]) -> Dict[str, Container]:
+        labels = {edit.container for edit in edits if edit.container}
+        if not labels:
+            return {}
+        found = {c.label: c for c in find_containers(raw)}
+        missing = sorted(labels - found.keys())
+        if missing:
+            raise ValueError(f'Container {missing[0]} not found')
+        return {label: found[label] for label in labels}
+
+    def _validate_bounds(
+        self, edits: Sequence[PatchEdit], sizes: Dict[Optional[str], int], streams: Dict[str, Container]
+    ) -> None:
+        # Raw edits may not touch a stream that is about to be recompressed.
+        claimed: Dict[Optional[str], List[Tuple[int, int]]] = {None: [(s.offset, s.end) for s in streams.values()]}
+        for edit in edits:
+            if edit.offset < 0 or edit.offset + edit.width > sizes[edit.container]:
+                raise ValueError(f'Offset {edit.location} out of bounds')
+            spans = claimed.setdefault(edit.container, [])
+            for start, end in spans:
+                if edit.offset < end and start < edit.offset + edit.width:
+                    raise ValueError(f'Edit at {edit.location} overlaps another edit or a patched container')
+            spans.append((edit.offset, edit.offset + edit.width))
+
+    def _verify_buffer(
+        self,
+        out: bytes,
+        streams: Dict[str, Container],
+        growth: Dict[str, int],
+        changes: List[Tuple[PatchEdit, bytes, bytes]],
+    ) -> bool:
+        # Inflating the rebuilt streams checks the recompressed bytes, not just
+        # our buffer. Raw offsets past a stream move by its change in size.
+        def shift(offset: int) -> int:
+            return offset + sum(growth[label] for label, s in streams.items() if s.end <= offset)
+
+        payloads: Dict[Optional[str], bytes] = {}
+        for label, stream in streams.items():
+            wbits = zlib.MAX_WBITS | 16 if stream.kind == 'gzip' else zlib.MAX_WBITS
+            try:
+                payloads[label] = zlib.decompressobj(wbits).decompress(out[shift(stream.offset):])
+            except zlib.error:
+                return False
+        for edit, _, new_bytes in changes:
+            if edit.container is None:
+                start = shift(edit.offset)
+                actual = out[start:start + edit.width]
+            else:
+                actual = payloads[edit.container][edit.offset:edit.offset + edit.width]
+            if actual != new_bytes:
+                return False
         return True
 
-    def _create_backup(self, filepath: Path):
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_name = f'{filepath.stem}_{timestamp}{filepath.suffix}.bak'
-        backup_path = self.backup_dir / backup_name
-        backup_path.write_bytes(filepath.read_bytes())
-        print(f'📦 Backup: {backup_path}')
-        return backup_path
+    def _create_backup(self, filepath: Path, data: Optional[bytes] = None) -> BackupEntry:
+        entry = self.backups.add(filepath, data)
+        print(f'📦 Backup #{entry.id}: {entry.sha256[:12]} in {self.backup_dir}')
+        return entry
 
-    def verify_patch(self, filepath: Path, offset: int, expected_value: int, width: int) -> bool:
+    def verify_patch(
+        self, filepath: Path, offset: int, expected_value: int, width: int, container: Optional[str] = None
+    ) -> bool:
         blob = filepath.read_bytes()
+        if container:
+            blob = find_container(blob, container).payload
         actual = int.from_bytes(blob[offset:offset+width], 'little')
         return actual == expected_value
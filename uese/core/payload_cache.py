@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+class Inflated(NamedTuple):
+    payload: bytes
+    end: int
+    eof: bool
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PayloadCache:
+    """Decompressed payloads keyed by the SHA-256 of the source file.
+
+    Two tiers: an in-process LRU capped at ``max_memory_bytes`` and an on-disk
+    store capped at ``max_disk_bytes`` that evicts least recently used entries.
+    Each entry also records where the compressed stream ends, so callers can
+    rebuild the header/payload/trailer split without touching zlib.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+    ):
+        root = cache_dir or Path(os.environ.get("UESE_CACHE_DIR") or Path.home() / ".uese_cache")
+        self.cache_dir = Path(root) / "payloads"
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, Tuple[bytes, Dict[str, Any]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        bin_path, meta_path = self._paths(key)
+        try:
+            payload = bin_path.read_bytes()
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta.get("size") != len(payload):
+            return None
+        os.utime(bin_path)  # mtime doubles as the LRU clock
+        self._remember(key, payload, meta)
+        return payload, meta
+
+    def put(self, key: str, payload: bytes, meta: Dict[str, Any]) -> None:
+        payload = bytes(payload)
+        meta = dict(meta, size=len(payload))
+        self._remember(key, payload, meta)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            bin_path, meta_path = self._paths(key)
+            for target, data in ((bin_path, payload), (meta_path, json.dumps(meta).encode("utf-8"))):
+                tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, target)
+            self._evict_disk()
+        except OSError:
+            pass  # the disk tier is best effort; the memory tier still holds the entry
+
+    def inflate(
+        self,
+        data: bytes,
+        offset: int = 0,
+        wbits: int = zlib.MAX_WBITS | 16,
+        digest: Optional[str] = None,
+    ) -> Inflated:
+        """Decompress the stream at ``offset``; raises ``zlib.error`` like zlib does."""
+        key = f"{digest or file_digest(data)}-{offset:x}-{wbits}"
+        cached = self.get(key)
+        if cached is not None:
+            payload, meta = cached
+            return Inflated(payload, meta["end"], True)
+
+        d = zlib.decompressobj(wbits)
+        payload = d.decompress(memoryview(data)[offset:])
+        result = Inflated(payload, len(data) - len(d.unused_data), d.eof)
+        if result.eof:
+            self.put(key, payload, {"offset": offset, "end": result.end, "wbits": wbits})
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir.exists():
+            for path in self.cache_dir.iterdir():
+                path.unlink(missing_ok=True)
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, payload: bytes, meta: Dict[str, Any]) -> None:
+        if len(payload) > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[0])
+            self._memory[key] = (payload, meta)
+            self._memory_bytes += len(payload)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for bin_path in self.cache_dir.glob("*.bin"):
+            try:
+                st = bin_path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, bin_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, bin_path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            bin_path.unlink(missing_ok=True)
+            bin_path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+
+
+_default_cache: Optional[PayloadCache] = None
+
+
+def default_cache() -> Optional[PayloadCache]:
+    """Process-wide cache; ``UESE_CACHE=0`` turns caching off."""
+    global _default_cache
+    if os.environ.get("UESE_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        _default_cache = PayloadCache()
+    return _default_cache
+
+
+def inflate(data: bytes, offset: int = 0, wbits: int = zlib.MAX_WBITS | 16, digest: Optional[str] = None) -> Inflated:
+    cache = default_cache()
+    if cache is not None:
+        return cache.inflate(data, offset, wbits, digest)
+    d = zlib.decompressobj(wbits)
+    payload = d.decompress(memoryview(data)[offset:])
+    return Inflated(payload, len(data) - len(d.unused_data), d.eof)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .universal_scanner import DTYPE_WIDTHS, ScanCandidate, UniversalScanner, dtype_range, np
+
+RELATIONS = ("increased", "decreased", "unchanged", "changed")
+META_FILE = "session.json"
+
+
+class ScanSession:
+    """Cheat-Engine-style "next scan" state kept on disk between invocations.
+
+    Surviving offsets and the value history of every survivor are stored per
+    dtype as ``.npy`` files. Counting and listing memory-map them; narrowing
+    touches every survivor anyway, so it reads them whole and nothing is
+    mapped when it replaces the files (Windows refuses to replace a file
+    that is still mapped).
+    """
+
+    def __init__(self, path: Path, meta: Dict[str, Any]):
+        self.path = Path(path)
+        self.meta = meta
+
+    @classmethod
+    def create(
+        cls,
+        path: Path,
+        save: Path,
+        value: Optional[int] = None,
+        width: int = 4,
+        dtype: str = "auto",
+        exclude: List[str] | None = None,
+        scanner: UniversalScanner | None = None,
+    ) -> "ScanSession":
+        if np is None:
+            raise RuntimeError("Scan sessions require numpy")
+        scanner = scanner or UniversalScanner(use_numpy=True)
+        if not scanner.use_numpy:
+            raise RuntimeError("Scan sessions need a scanner with the NumPy engine (use_numpy=True)")
+        exclude = exclude or ["png", "entropy"]
+        dtypes = scanner.resolve_dtypes(width, dtype)
+
+        blob = Path(save).read_bytes()
+        allowed = ~scanner.excluded_index([blob], exclude).mask(len(blob))
+
+        session = cls(
+            path,
+            {
+                "version": 1,
+                "width": width,
+                "dtype": dtype,
+                "exclude": exclude,
+                "dtypes": dtypes,
+                "steps": [{"save": str(Path(save).resolve()), "value": value}],
+            },
+        )
+        session.path.mkdir(parents=True, exist_ok=True)
+        for dt in dtypes:
+            w = DTYPE_WIDTHS[dt]
+            if value is None:
+                # Unknown initial value: every non-excluded offset survives.
+                offsets = np.flatnonzero(allowed[: max(0, len(blob) - w + 1)])
+            else:
+                lo, hi = dtype_range(dt)
+                if lo <= value <= hi:
+                    offsets = scanner.match_offsets(blob, value, dt)
+                    offsets = offsets[allowed[offsets]]
+                else:
+                    offsets = np.empty(0, dtype=np.int64)
+            history = scanner.gather(blob, offsets, dt).astype(np.int64).reshape(-1, 1)
+            session._store(dt, offsets, history)
+        session._write_meta()
+        return session
+
+    @classmethod
+    def open(cls, path: Path) -> "ScanSession":
+        if np is None:
+            raise RuntimeError("Scan sessions require numpy")
+        meta_path = Path(path) / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No scan session in {path}")
+        return cls(path, json.loads(meta_path.read_text(encoding="utf-8")))
+
+    def narrow(
+        self,
+        save: Path,
+        value: Optional[int] = None,
+        relation: Optional[str] = None,
+        delta: Optional[int] = None,
+    ) -> int:
+        if sum(x is not None for x in (value, relation, delta)) != 1:
+            raise ValueError("Give exactly one of value, relation or delta")
+        if relation is not None and relation not in RELATIONS:
+            raise ValueError(f"Unknown relation: {relation} (expected one of {', '.join(RELATIONS)})")
+
+        blob = Path(save).read_bytes()
+        scanner = UniversalScanner(use_numpy=True)
+        survivors = 0
+        for dt in self.meta["dtypes"]:
+            offsets, history = self._load(dt, mmap=False)
+            # Survivors that no longer fit in a shorter save cannot match.
+            fits = offsets <= len(blob) - DTYPE_WIDTHS[dt]
+            offsets, history = offsets[fits], history[fits]
+
+            current = scanner.gather(blob, offsets, dt).astype(np.int64)
+            previous = history[:, -1]
+            if value is not None:
+                keep = current == value
+            elif delta is not None:
+                keep = (current - previous) == delta
+            elif relation == "increased":
+                keep = current > previous
+            elif relation == "decreased":
+                keep = current < previous
+            elif relation == "unchanged":
+                keep = current == previous
+            else:
+                keep = current != previous
+            self._store(dt, offsets[keep], np.column_stack([history[keep], current[keep]]))
+            survivors += int(keep.sum())
+
+        self.meta["steps"].append(
+            {"save": str(Path(save).resolve()), "value": value, "relation": relation, "delta": delta}
+        )
+        self._write_meta()
+        return survivors
+
+    def counts(self) -> Dict[str, int]:
+        return {dt: len(self._load(dt)[0]) for dt in self.meta["dtypes"]}
+
+    def count(self) -> int:
+        return sum(self.counts().values())
+
+    def candidates(self, limit: int = 2000) -> List[ScanCandidate]:
+        """Survivors as ScanCandidates; ranked with the scanner score once at most ``limit`` remain."""
+        candidates: List[ScanCandidate] = []
+        for dt in self.meta["dtypes"]:
+            offsets, history = self._load(dt)
+            w = DTYPE_WIDTHS[dt]
+            for offset, values in zip(offsets[:limit].tolist(), history[:limit].tolist()):
+                candidates.append(ScanCandidate(offset, w, dt, tuple(values)))
+
+        saves = [Path(step["save"]) for step in self.meta["steps"]]
+        if self.count() > limit or len(saves) < 2 or not all(p.exists() for p in saves):
+            return sorted(candidates, key=lambda c: (c.offset, c.dtype))[:limit]
+
+        blobs = [p.read_bytes() for p in saves]
+        scanner = UniversalScanner(use_numpy=True)
+        for c in candidates:
+            c.score, c.diffs = scanner.score(blobs, c)
+            c.diff_ab, c.diff_bc = (c.diffs + (0, 0))[:2]
+            # The scanner cuts the hex context from the first save, too.
+            c.source = blobs[0]
+        return sorted(candidates, key=lambda c: (-c.score, c.offset, c.dtype))
+
+    def _files(self, dtype: str):
+        return self.path / f"{dtype}.offsets.npy", self.path / f"{dtype}.history.npy"
+
+    def _load(self, dtype: str, mmap: bool = True):
+        mode = "r" if mmap else None
+        offsets_path, history_path = self._files(dtype)
+        return np.load(offsets_path, mmap_mode=mode), np.load(history_path, mmap_mode=mode)
+
+    def _store(self, dtype: str, offsets, history) -> None:
+        offsets = np.asarray(offsets)
+        # u4 keeps the survivor list at half the size for any save under 4 GiB.
+        offset_dtype = "<u4" if not len(offsets) or offsets.max() < 2**32 else "<i8"
+        arrays = (offsets.astype(offset_dtype), np.asarray(history, dtype="<i8"))
+        for target, arr in zip(self._files(dtype), arrays):
+            tmp = target.with_suffix(".tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, target)
+
+    def _write_meta(self) -> None:
+        (self.path / META_FILE).write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
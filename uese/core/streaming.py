@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import mmap
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Callable, Optional, Union
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+# A decompressed payload past this size is treated as a malformed (or hostile) stream.
+DEFAULT_MAX_PAYLOAD_BYTES = 2 << 30
+
+
+@dataclass
+class StreamedPayload:
+    """A stream inflated from a file; ``data`` is writable in place either way."""
+
+    data: Union[bytearray, mmap.mmap]
+    offset: int
+    end: int
+    eof: bool
+    # Set when the payload was spilled: the anonymous temp file behind ``data``.
+    spill: Optional[IO[bytes]] = None
+
+    def close(self) -> None:
+        if self.spill is not None:
+            self.data.close()
+            self.spill.close()
+            self.spill = None
+
+
+def find_in_file(path: Path, needle: bytes, start: int = 0, chunk_size: int = DEFAULT_CHUNK_BYTES) -> int:
+    """Offset of the first ``needle`` at or after ``start``, reading ``chunk_size`` bytes at a time; -1 if absent."""
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        carry, base = b"", start
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return -1
+            window = carry + chunk
+            found = window.find(needle)
+            if found != -1:
+                return base + found
+            # Keep enough of the tail to catch a needle split across reads.
+            keep = min(len(needle) - 1, len(window))
+            base += len(window) - keep
+            carry = window[len(window) - keep :]
+
+
+def inflate_file(
+    path: Path,
+    offset: int = 0,
+    wbits: int = zlib.MAX_WBITS | 16,
+    chunk_size: int = DEFAULT_CHUNK_BYTES,
+    max_size: Optional[int] = DEFAULT_MAX_PAYLOAD_BYTES,
+    spill: bool = False,
+    on_chunk: Optional[Callable[[bytes], None]] = None,
+) -> StreamedPayload:
+    """Decompress the stream at ``offset`` of ``path`` without reading the whole file.
+
+    Compressed input is read ``chunk_size`` bytes at a time and each
+    ``decompress`` call is capped at ``chunk_size`` bytes of output, so memory
+    holds one chunk of each plus the payload itself, which grows only as far
+    as ``max_size`` (ValueError beyond it). With ``spill`` the payload goes to
+    an anonymous temp file mapped back with mmap, so it need not fit in RAM.
+    ``on_chunk`` sees every piece of output in order, e.g. to index markers
+    while the payload is still arriving.
+    """
+    sink = tempfile.TemporaryFile(prefix="uese_payload_") if spill else None
+    data = bytearray()
+    size = 0
+    d = zlib.decompressobj(wbits)
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(offset)
+            read = 0
+            while not d.eof:
+                if d.unconsumed_tail:
+                    out = d.decompress(d.unconsumed_tail, chunk_size)
+                else:
+                    block = handle.read(chunk_size)
+                    read += len(block)
+                    # Out of input: drain what zlib still holds and stop.
+                    out = d.decompress(block, chunk_size) if block else d.flush()
+                    if not block and not out:
+                        break
+                size += len(out)
+                if max_size is not None and size > max_size:
+                    raise ValueError(f"Decompressed payload exceeds {max_size} bytes; refusing to continue")
+                if sink is not None:
+                    sink.write(out)
+                else:
+                    data += out
+                if on_chunk is not None and out:
+                    on_chunk(out)
+        end = offset + read - len(d.unused_data)
+        if sink is not None and size:
+            sink.flush()
+            return StreamedPayload(mmap.mmap(sink.fileno(), size), offset, end, d.eof, sink)
+        if sink is not None:
+            sink.close()
+        return StreamedPayload(data, offset, end, d.eof)
+    except BaseException:
+        if sink is not None:
+            sink.close()
+        raise
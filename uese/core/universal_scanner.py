@@ -1,30 +1,143 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import math
+import os
 import struct
-from dataclasses import dataclass
+from bisect import bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from .containers import find_containers
+from .entropy import high_entropy_regions, shannon_entropy
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency (numpy)
+    np = None
 
 PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
 
+DTYPE_WIDTHS = {"u16": 2, "s16": 2, "u32": 4, "s32": 4}
+NUMPY_DTYPES = {"u16": "<u2", "s16": "<i2", "u32": "<u4", "s32": "<i4"}
+# Smallest byte range worth shipping to a worker when a scan is split up.
+MIN_CHUNK_BYTES = 1 << 16
+
+# Called with the finished fraction of a scan (0.0 - 1.0); may raise to abort it.
+Progress = Callable[[float], None]
+
+
+def hexdump_context(blob: bytes, offset: int, before: int = 16, after: int = 48) -> str:
+    start = max(0, offset - before)
+    end = min(len(blob), offset + after)
+    return f"{start:#x}..{end:#x} | " + " ".join(f"{b:02x}" for b in blob[start:end])
+
+
+def dtype_range(dtype: str) -> Tuple[int, int]:
+    bits = DTYPE_WIDTHS[dtype] * 8
+    if dtype.startswith("s"):
+        return -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    return 0, (1 << bits) - 1
+
 
 @dataclass
 class ScanCandidate:
     offset: int
     width: int
     dtype: str
-    values: Tuple[int, int, int]
+    values: Tuple[int, ...]
     score: int = 0
     diff_ab: int = 0
     diff_bc: int = 0
-    context_hex: str = ""
+    diffs: Tuple[int, ...] = ()
+    container: str = ""
+    # The blob the candidate was found in; context_hex is cut from it on first use.
+    source: Optional[bytes] = field(default=None, repr=False, compare=False)
+
+    @property
+    def location(self) -> str:
+        return f"{self.container}+{self.offset:#x}" if self.container else f"{self.offset:#x}"
+
+    @cached_property
+    def context_hex(self) -> str:
+        # Formatting is the costly part of ranking big result sets, so it only
+        # happens for the candidates somebody actually looks at.
+        return hexdump_context(self.source, self.offset) if self.source is not None else ""
+
+
+class RegionIndex:
+    """Sorted, non-overlapping [start, end) regions compiled for fast lookups."""
+
+    def __init__(self, regions: List[Tuple[int, int]]):
+        self.regions = regions
+        self._starts = [s for s, _ in regions]
+
+    def __contains__(self, offset: int) -> bool:
+        i = bisect_right(self._starts, offset) - 1
+        return i >= 0 and offset < self.regions[i][1]
+
+    def allowed_spans(self, start: int, stop: int) -> Iterator[Tuple[int, int]]:
+        cursor = start
+        for s, e in self.regions[max(0, bisect_right(self._starts, start) - 1) :]:
+            if s >= stop:
+                break
+            if s > cursor:
+                yield cursor, s
+            cursor = max(cursor, e)
+        if cursor < stop:
+            yield cursor, stop
+
+    def clip(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        # Regions overlapping [start, stop), cut to it and rebased to ``start``.
+        clipped = []
+        for s, e in self.regions[max(0, bisect_right(self._starts, start) - 1) :]:
+            if s >= stop:
+                break
+            if e > start:
+                clipped.append((max(s, start) - start, min(e, stop) - start))
+        return clipped
+
+    def mask(self, n: int):
+        excluded = np.zeros(n, dtype=bool)
+        for s, e in self.regions:
+            excluded[s:e] = True
+        return excluded
+
+
+@dataclass
+class ScanContext:
+    """State of one scan call over one address space.
+
+    Lives outside the scanner so a single UniversalScanner can run several
+    scans at once (the backend serves them from a worker pool).
+    """
+
+    excluded: RegionIndex = field(default_factory=lambda: RegionIndex([]))
+    # Called with (done, total) units of work finished in this space.
+    report: Optional[Callable[[int, int], None]] = None
 
 
 class UniversalScanner:
-    def __init__(self):
-        self.excluded_regions: List[Tuple[int, int]] = []
+    def __init__(
+        self,
+        use_numpy: bool | None = None,
+        entropy_window: int = 4096,
+        entropy_step: int = 2048,
+        entropy_threshold: float = 7.7,
+        jobs: int = 1,
+    ):
+        if use_numpy and np is None:
+            raise RuntimeError("NumPy engine requested but numpy is not installed")
+        if jobs < 0:
+            raise ValueError(f"jobs must be >= 0 (0 = all cores), got {jobs}")
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        self.jobs = jobs or os.cpu_count() or 1
+        self.entropy_window = entropy_window
+        self.entropy_step = entropy_step
+        self.entropy_threshold = entropy_threshold
 
     def scan_saves(
         self,
@@ -35,14 +148,18 @@ class UniversalScanner:
         width: int = 4,
         dtype: str = "auto",
         exclude: List[str] | None = None,
+        containers: bool = False,
+        progress: Optional[Progress] = None,
     ) -> List[ScanCandidate]:
-        blobs = [p.read_bytes() for p in [save_a, save_b, save_c]]
-        self.excluded_regions = self._find_excluded_regions(blobs, exclude or ["png", "entropy"])
-        candidates = self._scan_candidates(blobs, values, width, dtype)
-        for c in candidates:
-            c.score, c.diff_ab, c.diff_bc = self._score(blobs, c)
-            c.context_hex = self._hexdump_context(blobs[0], c.offset)
-        return sorted(candidates, key=lambda c: (-c.score, c.offset, c.dtype))
+        return self.scan_series(
+            [save_a, save_b, save_c],
+            values,
+            width=width,
+            dtype=dtype,
+            exclude=exclude,
+            containers=containers,
+            progress=progress,
+        )
 
     def scan_deltas(
         self,
@@ -53,98 +170,372 @@ class UniversalScanner:
         width: int = 4,
         dtype: str = "auto",
         exclude: List[str] | None = None,
+        containers: bool = False,
+        progress: Optional[Progress] = None,
     ) -> List[ScanCandidate]:
-        blobs = [p.read_bytes() for p in [save_a, save_b, save_c]]
-        self.excluded_regions = self._find_excluded_regions(blobs, exclude or ["png", "entropy"])
+        return self.scan_delta_series(
+            [save_a, save_b, save_c],
+            deltas,
+            width=width,
+            dtype=dtype,
+            exclude=exclude,
+            containers=containers,
+            progress=progress,
+        )
 
-        n = min(len(b) for b in blobs)
-        dtype_map = {"u16": 2, "s16": 2, "u32": 4, "s32": 4}
-        dtypes = ["u16", "s16", "u32", "s32"] if dtype == "auto" else [dtype]
+    def scan_series(
+        self,
+        saves: Sequence[Path],
+        values: Sequence[int],
+        width: int = 4,
+        dtype: str = "auto",
+        exclude: List[str] | None = None,
+        containers: bool = False,
+        progress: Optional[Progress] = None,
+    ) -> List[ScanCandidate]:
+        """Find offsets holding ``values[i]`` in ``saves[i]`` for every save (2 or more).
+
+        With ``containers`` the decompressed payload of every embedded gzip/zlib
+        stream is scanned as its own address space; hits there carry the
+        container label and a payload-relative offset. ``progress`` is called
+        after every dtype/chunk of work; an exception raised from it aborts
+        the scan.
+        """
+        if len(saves) < 2 or len(saves) != len(values):
+            raise ValueError(f"Need at least 2 saves and one value per save, got {len(saves)} saves / {len(values)} values")
+        blobs = [Path(p).read_bytes() for p in saves]
         candidates: List[ScanCandidate] = []
+        with self._executor() as pool:
+            spaces = self._address_spaces(blobs, exclude or ["png", "entropy"], containers)
+            for i, (label, space, excluded, count) in enumerate(spaces):
+                ctx = ScanContext(excluded, self._space_progress(progress, i, count))
+                found = self._scan_space(pool, "values", space, tuple(values), width, dtype, ctx)
+                candidates.extend(self._rank(space, found, label))
+        return sorted(candidates, key=lambda c: (-c.score, c.container, c.offset, c.dtype))
+
+    def scan_delta_series(
+        self,
+        saves: Sequence[Path],
+        deltas: Sequence[int],
+        width: int = 4,
+        dtype: str = "auto",
+        exclude: List[str] | None = None,
+        containers: bool = False,
+        progress: Optional[Progress] = None,
+    ) -> List[ScanCandidate]:
+        """Find offsets whose value changes by ``deltas[i]`` between ``saves[i]`` and ``saves[i + 1]``."""
+        if len(saves) < 2 or len(deltas) != len(saves) - 1:
+            raise ValueError(f"Need at least 2 saves and len(saves) - 1 deltas, got {len(saves)} saves / {len(deltas)} deltas")
+        blobs = [Path(p).read_bytes() for p in saves]
+        candidates: List[ScanCandidate] = []
+        with self._executor() as pool:
+            spaces = self._address_spaces(blobs, exclude or ["png", "entropy"], containers)
+            for i, (label, space, excluded, count) in enumerate(spaces):
+                ctx = ScanContext(excluded, self._space_progress(progress, i, count))
+                found = self._scan_space(pool, "deltas", space, tuple(deltas), width, dtype, ctx)
+                candidates.extend(self._rank(space, found, label))
+        return sorted(candidates, key=lambda c: (-c.score, c.container, c.offset, c.dtype))
+
+    def _executor(self):
+        if self.jobs == 1:
+            return nullcontext()
+        # The NumPy kernels release the GIL, so threads share the blobs without
+        # copying; the pure-Python loops need separate processes to scale.
+        if self.use_numpy:
+            return ThreadPoolExecutor(max_workers=self.jobs)
+        return ProcessPoolExecutor(max_workers=self.jobs)
+
+    def _scan_space(
+        self,
+        pool: Executor | None,
+        kind: str,
+        blobs: List[bytes],
+        targets: Tuple[int, ...],
+        width: int,
+        dtype: str,
+        ctx: ScanContext,
+    ) -> List[ScanCandidate]:
+        dtypes = self.resolve_dtypes(width, dtype, strict=kind == "values")
+        found: List[ScanCandidate] = []
+        if pool is None:
+            scan = self._scan_candidates if kind == "values" else self._scan_delta_candidates
+            for done, dt in enumerate(dtypes, 1):
+                found.extend(scan(blobs, targets, width, dt, ctx))
+                if ctx.report is not None:
+                    ctx.report(done, len(dtypes))
+            return found
 
+        # Split by dtype first, then cut each dtype's offset range into chunks.
+        # A chunk owns offsets [start, start + size) and carries width - 1
+        # extra bytes so values straddling the boundary are still read whole.
+        n = min(len(b) for b in blobs)
+        parts = -(-self.jobs // max(1, len(dtypes)))
+        size = max(MIN_CHUNK_BYTES, -(-n // parts))
+        jobs = []
         for dt in dtypes:
-            if dt not in dtype_map:
-                continue
-            w = dtype_map[dt]
-            if width in (2, 4) and w != width:
-                continue
+            for start in range(0, n, size):
+                stop = min(start + size + DTYPE_WIDTHS[dt] - 1, n)
+                chunk = [self._chunk(b, start, stop) for b in blobs]
+                regions = ctx.excluded.clip(start, stop)
+                jobs.append((start, pool.submit(self._scan_chunk, kind, chunk, targets, width, dt, regions)))
 
-            for i in range(0, n - w + 1):
-                if self._in_excluded(i):
-                    continue
-                va = self._read_num(blobs[0], i, dt)
-                vb = self._read_num(blobs[1], i, dt)
-                vc = self._read_num(blobs[2], i, dt)
-                if (vb - va) == deltas[0] and (vc - vb) == deltas[1]:
-                    c = ScanCandidate(i, w, dt, (va, vb, vc))
-                    c.score, c.diff_ab, c.diff_bc = self._score(blobs, c)
-                    c.context_hex = self._hexdump_context(blobs[0], c.offset)
-                    candidates.append(c)
+        for done, (start, job) in enumerate(jobs, 1):
+            for c in job.result():
+                c.offset += start
+                found.append(c)
+            if ctx.report is not None:
+                ctx.report(done, len(jobs))
+        return found
 
-        return sorted(candidates, key=lambda c: (-c.score, c.offset, c.dtype))
+    @staticmethod
+    def _space_progress(progress: Optional[Progress], index: int, count: int):
+        # Maps "done of total" inside address space ``index`` onto the whole scan.
+        if progress is None:
+            return None
+        return lambda done, total: progress((index + done / max(1, total)) / count)
 
-    def _scan_candidates(
+    def _chunk(self, blob: bytes, start: int, stop: int):
+        # Threads read the shared blob through a view; processes get a copy to pickle.
+        return memoryview(blob)[start:stop] if self.use_numpy else blob[start:stop]
+
+    def _scan_chunk(
         self,
+        kind: str,
         blobs: List[bytes],
-        values: Tuple[int, int, int],
+        targets: Tuple[int, ...],
         width: int,
         dtype: str,
+        regions: List[Tuple[int, int]],
     ) -> List[ScanCandidate]:
-        n = min(len(b) for b in blobs)
-        candidates: List[ScanCandidate] = []
+        scan = self._scan_candidates if kind == "values" else self._scan_delta_candidates
+        return scan(blobs, targets, width, dtype, ScanContext(RegionIndex(regions)))
+
+    def _address_spaces(
+        self, blobs: List[bytes], exclude: List[str], containers: bool
+    ) -> Iterator[Tuple[str, List[bytes], RegionIndex, int]]:
+        # Each space comes with its own exclusion index and the total number of spaces.
+        if not containers:
+            yield "", blobs, self.excluded_index(blobs, exclude), 1
+            return
+
+        found = [find_containers(b) for b in blobs]
+        groups = [group for group in zip(*found) if len({c.kind for c in group}) == 1]
+        # The compressed bytes themselves are noise in the raw file.
+        streams = [(c.offset, c.end) for per_blob in found for c in per_blob]
+        regions = self._merge_regions(self._find_excluded_regions(blobs, exclude) + streams)
+        yield "", blobs, RegionIndex(regions), 1 + len(groups)
 
-        dtype_map = {
-            "u16": 2,
-            "s16": 2,
-            "u32": 4,
-            "s32": 4,
-        }
+        for group in groups:
+            payloads = [c.payload for c in group]
+            yield group[0].label, payloads, self.excluded_index(payloads, exclude), 1 + len(groups)
+
+    def _rank(self, blobs: List[bytes], candidates: List[ScanCandidate], container: str = "") -> List[ScanCandidate]:
+        for c in candidates:
+            c.container = container
+            c.score, c.diffs = self.score(blobs, c)
+            c.diff_ab, c.diff_bc = (c.diffs + (0, 0))[:2]
+            c.source = blobs[0]
+        return candidates
+
+    def resolve_dtypes(self, width: int, dtype: str, strict: bool = True) -> List[str]:
+        """The concrete dtypes a ``dtype`` / ``width`` pair stands for ("auto" expands)."""
         if dtype == "auto":
             dtypes = ["u16", "s16", "u32", "s32"]
-        else:
-            if dtype not in dtype_map:
-                raise ValueError(f"Unsupported dtype: {dtype}")
+        elif dtype in DTYPE_WIDTHS:
             dtypes = [dtype]
+        elif strict:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        else:
+            return []
+        return [dt for dt in dtypes if width not in (2, 4) or DTYPE_WIDTHS[dt] == width]
+
+    def _scan_delta_candidates(
+        self,
+        blobs: List[bytes],
+        deltas: Tuple[int, ...],
+        width: int,
+        dtype: str,
+        ctx: ScanContext,
+    ) -> List[ScanCandidate]:
+        n = min(len(b) for b in blobs)
+        dtypes = self.resolve_dtypes(width, dtype, strict=False)
+
+        if self.use_numpy:
+            return self._scan_delta_candidates_numpy(blobs, deltas, dtypes, n, ctx)
 
+        candidates: List[ScanCandidate] = []
         for dt in dtypes:
-            w = dtype_map[dt]
-            if width in (2, 4) and w != width:
-                continue
-            for i in range(0, n - w + 1):
-                if self._in_excluded(i):
-                    continue
+            w = DTYPE_WIDTHS[dt]
+            rows = []
+            for i in self._allowed_offsets(n - w + 1, ctx):
                 va = self._read_num(blobs[0], i, dt)
                 vb = self._read_num(blobs[1], i, dt)
-                vc = self._read_num(blobs[2], i, dt)
-                if (va, vb, vc) == values:
-                    candidates.append(ScanCandidate(i, w, dt, values))
+                if vb - va == deltas[0]:
+                    rows.append((i, [va, vb]))
+            # Later saves only revisit offsets that survived the earlier ones.
+            for blob, delta in zip(blobs[2:], deltas[1:]):
+                survivors = []
+                for i, vals in rows:
+                    v = self._read_num(blob, i, dt)
+                    if v - vals[-1] == delta:
+                        vals.append(v)
+                        survivors.append((i, vals))
+                rows = survivors
+            candidates.extend(ScanCandidate(i, w, dt, tuple(vals)) for i, vals in rows)
         return candidates
 
+    def _scan_delta_candidates_numpy(
+        self,
+        blobs: List[bytes],
+        deltas: Tuple[int, ...],
+        dtypes: List[str],
+        n: int,
+        ctx: ScanContext,
+    ) -> List[ScanCandidate]:
+        candidates: List[ScanCandidate] = []
+        excluded = ctx.excluded.mask(n)
+        for dt in dtypes:
+            w = DTYPE_WIDTHS[dt]
+            offsets, columns = [], [[], []]
+            for align in range(w):
+                count = (n - align) // w
+                if count <= 0:
+                    continue
+                # Widen to int64 before subtracting so u32/s32 differences
+                # behave like Python ints instead of wrapping around.
+                va, vb = (
+                    np.frombuffer(blob, dtype=NUMPY_DTYPES[dt], count=count, offset=align).astype(np.int64)
+                    for blob in blobs[:2]
+                )
+                match = (vb - va) == deltas[0]
+                match &= ~excluded[align : align + count * w : w]
+                idx = np.flatnonzero(match)
+                offsets.append(idx * w + align)
+                columns[0].append(va[idx])
+                columns[1].append(vb[idx])
+            if not offsets:
+                continue
+            offsets = np.concatenate(offsets)
+            order = np.argsort(offsets, kind="stable")
+            offsets = offsets[order]
+            columns = [np.concatenate(col)[order] for col in columns]
+            for blob, delta in zip(blobs[2:], deltas[1:]):
+                vals = self.gather(blob, offsets, dt).astype(np.int64)
+                keep = (vals - columns[-1]) == delta
+                offsets = offsets[keep]
+                columns = [col[keep] for col in columns] + [vals[keep]]
+            rows = zip(offsets.tolist(), *(col.tolist() for col in columns))
+            candidates.extend(ScanCandidate(i, w, dt, tuple(vals)) for i, *vals in rows)
+        return candidates
+
+    def _scan_candidates(
+        self,
+        blobs: List[bytes],
+        values: Tuple[int, ...],
+        width: int,
+        dtype: str,
+        ctx: ScanContext,
+    ) -> List[ScanCandidate]:
+        n = min(len(b) for b in blobs)
+        dtypes = self.resolve_dtypes(width, dtype)
+
+        if self.use_numpy:
+            return self._scan_candidates_numpy(blobs, values, dtypes, n, ctx)
+
+        candidates: List[ScanCandidate] = []
+        for dt in dtypes:
+            w = DTYPE_WIDTHS[dt]
+            offsets = [i for i in self._allowed_offsets(n - w + 1, ctx) if self._read_num(blobs[0], i, dt) == values[0]]
+            for blob, value in zip(blobs[1:], values[1:]):
+                offsets = [i for i in offsets if self._read_num(blob, i, dt) == value]
+            candidates.extend(ScanCandidate(i, w, dt, values) for i in offsets)
+        return candidates
+
+    def _scan_candidates_numpy(
+        self,
+        blobs: List[bytes],
+        values: Tuple[int, ...],
+        dtypes: List[str],
+        n: int,
+        ctx: ScanContext,
+    ) -> List[ScanCandidate]:
+        candidates: List[ScanCandidate] = []
+        excluded = ctx.excluded.mask(n)
+        for dt in dtypes:
+            lo, hi = dtype_range(dt)
+            if not all(lo <= v <= hi for v in values):
+                continue
+            w = DTYPE_WIDTHS[dt]
+            offsets = self.match_offsets(blobs[0], values[0], dt, n)
+            offsets = offsets[~excluded[offsets]]
+            for blob, value in zip(blobs[1:], values[1:]):
+                offsets = offsets[self.gather(blob, offsets, dt) == value]
+            candidates.extend(ScanCandidate(i, w, dt, values) for i in offsets.tolist())
+        return candidates
+
+    def match_offsets(self, blob: bytes, value: int, dtype: str, n: int | None = None):
+        """Sorted offsets below ``n`` (default: all of ``blob``) holding ``value``; NumPy engine only."""
+        self._require_numpy()
+        n = len(blob) if n is None else n
+        # One strided view per byte alignment covers every offset exactly once:
+        # view[k] of alignment a holds the value stored at offset a + k * width.
+        w = DTYPE_WIDTHS[dtype]
+        hits = []
+        for align in range(w):
+            count = (n - align) // w
+            if count <= 0:
+                continue
+            view = np.frombuffer(blob, dtype=NUMPY_DTYPES[dtype], count=count, offset=align)
+            hits.append(np.flatnonzero(view == value) * w + align)
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(hits))
+
+    def gather(self, blob: bytes, offsets, dtype: str):
+        """Values at ``offsets`` (any alignment) as a NumPy array; NumPy engine only."""
+        self._require_numpy()
+        # Reads each value without touching the rest of the blob.
+        w = DTYPE_WIDTHS[dtype]
+        raw = np.frombuffer(blob, dtype=np.uint8)
+        if len(raw) < w:
+            return np.empty(0, dtype=NUMPY_DTYPES[dtype])
+        rows = np.lib.stride_tricks.sliding_window_view(raw, w)[offsets]
+        return np.ascontiguousarray(rows).view(NUMPY_DTYPES[dtype]).reshape(-1)
+
     def _read_num(self, blob: bytes, offset: int, dtype: str) -> int:
         width = 2 if dtype.endswith("16") else 4
         signed = dtype.startswith("s")
         return int.from_bytes(blob[offset : offset + width], "little", signed=signed)
 
-    def _score(self, blobs: List[bytes], c: ScanCandidate) -> Tuple[int, int, int]:
+    def score(self, blobs: List[bytes], c: ScanCandidate) -> Tuple[int, Tuple[int, ...]]:
+        """Confidence score of ``c`` and the byte differences around it between consecutive saves."""
         span = 64
         start = max(0, c.offset - span)
-        end = min(len(blobs[0]), len(blobs[1]), len(blobs[2]), c.offset + c.width + span)
-        diff_ab = sum(a != b for a, b in zip(blobs[0][start:end], blobs[1][start:end]))
-        diff_bc = sum(a != b for a, b in zip(blobs[1][start:end], blobs[2][start:end]))
-        noise = diff_ab + diff_bc
+        end = min(min(len(b) for b in blobs), c.offset + c.width + span)
+        windows = [b[start:end] for b in blobs]
+        diffs = tuple(sum(x != y for x, y in zip(wa, wb)) for wa, wb in zip(windows, windows[1:]))
+        # Scale the noise of N saves to the two-pair baseline so the
+        # thresholds below mean the same thing for any number of saves.
+        noise = sum(diffs) * 2 // len(diffs)
 
         score = 0
-        local_a = blobs[0][c.offset : c.offset + c.width]
-        local_b = blobs[1][c.offset : c.offset + c.width]
-        local_c = blobs[2][c.offset : c.offset + c.width]
-        if local_a != local_b and local_b != local_c:
+        local = [b[c.offset : c.offset + c.width] for b in blobs]
+        if all(x != y for x, y in zip(local, local[1:])):
             score += 300
         if c.offset % c.width == 0:
             score += 40
         score += max(0, 500 - noise)
         if noise > 420:
             score -= 250
-        return score, diff_ab, diff_bc
+        return score, diffs
+
+    def excluded_index(self, blobs: List[bytes], exclude_kinds: List[str]) -> RegionIndex:
+        """Regions of ``blobs`` that ``exclude_kinds`` ("png", "entropy", "none") keep out of a scan."""
+        return RegionIndex(self._find_excluded_regions(blobs, exclude_kinds))
+
+    def _require_numpy(self) -> None:
+        if not self.use_numpy:
+            raise RuntimeError("This needs the NumPy engine; create the scanner with use_numpy=True")
 
     def _find_excluded_regions(self, blobs: List[bytes], exclude_kinds: List[str]) -> List[Tuple[int, int]]:
         regions: List[Tuple[int, int]] = []
@@ -181,31 +572,21 @@ class UniversalScanner:
         return regions
 
     def _find_entropy_regions(
-        self, blob: bytes, window: int = 4096, step: int = 2048, threshold: float = 7.7
+        self,
+        blob: bytes,
+        window: int | None = None,
+        step: int | None = None,
+        threshold: float | None = None,
     ) -> List[Tuple[int, int]]:
-        regions: List[Tuple[int, int]] = []
-        if len(blob) < window:
-            return regions
-        for i in range(0, len(blob) - window + 1, step):
-            ent = self._entropy(blob[i : i + window])
-            if ent >= threshold:
-                regions.append((i, i + window))
-        return self._merge_regions(regions)
+        return high_entropy_regions(
+            blob,
+            self.entropy_window if window is None else window,
+            self.entropy_step if step is None else step,
+            self.entropy_threshold if threshold is None else threshold,
+        )
 
     def _entropy(self, data: bytes) -> float:
-        if not data:
-            return 0.0
-        freq = [0] * 256
-        for b in data:
-            freq[b] += 1
-        n = len(data)
-        h = 0.0
-        for c in freq:
-            if c == 0:
-                continue
-            p = c / n
-            h -= p * math.log2(p)
-        return h
+        return shannon_entropy(data)
 
     def _merge_regions(self, regions: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
         if not regions:
@@ -219,10 +600,6 @@ class UniversalScanner:
                 merged.append([s, e])
         return [(s, e) for s, e in merged]
 
-    def _in_excluded(self, offset: int) -> bool:
-        return any(s <= offset < e for s, e in self.excluded_regions)
-
-    def _hexdump_context(self, blob: bytes, offset: int, before: int = 16, after: int = 48) -> str:
-        start = max(0, offset - before)
-        end = min(len(blob), offset + after)
-        return f"{start:#x}..{end:#x} | " + " ".join(f"{b:02x}" for b in blob[start:end])
+    def _allowed_offsets(self, stop: int, ctx: ScanContext) -> Iterator[int]:
+        for lo, hi in ctx.excluded.allowed_spans(0, stop):
+            yield from range(lo, hi)
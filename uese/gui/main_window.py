@@ -20,6 +20,8 @@ def create_scanner_tab():
         [sg.Text('Value in A:'), sg.Input(key='-VAL_A-', size=(15,1)),
          sg.Text('Value in B:'), sg.Input(key='-VAL_B-', size=(15,1)),
          sg.Text('Value in C:'), sg.Input(key='-VAL_C-', size=(15,1))],
+        [sg.Text('More saves (one "path value" per line, optional):')],
+        [sg.Multiline('', key='-MORE_SAVES-', size=(70,3))],
         [sg.Text('Width:'), sg.Combo([2, 4], default_value=4, key='-WIDTH-', size=(5,1)),
          sg.Text('bytes'), sg.Push(), sg.Button('SCAN', size=(15,1), button_color=('white', 'green'))],
         [sg.HorizontalSeparator()],
@@ -110,6 +112,11 @@ def main():
             try:
                 saves = [Path(values['-SAVE_A-']), Path(values['-SAVE_B-']), Path(values['-SAVE_C-'])]
                 vals = [int(values['-VAL_A-']), int(values['-VAL_B-']), int(values['-VAL_C-'])]
+                for line in values['-MORE_SAVES-'].splitlines():
+                    if line.strip():
+                        path, val = line.strip().rsplit(None, 1)
+                        saves.append(Path(path))
+                        vals.append(int(val))
                 width = int(values['-WIDTH-'])
                 
                 for s in saves:
@@ -120,7 +127,7 @@ def main():
                 window['-SCAN_STATUS-'].update('Scanning...', text_color='yellow')
                 window.refresh()
                 
-                candidates = scanner.scan_saves(saves[0], saves[1], saves[2], tuple(vals), width)
+                candidates = scanner.scan_series(saves, vals, width)
                 
                 if not candidates:
                     window['-SCAN_STATUS-'].update('No candidates found!', text_color='red')
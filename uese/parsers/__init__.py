@@ -0,0 +1,4 @@
+# Save payload parsers
+from .odin import Field, Node, OdinDocument, parse_payload
+
+__all__ = ["OdinDocument", "Node", "Field", "parse_payload"]
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Reader for Odin Serializer binary payloads (the format inside Naheulbeuk saves).
+
+A decompressed save is a sequence of blocks, each an int64 byte length
+followed by one Odin binary stream. ``OdinDocument`` walks every stream once
+to learn where each node ends; nodes, fields and values are only built when
+they are looked up, and values are always read from (and written to) the
+live buffer.
+"""
+from __future__ import annotations
+
+import struct
+import uuid
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Entry types (Odin's BinaryEntryType); named/unnamed pairs differ by one.
+NAMED_REFERENCE, UNNAMED_REFERENCE = 0x01, 0x02
+NAMED_STRUCT, UNNAMED_STRUCT = 0x03, 0x04
+END_OF_NODE = 0x05
+START_OF_ARRAY, END_OF_ARRAY = 0x06, 0x07
+PRIMITIVE_ARRAY = 0x08
+TYPE_NAME, TYPE_ID = 0x2F, 0x30
+NULL_TYPE = 0x2E
+END_OF_STREAM = 0x31
+STRING = 0x27
+EXTERNAL_BY_STRING = 0x32
+
+# Named entry type -> (kind, struct format or byte size) for fixed-size values.
+PRIMITIVES: Dict[int, Tuple[str, str]] = {
+    0x09: ("internal_ref", "<i"),
+    0x0B: ("external_ref", "<i"),
+    0x0D: ("external_guid", "16s"),
+    0x0F: ("sbyte", "<b"),
+    0x11: ("byte", "<B"),
+    0x13: ("short", "<h"),
+    0x15: ("ushort", "<H"),
+    0x17: ("int", "<i"),
+    0x19: ("uint", "<I"),
+    0x1B: ("long", "<q"),
+    0x1D: ("ulong", "<Q"),
+    0x1F: ("float", "<f"),
+    0x21: ("double", "<d"),
+    0x23: ("decimal", "16s"),
+    0x25: ("char", "<H"),
+    0x29: ("guid", "16s"),
+    0x2B: ("bool", "<?"),
+    0x2D: ("null", ""),
+}
+# Entries that carry a name string right after the type byte.
+_NAMED = frozenset(set(range(NAMED_REFERENCE, 0x2E, 2)) - {END_OF_NODE, END_OF_ARRAY} | {EXTERNAL_BY_STRING})
+_INT32 = struct.Struct("<i")
+_INT64 = struct.Struct("<q")
+
+Child = Union["Node", "Field"]
+
+
+class Field:
+    """A leaf entry: a primitive, string, null, reference or primitive array."""
+
+    __slots__ = ("doc", "offset", "entry", "name", "value_offset", "size")
+
+    def __init__(self, doc: "OdinDocument", offset: int, entry: int, name: Optional[str], value_offset: int, size: int):
+        self.doc = doc
+        self.offset = offset
+        self.entry = entry
+        self.name = name
+        self.value_offset = value_offset
+        self.size = size
+
+    @property
+    def kind(self) -> str:
+        if self.entry in (STRING, STRING + 1):
+            return "string"
+        if self.entry in (EXTERNAL_BY_STRING, EXTERNAL_BY_STRING + 1):
+            return "external_name"
+        if self.entry == PRIMITIVE_ARRAY:
+            return "primitive_array"
+        return PRIMITIVES[self._named_entry][0]
+
+    @property
+    def value(self):
+        data, pos = self.doc.data, self.value_offset
+        if self.entry in (STRING, STRING + 1, EXTERNAL_BY_STRING, EXTERNAL_BY_STRING + 1):
+            return _read_string(data, pos)[0]
+        if self.entry == PRIMITIVE_ARRAY:
+            return bytes(data[pos : pos + self.size])
+        kind, fmt = PRIMITIVES[self._named_entry]
+        if not fmt:
+            return None
+        (raw,) = struct.unpack_from(fmt, data, pos)
+        if kind in ("guid", "external_guid"):
+            return uuid.UUID(bytes_le=raw)
+        if kind == "decimal":
+            return _decimal(raw)
+        if kind == "char":
+            return chr(raw)
+        return raw
+
+    @value.setter
+    def value(self, new_value) -> None:
+        # Fixed-size numbers only: anything else would change the payload length.
+        kind, fmt = PRIMITIVES.get(self._named_entry, ("", ""))
+        if kind not in ("sbyte", "byte", "short", "ushort", "int", "uint", "long", "ulong", "float", "double", "bool"):
+            raise ValueError(f"Cannot write {self.kind} field {self.name!r} in place")
+        struct.pack_into(fmt, self.doc.data, self.value_offset, new_value)
+
+    @property
+    def _named_entry(self) -> int:
+        return self.entry if self.entry in _NAMED else self.entry - 1
+
+    def __repr__(self) -> str:
+        return f"Field({self.name!r}, {self.kind}, @{self.value_offset:#x})"
+
+
+class Node:
+    """A reference node, struct node or array; children are read on first access."""
+
+    __slots__ = ("doc", "offset", "entry", "name", "type_name", "ref_id", "length", "body", "end", "_children", "_keys")
+
+    def __init__(self, doc: "OdinDocument", offset: int, types: Dict[int, str]):
+        self.doc = doc
+        self.offset = offset
+        self.entry = doc.data[offset]
+        self.name: Optional[str] = None
+        self.type_name: Optional[str] = None
+        self.ref_id: Optional[int] = None
+        self.length: Optional[int] = None
+        self._children: Optional[List[Child]] = None
+        self._keys: Optional[Dict[object, Child]] = None
+        data, pos = doc.data, offset + 1
+        if self.entry == START_OF_ARRAY:
+            (self.length,) = _INT64.unpack_from(data, pos)
+            pos += 8
+        else:
+            if self.entry in (NAMED_REFERENCE, NAMED_STRUCT):
+                self.name, pos = _read_string(data, pos)
+            self.type_name, pos = _read_type(data, pos, types)
+            if self.entry in (NAMED_REFERENCE, UNNAMED_REFERENCE):
+                (self.ref_id,) = _INT32.unpack_from(data, pos)
+                pos += 4
+        self.body = pos
+        self.end = doc._ends[offset]
+
+    @property
+    def kind(self) -> str:
+        if self.entry == START_OF_ARRAY:
+            return "array"
+        return "reference" if self.entry in (NAMED_REFERENCE, UNNAMED_REFERENCE) else "struct"
+
+    @property
+    def children(self) -> List[Child]:
+        if self._children is None:
+            self._children = list(self.doc._read_children(self.body, self.end - 1, self._types))
+        return self._children
+
+    @property
+    def _types(self) -> Dict[int, str]:
+        return self.doc._types_at(self.offset)
+
+    def keys(self) -> List[object]:
+        return list(self._keyed())
+
+    def get(self, key, default=None):
+        return self._keyed().get(key, default)
+
+    def __getitem__(self, key) -> Child:
+        try:
+            return self._keyed()[key]
+        except KeyError:
+            raise KeyError(f"{key!r} not found in {self!r}") from None
+
+    def __contains__(self, key) -> bool:
+        return key in self._keyed()
+
+    def path(self, *keys) -> Child:
+        """Follow ``keys`` down the tree, e.g. ``node.path("m_agility", "m_value")``."""
+        current: Child = self
+        for key in keys:
+            if not isinstance(current, Node):
+                raise KeyError(f"{key!r}: {current!r} has no children")
+            current = current[key]
+        return current
+
+    def walk(self) -> Iterator[Child]:
+        for child in self.children:
+            yield child
+            if isinstance(child, Node):
+                yield from child.walk()
+
+    def _keyed(self) -> Dict[object, Child]:
+        # Named children by name; dictionary entries ({$k, $v} structs, either
+        # direct children or inside an array child) by the value of $k.
+        if self._keys is None:
+            keys: Dict[object, Child] = {}
+            for child in self.children:
+                if child.name is not None:
+                    keys.setdefault(child.name, child)
+                if isinstance(child, Node) and child.kind == "array":
+                    entries: Sequence[Child] = child.children
+                else:
+                    entries = (child,)
+                for entry in entries:
+                    if isinstance(entry, Node) and entry.kind == "struct":
+                        pair = {c.name: c for c in entry.children[:2]}
+                        if isinstance(pair.get("$k"), Field) and "$v" in pair:
+                            keys.setdefault(pair["$k"].value, pair["$v"])
+            self._keys = keys
+        return self._keys
+
+    def __repr__(self) -> str:
+        label = self.name or self.type_name or self.kind
+        return f"Node({label!r}, {self.kind}, @{self.offset:#x})"
+
+
+class OdinDocument:
+    """Every Odin stream of a decompressed payload, indexed in one pass."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self.data = data
+        self._ends: Dict[int, int] = {}
+        self._blocks: List[Tuple[int, int, Dict[int, str]]] = []
+        self.roots: List[Child] = []
+        self._index()
+        # Top-level entries of every stream (normally one root node per block).
+        self.roots = [child for start, stop, types in self._blocks for child in self._read_children(start, stop, types)]
+
+    def path(self, *keys) -> Child:
+        """Look ``keys`` up starting from the first root that has the first key."""
+        for root in self.roots:
+            if keys and isinstance(root, Node) and keys[0] in root:
+                return root.path(*keys)
+        raise KeyError(f"{keys[0]!r} not found in any root" if keys else "Empty path")
+
+    def walk(self) -> Iterator[Child]:
+        for root in self.roots:
+            yield root
+            if isinstance(root, Node):
+                yield from root.walk()
+
+    def _types_at(self, offset: int) -> Dict[int, str]:
+        for start, end, types in self._blocks:
+            if start <= offset < end:
+                return types
+        raise ValueError(f"Offset {offset:#x} is outside every Odin stream")
+
+    def _index(self) -> None:
+        data = self.data
+        block = 0
+        while block + 8 <= len(data):
+            (length,) = _INT64.unpack_from(data, block)
+            start, stop = block + 8, block + 8 + length
+            if length <= 0 or stop > len(data):
+                raise ValueError(f"Bad Odin block length {length} at {block:#x}")
+            types: Dict[int, str] = {}
+            self._walk_stream(start, stop, types)
+            self._blocks.append((start, stop, types))
+            block = stop
+        if block != len(data):
+            raise ValueError(f"Trailing bytes after the last Odin block at {block:#x}")
+
+    def _walk_stream(self, pos: int, stop: int, types: Dict[int, str]) -> None:
+        # Shallow pass: skip every entry, remember where each node ends and
+        # which type ids the stream defines. No objects are built here.
+        data, ends, stack = self.data, self._ends, []
+        while pos < stop:
+            entry, start = data[pos], pos
+            pos += 1
+            if entry in _FIXED:
+                if entry in _NAMED:
+                    pos = _skip_string(data, pos)
+                pos += _FIXED[entry]
+            elif entry <= UNNAMED_STRUCT:
+                if entry in (NAMED_REFERENCE, NAMED_STRUCT):
+                    pos = _skip_string(data, pos)
+                pos = _skip_type(data, pos, types)
+                if entry in (NAMED_REFERENCE, UNNAMED_REFERENCE):
+                    pos += 4
+                stack.append(start)
+            elif entry == END_OF_NODE or entry == END_OF_ARRAY:
+                if not stack:
+                    raise ValueError(f"Unbalanced end of node at {start:#x}")
+                ends[stack.pop()] = pos
+            elif entry == START_OF_ARRAY:
+                pos += 8
+                stack.append(start)
+            elif entry == PRIMITIVE_ARRAY:
+                count, width = struct.unpack_from("<ii", data, pos)
+                pos += 8 + count * width
+            elif entry in (STRING, STRING + 1, EXTERNAL_BY_STRING, EXTERNAL_BY_STRING + 1):
+                if entry in _NAMED:
+                    pos = _skip_string(data, pos)
+                pos = _skip_string(data, pos)
+            elif entry == END_OF_STREAM:
+                break
+            else:
+                raise ValueError(f"Unknown Odin entry {entry:#04x} at {start:#x}")
+        if stack:
+            raise ValueError(f"Odin stream ending at {stop:#x} leaves {len(stack)} node(s) open")
+
+    def _read_children(self, pos: int, stop: int, types: Dict[int, str]) -> Iterator[Child]:
+        data = self.data
+        while pos < stop:
+            entry, start = data[pos], pos
+            if entry <= UNNAMED_STRUCT or entry == START_OF_ARRAY:
+                node = Node(self, start, types)
+                yield node
+                pos = node.end
+                continue
+            pos += 1
+            name = None
+            if entry in _NAMED:
+                name, pos = _read_string(data, pos)
+            if entry == PRIMITIVE_ARRAY:
+                count, width = struct.unpack_from("<ii", data, pos)
+                yield Field(self, start, entry, name, pos + 8, count * width)
+                pos += 8 + count * width
+            elif entry in (STRING, STRING + 1, EXTERNAL_BY_STRING, EXTERNAL_BY_STRING + 1):
+                end = _skip_string(data, pos)
+                yield Field(self, start, entry, name, pos, end - pos)
+                pos = end
+            elif entry in _FIXED:
+                yield Field(self, start, entry, name, pos, _FIXED[entry])
+                pos += _FIXED[entry]
+            elif entry == END_OF_STREAM:
+                return
+            else:
+                raise ValueError(f"Unexpected Odin entry {entry:#04x} at {start:#x}")
+
+
+def _build_fixed() -> Dict[int, int]:
+    fixed = {}
+    for named, (_, fmt) in PRIMITIVES.items():
+        size = struct.calcsize(fmt) if fmt else 0
+        fixed[named] = fixed[named + 1] = size
+    return fixed
+
+
+_FIXED = _build_fixed()
+
+
+def _read_string(data, pos: int) -> Tuple[str, int]:
+    wide = data[pos]
+    (length,) = _INT32.unpack_from(data, pos + 1)
+    pos += 5
+    size = length * 2 if wide else length
+    raw = bytes(data[pos : pos + size])
+    return raw.decode("utf-16-le" if wide else "latin-1"), pos + size
+
+
+def _skip_string(data, pos: int) -> int:
+    (length,) = _INT32.unpack_from(data, pos + 1)
+    return pos + 5 + (length * 2 if data[pos] else length)
+
+
+def _read_type(data, pos: int, types: Dict[int, str]) -> Tuple[Optional[str], int]:
+    entry = data[pos]
+    if entry == TYPE_NAME:
+        (type_id,) = _INT32.unpack_from(data, pos + 1)
+        name, pos = _read_string(data, pos + 5)
+        return name, pos
+    if entry == TYPE_ID:
+        (type_id,) = _INT32.unpack_from(data, pos + 1)
+        return types.get(type_id), pos + 5
+    if entry == NULL_TYPE:
+        return None, pos + 1
+    raise ValueError(f"Bad Odin type entry {entry:#04x} at {pos:#x}")
+
+
+def _skip_type(data, pos: int, types: Dict[int, str]) -> int:
+    entry = data[pos]
+    if entry == TYPE_NAME:
+        (type_id,) = _INT32.unpack_from(data, pos + 1)
+        name, end = _read_string(data, pos + 5)
+        types[type_id] = name
+        return end
+    if entry == TYPE_ID:
+        return pos + 5
+    if entry == NULL_TYPE:
+        return pos + 1
+    raise ValueError(f"Bad Odin type entry {entry:#04x} at {pos:#x}")
+
+
+def _decimal(raw: bytes) -> Decimal:
+    # .NET decimal: 96-bit integer (lo, mid, hi) and a flags word with scale and sign.
+    lo, mid, hi, flags = struct.unpack("<IIIi", raw)
+    value = Decimal((hi << 64) | (mid << 32) | lo).scaleb(-((flags >> 16) & 0xFF))
+    return -value if flags < 0 else value
+
+
+def parse_payload(data: Union[bytes, bytearray, memoryview]) -> OdinDocument:
+    return OdinDocument(data)